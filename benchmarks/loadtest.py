@@ -0,0 +1,353 @@
+"""Load-test the router against mock backends and report its own overhead.
+
+The suite starts a mock Ollama and a mock OpenAI-compatible backend
+(``benchmarks.mock_backends``) and ``main:app`` under uvicorn, each in its own
+process.  For every backend kind, streaming mode and concurrency level it
+runs the same closed-loop load twice:
+
+* ``direct`` – straight against the mock backend;
+* ``router`` – through ``/v1/chat/completions`` on the router.
+
+Each run reports throughput, p50/p99 latency and, for streams, time to first
+token (TTFT) and inter-token latency (ITL).  The ``overhead`` rows subtract
+the direct run from the router run, which removes the mock backend's time
+(and the client's own cost), leaving what the router adds per request and
+to TTFT.  Router CPU time per request is read from ``/proc`` where
+available; the per-chunk figure is the extra CPU of a streamed request over a
+non-streaming one divided by its chunks (run both modes to get it).
+
+Every prompt is unique and the response cache and request coalescing are
+disabled, so each request really goes through dispatch.  Other ``GENAI_*``
+variables in the environment apply to the router (e.g. stream coalescing).
+
+Output is JSON (``--output`` writes it to a file) with the commit, the
+configuration and one flat row per run, so results can be diffed across
+commits.  Request logs go to stderr; redirect it to keep the terminal quiet.
+
+Usage::
+
+    python -m benchmarks.loadtest --concurrency 1,16,64 --requests 500 \\
+        --ttft 0.05 --tokens 32 --tokens-per-sec 200 --output load.json 2>/dev/null
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import itertools
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.mock_backends import CHAT_PATHS, KINDS, TOKEN, serve
+
+_TOKEN_BYTES = TOKEN.encode("utf-8")
+# Router backend names for the two mocks; also used as model names.
+_MODELS = {"ollama": "bench-ollama", "openai": "bench-openai"}
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _serve_router(port: int, backends: Dict[str, Any]) -> None:
+    """Run ``main:app`` with *backends* as its routing table (process target)."""
+
+    os.environ["GENAI_CACHE_MAX_BYTES"] = "0"
+    os.environ["GENAI_COALESCE_REQUESTS"] = "false"
+    os.environ.pop("GENAI_API_KEYS", None)
+    os.environ.pop("GENAI_RATE_LIMIT", None)
+    # Keep OpenTelemetry instrumentation out of the measurement.
+    sys.modules.setdefault("opentelemetry.instrumentation.fastapi", None)  # type: ignore[arg-type]
+
+    from config import backend_loader
+
+    backend_loader._load_raw_config = lambda: backends  # type: ignore[assignment]
+
+    import uvicorn
+
+    uvicorn.run("main:app", host="127.0.0.1", port=port, log_level="warning", access_log=False)
+
+
+def _router_config(urls: Dict[str, str]) -> Dict[str, Any]:
+    pool = {"max_connections": 1024, "max_keepalive_connections": 1024}
+    backends = {
+        _MODELS["ollama"]: {"name": _MODELS["ollama"], "type": "ollama", "base_url": urls["ollama"]},
+        _MODELS["openai"]: {"name": _MODELS["openai"], "type": "http", "base_url": urls["openai"], "pool": pool},
+    }
+    return {
+        "default_backend": _MODELS["openai"],
+        "backends": backends,
+        "routing": {model: model for model in _MODELS.values()},
+    }
+
+
+async def _wait_ready(url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while True:
+            try:
+                if (await client.get(url)).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            if time.monotonic() > deadline:
+                raise RuntimeError(f"{url} did not become ready")
+            await asyncio.sleep(0.1)
+
+
+def _cpu_seconds(pid: int) -> Optional[float]:
+    """User + system CPU time of *pid* (Linux ``/proc``), else ``None``."""
+
+    try:
+        with open(f"/proc/{pid}/stat", "rb") as fh:
+            fields = fh.read().rsplit(b")", 1)[1].split()
+    except OSError:
+        return None
+    return (int(fields[11]) + int(fields[12])) / os.sysconf("SC_CLK_TCK")
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))]
+
+
+def _ms(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value * 1000, 3)
+
+
+class _Samples:
+    def __init__(self) -> None:
+        self.latencies: List[float] = []
+        self.ttfts: List[float] = []
+        self.itls: List[float] = []
+        self.chunks = 0
+        self.errors = 0
+
+
+async def _request(client: httpx.AsyncClient, url: str, payload: Dict[str, Any], samples: _Samples) -> None:
+    start = time.perf_counter()
+    try:
+        if not payload["stream"]:
+            resp = await client.post(url, json=payload)
+            ok = resp.status_code == 200
+        else:
+            async with client.stream("POST", url, json=payload) as resp:
+                ok = resp.status_code == 200
+                last = None
+                async for data in resp.aiter_raw():
+                    if _TOKEN_BYTES not in data:
+                        continue
+                    now = time.perf_counter()
+                    if last is None:
+                        samples.ttfts.append(now - start)
+                    else:
+                        samples.itls.append(now - last)
+                    last = now
+                    samples.chunks += 1
+    except httpx.HTTPError:
+        ok = False
+    if ok:
+        samples.latencies.append(time.perf_counter() - start)
+    else:
+        samples.errors += 1
+
+
+async def run_load(url: str, model: str, stream: bool, concurrency: int, requests: int) -> Dict[str, Any]:
+    """Send *requests* requests from *concurrency* closed-loop workers."""
+
+    counter = itertools.count()
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    def payload() -> Dict[str, Any]:
+        # Unique prompts: nothing may be answered from a cache.
+        prompt = f"load test prompt {next(counter)}"
+        return {"model": model, "stream": stream, "messages": [{"role": "user", "content": prompt}]}
+
+    async with httpx.AsyncClient(limits=limits, timeout=120.0) as client:
+        warmup = _Samples()
+        await asyncio.gather(*(_request(client, url, payload(), warmup) for _ in range(concurrency)))
+
+        samples = _Samples()
+        remaining = iter(range(requests))
+
+        async def worker() -> None:
+            for _ in remaining:
+                await _request(client, url, payload(), samples)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - start
+
+    row: Dict[str, Any] = {
+        "requests": requests,
+        "errors": samples.errors,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(len(samples.latencies) / elapsed, 2),
+        "latency_mean_ms": _ms(sum(samples.latencies) / len(samples.latencies)) if samples.latencies else None,
+        "latency_p50_ms": _ms(_percentile(samples.latencies, 50)),
+        "latency_p99_ms": _ms(_percentile(samples.latencies, 99)),
+    }
+    if stream:
+        row.update(
+            {
+                "chunks": samples.chunks,
+                "ttft_p50_ms": _ms(_percentile(samples.ttfts, 50)),
+                "ttft_p99_ms": _ms(_percentile(samples.ttfts, 99)),
+                "itl_p50_ms": _ms(_percentile(samples.itls, 50)),
+                "itl_p99_ms": _ms(_percentile(samples.itls, 99)),
+            }
+        )
+    return row
+
+
+def _diff(router: Dict[str, Any], direct: Dict[str, Any], key: str) -> Optional[float]:
+    if router.get(key) is None or direct.get(key) is None:
+        return None
+    return round(router[key] - direct[key], 3)
+
+
+def _overhead(
+    router: Dict[str, Any], direct: Dict[str, Any], unary_cpu_us: Optional[float] = None
+) -> Dict[str, Any]:
+    """Router minus direct for one run; *unary_cpu_us* is the non-streaming CPU cost."""
+
+    row = {key: router[key] for key in ("backend", "stream", "concurrency")}
+    for key in ("latency_mean_ms", "latency_p50_ms", "latency_p99_ms", "ttft_p50_ms", "ttft_p99_ms", "itl_p50_ms"):
+        if key in router:
+            row[f"added_{key}"] = _diff(router, direct, key)
+    cpu_us = router.get("router_cpu_us_per_request")
+    if cpu_us is not None:
+        row["router_cpu_us_per_request"] = cpu_us
+        if router["stream"] and router.get("chunks") and unary_cpu_us is not None:
+            # Streaming cost above a non-streaming request, spread over its chunks.
+            chunks_per_request = router["chunks"] / max(1, router["requests"] - router["errors"])
+            row["router_cpu_us_per_chunk"] = round((cpu_us - unary_cpu_us) / chunks_per_request, 2)
+    return row
+
+
+def _commit() -> Optional[str]:
+    try:
+        out = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True, timeout=10
+        )
+    except (OSError, subprocess.SubprocessError):
+        return None
+    return out.stdout.strip() or None
+
+
+async def main(
+    concurrency: List[int],
+    requests: int,
+    kinds: List[str],
+    modes: List[bool],
+    mock_options: Dict[str, Any],
+) -> Dict[str, Any]:
+    ctx = multiprocessing.get_context("spawn")
+    ports = {kind: _free_port() for kind in KINDS}
+    urls = {kind: f"http://127.0.0.1:{port}" for kind, port in ports.items()}
+    router_port = _free_port()
+    router_url = f"http://127.0.0.1:{router_port}"
+
+    processes = [
+        ctx.Process(target=serve, args=(ports[kind],), kwargs=dict(mock_options, kind=kind), daemon=True)
+        for kind in KINDS
+    ]
+    router_proc = ctx.Process(target=_serve_router, args=(router_port, _router_config(urls)), daemon=True)
+    processes.append(router_proc)
+    for proc in processes:
+        proc.start()
+
+    rows: List[Dict[str, Any]] = []
+    overhead: List[Dict[str, Any]] = []
+    unary_cpu: Dict[tuple, float] = {}
+    try:
+        await _wait_ready(urls["ollama"] + "/api/tags")
+        await _wait_ready(urls["openai"] + "/v1/models")
+        await _wait_ready(router_url + "/healthz")
+
+        for kind, stream, level in itertools.product(kinds, modes, concurrency):
+            base = {"backend": kind, "stream": stream, "concurrency": level}
+            direct = dict(base, target="direct")
+            direct.update(await run_load(urls[kind] + CHAT_PATHS[kind], "bench", stream, level, requests))
+
+            cpu_before = _cpu_seconds(router_proc.pid)
+            routed = dict(base, target="router")
+            routed.update(
+                await run_load(router_url + "/v1/chat/completions", _MODELS[kind], stream, level, requests)
+            )
+            cpu_after = _cpu_seconds(router_proc.pid)
+            if cpu_before is not None and cpu_after is not None:
+                # Includes the warm-up requests.
+                routed["router_cpu_us_per_request"] = round((cpu_after - cpu_before) * 1e6 / (requests + level), 1)
+
+            if not stream and "router_cpu_us_per_request" in routed:
+                unary_cpu[kind, level] = routed["router_cpu_us_per_request"]
+
+            rows.extend((direct, routed))
+            overhead.append(_overhead(routed, direct, unary_cpu.get((kind, level))))
+            print(json.dumps(overhead[-1]), file=sys.stderr)
+    finally:
+        for proc in processes:
+            proc.terminate()
+        for proc in processes:
+            proc.join(timeout=10)
+
+    return {
+        "meta": {
+            "commit": _commit(),
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "requests": requests,
+            "mock": mock_options,
+        },
+        "results": rows,
+        "overhead": overhead,
+    }
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 16, 64], help="e.g. 1,16,64")
+    parser.add_argument("--requests", type=int, default=500, help="Measured requests per run")
+    parser.add_argument("--backends", default="ollama,openai", help="Mock backend kinds to test")
+    parser.add_argument("--mode", choices=("both", "stream", "non-stream"), default="both")
+    parser.add_argument("--ttft", type=float, default=0.05, help="Mock seconds to first token")
+    parser.add_argument("--tokens", type=int, default=32, help="Mock tokens per response")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of mock responses that are 500s")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    kinds = [kind.strip() for kind in args.backends.split(",") if kind.strip()]
+    modes = {"both": [False, True], "stream": [True], "non-stream": [False]}[args.mode]
+    mock = {
+        "ttft": args.ttft,
+        "tokens": args.tokens,
+        "tokens_per_sec": args.tokens_per_sec,
+        "error_rate": args.error_rate,
+    }
+    report = asyncio.run(main(args.concurrency, args.requests, kinds, modes, mock))
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as fh:
+            fh.write(text + "\n")
+    print(text)
@@ -0,0 +1,509 @@
+"""Microbenchmarks for the functions on every request's path.
+
+Each benchmark times one hot-path call (best of several repeats, like
+``timeit``) and reports nanoseconds per call:
+
+* Ollama conversion: ``_ollama_to_openai``, ``_ollama_chunk_to_openai`` and
+  the streaming ``_ChunkTranscoder``;
+* ``resolve_backend`` (also over 2000 exact names and 2000 rules);
+* ``ChatCompletionRequest`` parsing and ``model_dump`` on a large
+  conversation;
+* each middleware's ASGI ``__call__`` around an instant inner app.
+
+Timings are compared with ``benchmarks/baselines/micro.json``.  Every
+timing is divided by a fixed pure-Python reference workload measured
+interleaved with it, which cancels out most of the machine's speed and
+load; a benchmark regresses when that normalised time grows by more than
+its threshold (default 25%).  Regressed benchmarks are re-measured once
+before the check fails.
+
+Usage::
+
+    python -m benchmarks.micro              # print timings and deltas
+    python -m benchmarks.micro --check      # exit 1 if anything regressed
+    python -m benchmarks.micro --update     # record a new baseline (median of 3 runs)
+    python -m benchmarks.micro --filter middleware --check
+
+``GENAI_MICROBENCH=1 pytest tests/test_microbench.py`` runs the check as a
+test.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import gc
+import inspect
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+BASELINE_PATH = Path(__file__).parent / "baselines" / "micro.json"
+DEFAULT_THRESHOLD = 0.25
+
+
+class Benchmark(NamedTuple):
+    name: str
+    setup: Callable[[], Callable[[], Any]]
+    threshold: float
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, threshold: float = DEFAULT_THRESHOLD):
+    """Register *setup*, which returns the (sync or async) callable to time."""
+
+    def register(setup: Callable[[], Callable[[], Any]]):
+        BENCHMARKS[name] = Benchmark(name, setup, threshold)
+        return setup
+
+    return register
+
+
+# --------------------------------------------------------------------------- #
+# Fixtures
+# --------------------------------------------------------------------------- #
+
+
+def _conversation(messages: int = 200, content_bytes: int = 400) -> Dict[str, Any]:
+    text = ("The quick brown fox jumps over the lazy dog. " * (content_bytes // 45 + 1))[:content_bytes]
+    return {
+        "model": "llama3",
+        "temperature": 0.2,
+        "messages": [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": f"{i}: {text}"} for i in range(messages)
+        ],
+    }
+
+
+def _ollama_final() -> Dict[str, Any]:
+    return {
+        "model": "llama3",
+        "created_at": "2024-05-01T10:00:00.000000Z",
+        "message": {"role": "assistant", "content": "Hello there! " * 40},
+        "done": True,
+        "done_reason": "stop",
+        "prompt_eval_count": 26,
+        "eval_count": 298,
+    }
+
+
+def _ollama_chunk() -> Dict[str, Any]:
+    return {
+        "model": "llama3",
+        "created_at": "2024-05-01T10:00:00.000000Z",
+        "message": {"role": "assistant", "content": " token"},
+        "done": False,
+    }
+
+
+@contextlib.contextmanager
+def _env(**values: str) -> Iterator[None]:
+    """Temporarily set ``GENAI_*`` variables and rebuild the settings."""
+
+    from config.settings import get_settings
+
+    saved = {key: os.environ.get(key) for key in values}
+    os.environ.update(values)
+    get_settings.cache_clear()
+    try:
+        yield
+    finally:
+        for key, value in saved.items():
+            if value is None:
+                os.environ.pop(key, None)
+            else:
+                os.environ[key] = value
+        get_settings.cache_clear()
+
+
+@contextlib.contextmanager
+def _quiet_logs() -> Iterator[None]:
+    """Send log records to ``/dev/null`` (still formatted and written)."""
+
+    handlers = [h for h in logging.getLogger().handlers if isinstance(h, logging.StreamHandler)]
+    with open(os.devnull, "w") as devnull:
+        saved = [h.setStream(devnull) for h in handlers]
+        try:
+            yield
+        finally:
+            for handler, stream in zip(handlers, saved):
+                handler.setStream(stream)
+
+
+_SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "POST",
+    "scheme": "http",
+    "path": "/v1/chat/completions",
+    "raw_path": b"/v1/chat/completions",
+    "query_string": b"",
+    "root_path": "",
+    "headers": [
+        (b"host", b"router"),
+        (b"content-type", b"application/json"),
+        (b"authorization", b"Bearer bench-key"),
+    ],
+    "client": ("127.0.0.1", 50000),
+    "server": ("127.0.0.1", 8000),
+}
+
+
+async def _inner_app(scope, receive, send) -> None:
+    await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+async def _receive() -> Dict[str, Any]:
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+
+async def _send(message) -> None:
+    return None
+
+
+def _middleware(cls: type) -> Callable[[], Any]:
+    app = cls(_inner_app)
+
+    def call():
+        return app(dict(_SCOPE), _receive, _send)
+
+    return call
+
+
+# --------------------------------------------------------------------------- #
+# Benchmarks
+# --------------------------------------------------------------------------- #
+
+
+@benchmark("ollama_to_openai")
+def _bench_ollama_to_openai():
+    from handlers.ollama_handler import _ollama_to_openai
+
+    msg = _ollama_final()
+    return lambda: _ollama_to_openai(msg)
+
+
+@benchmark("ollama_chunk_to_openai")
+def _bench_ollama_chunk_to_openai():
+    from handlers.ollama_handler import _ollama_chunk_to_openai
+
+    msg = _ollama_chunk()
+    return lambda: _ollama_chunk_to_openai(msg)
+
+
+@benchmark("ollama_chunk_transcoder")
+def _bench_chunk_transcoder():
+    from handlers.ollama_handler import _ChunkTranscoder
+
+    encode = _ChunkTranscoder().encode
+    line = json.dumps(_ollama_chunk(), separators=(",", ":")).encode("utf-8")
+    return lambda: encode(line)
+
+
+@benchmark("resolve_backend")
+def _bench_resolve_backend():
+    from config.backend_loader import resolve_backend
+
+    return lambda: resolve_backend("llama3")
+
+
+def _rules_table():
+    from config.backend_loader import RoutingTable
+
+    backends = {f"b{i}": {"type": "ollama", "base_url": f"http://b{i}"} for i in range(10)}
+    return RoutingTable(
+        {
+            "default_backend": "b0",
+            "backends": backends,
+            "routing": {f"model-{i}": f"b{i % 10}" for i in range(2000)},
+            "routing_rules": [{"prefix": f"family{i}:", "backend": f"b{i % 10}"} for i in range(1000)]
+            + [{"glob": f"tuned-{i}-*-v[0-9]", "backend": f"b{i % 10}"} for i in range(500)]
+            + [{"regex": f"vendor{i}-(chat|code)-\\d+", "backend": f"b{i % 10}"} for i in range(500)],
+        }
+    )
+
+
+@benchmark("resolve_backend_2k_rules")
+def _bench_resolve_rules():
+    table = _rules_table()
+    names = ["model-1999", "family999:70b", "tuned-499-x-v1", "vendor499-code-7", "unknown"]
+    return lambda: [table.resolve(name) for name in names]
+
+
+@benchmark("match_rules_uncached_2k")
+def _bench_match_rules():
+    # Worst case: the last regex rule, bypassing the per-table memo.
+    match = _rules_table().rules.match
+    return lambda: match("vendor499-code-7")
+
+
+@benchmark("request_parse_json_200msg")
+def _bench_request_parse_json():
+    from schemas.chat import ChatCompletionRequest
+
+    raw = json.dumps(_conversation()).encode("utf-8")
+    return lambda: ChatCompletionRequest.model_validate_json(raw)
+
+
+@benchmark("request_validate_200msg")
+def _bench_request_validate():
+    from schemas.chat import ChatCompletionRequest
+
+    data = _conversation()
+    return lambda: ChatCompletionRequest.model_validate(data)
+
+
+@benchmark("request_model_dump_200msg")
+def _bench_request_model_dump():
+    from schemas.chat import ChatCompletionRequest
+
+    request = ChatCompletionRequest.model_validate(_conversation())
+    return request.model_dump
+
+
+@benchmark("middleware_auth", threshold=0.4)
+def _bench_auth():
+    from middleware.auth_middleware import APIKeyAuthMiddleware
+
+    return _middleware(APIKeyAuthMiddleware)
+
+
+@benchmark("middleware_ratelimit", threshold=0.4)
+def _bench_ratelimit():
+    from middleware.ratelimit_middleware import RateLimitMiddleware
+
+    return _middleware(RateLimitMiddleware)
+
+
+@benchmark("middleware_logging", threshold=0.4)
+def _bench_logging():
+    from middleware.logging_middleware import RequestLoggingMiddleware
+
+    return _middleware(RequestLoggingMiddleware)
+
+
+@benchmark("middleware_metrics", threshold=0.4)
+def _bench_metrics():
+    from middleware.metrics_middleware import MetricsMiddleware
+
+    return _middleware(MetricsMiddleware)
+
+
+# --------------------------------------------------------------------------- #
+# Timing
+# --------------------------------------------------------------------------- #
+
+
+def _reference() -> None:
+    # Fixed CPU-bound workload used to normalise timings across machines.
+    total = 0
+    for i in range(2000):
+        total += len(str(i * 7919))
+    return None
+
+
+def _time_sync(fn: Callable[[], Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        fn()
+    return time.perf_counter() - start
+
+
+async def _time_async(fn: Callable[[], Any], loops: int) -> float:
+    start = time.perf_counter()
+    for _ in range(loops):
+        await fn()
+    return time.perf_counter() - start
+
+
+class _Timer:
+    """Times *fn* (sync, or returning an awaitable) over a calibrated loop count."""
+
+    def __init__(self, fn: Callable[[], Any], min_time: float) -> None:
+        self.fn = fn
+        probe = fn()
+        self.loop = asyncio.new_event_loop() if inspect.isawaitable(probe) else None
+        if self.loop is not None:
+            self.loop.run_until_complete(probe)
+        # Grow the loop count until one repeat lasts *min_time*.
+        self.loops = 1
+        while (elapsed := self._run(self.loops)) < min_time:
+            self.loops = max(self.loops * 2, int(self.loops * min_time / max(elapsed, 1e-9)))
+
+    def _run(self, loops: int) -> float:
+        # Like ``timeit``: keep garbage collection pauses out of the timings.
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            if self.loop is not None:
+                return self.loop.run_until_complete(_time_async(self.fn, loops))
+            return _time_sync(self.fn, loops)
+        finally:
+            if enabled:
+                gc.enable()
+
+    def __call__(self) -> float:
+        """Nanoseconds per call for one repeat."""
+
+        return self._run(self.loops) / self.loops * 1e9
+
+    def close(self) -> None:
+        if self.loop is not None:
+            self.loop.close()
+
+
+def measure(fn: Callable[[], Any], repeat: int = 5, min_time: float = 0.05) -> Tuple[float, float]:
+    """Return ``(ns per call, ns per reference workload)``, best of *repeat*.
+
+    Repeats of *fn* and of the reference workload are interleaved so both see
+    the same machine load; their ratio is far steadier than either timing.
+    """
+
+    timer, reference = _Timer(fn, min_time), _Timer(_reference, min_time)
+    try:
+        best, best_ref = float("inf"), float("inf")
+        for _ in range(repeat):
+            best = min(best, timer())
+            best_ref = min(best_ref, reference())
+        return best, best_ref
+    finally:
+        timer.close()
+
+
+def run(names: Optional[List[str]] = None, repeat: int = 5, min_time: float = 0.05) -> Dict[str, Any]:
+    """Run the selected benchmarks.
+
+    Returns ``{"benchmarks": {name: ns}, "relative": {name: ns / reference}}``.
+    """
+
+    import middleware.logging_middleware  # noqa: F401  (installs the root log handler)
+
+    selected = [BENCHMARKS[name] for name in (names or BENCHMARKS)]
+    timings: Dict[str, float] = {}
+    relative: Dict[str, float] = {}
+    # Middlewares run with auth and rate limiting enabled (never rejecting).
+    with _env(GENAI_API_KEYS="bench-key", GENAI_RATE_LIMIT="100000000/sec"), _quiet_logs():
+        for bench in selected:
+            ns, reference_ns = measure(bench.setup(), repeat, min_time)
+            timings[bench.name] = round(ns, 1)
+            relative[bench.name] = round(ns / reference_ns, 6)
+    return {"benchmarks": timings, "relative": relative}
+
+
+def run_median(names: Optional[List[str]] = None, rounds: int = 3) -> Dict[str, Any]:
+    """Median of *rounds* runs per benchmark (used to record baselines)."""
+
+    runs = [run(names) for _ in range(rounds)]
+    return {
+        key: {name: statistics.median(r[key][name] for r in runs) for name in runs[0][key]}
+        for key in ("benchmarks", "relative")
+    }
+
+
+def load_baseline(path: Path = BASELINE_PATH) -> Optional[Dict[str, Any]]:
+    if not path.exists():
+        return None
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def save_baseline(result: Dict[str, Any], path: Path = BASELINE_PATH) -> None:
+    # Keep entries for benchmarks that were not run this time (--filter).
+    baseline = load_baseline(path) or {"benchmarks": {}, "relative": {}}
+    data = {
+        "meta": {"python": platform.python_version(), "platform": platform.platform()},
+        "benchmarks": dict(sorted({**baseline["benchmarks"], **result["benchmarks"]}.items())),
+        "relative": dict(sorted({**baseline["relative"], **result["relative"]}.items())),
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(data, indent=2) + "\n", encoding="utf-8")
+
+
+def compare(result: Dict[str, Any], baseline: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Return one row per benchmark with its normalised change vs. *baseline*.
+
+    ``change`` is the relative growth of the reference-normalised time
+    (``0.3`` = 30% slower); ``regressed`` is set when it exceeds the
+    benchmark's threshold.
+    """
+
+    rows = []
+    for name, ns in result["benchmarks"].items():
+        row: Dict[str, Any] = {"name": name, "ns": ns, "baseline_ns": None, "change": None, "regressed": False}
+        previous = baseline["relative"].get(name)
+        if previous:
+            change = result["relative"][name] / previous - 1
+            threshold = BENCHMARKS[name].threshold if name in BENCHMARKS else DEFAULT_THRESHOLD
+            row.update(
+                baseline_ns=baseline["benchmarks"].get(name),
+                change=round(change, 3),
+                threshold=threshold,
+                regressed=change > threshold,
+            )
+        rows.append(row)
+    return rows
+
+
+def check(names: Optional[List[str]] = None, path: Path = BASELINE_PATH, retries: int = 1) -> List[Dict[str, Any]]:
+    """Run and compare against the baseline; return the regressed rows.
+
+    Regressed benchmarks are re-measured up to *retries* times to filter out
+    one-off noise.
+    """
+
+    baseline = load_baseline(path)
+    if baseline is None:
+        raise FileNotFoundError(f"no baseline at {path}; record one with --update")
+    rows = compare(run(names), baseline)
+    for _ in range(retries):
+        again = [row["name"] for row in rows if row["regressed"]]
+        if not again:
+            break
+        retried = {row["name"]: row for row in compare(run(again), baseline)}
+        rows = [retried.get(row["name"], row) for row in rows]
+    return [row for row in rows if row["regressed"]]
+
+
+def _format(rows: List[Dict[str, Any]]) -> str:
+    lines = [f"{'benchmark':<30} {'ns/call':>12} {'baseline':>12} {'change':>8}"]
+    for row in rows:
+        baseline = f"{row['baseline_ns']:.1f}" if row["baseline_ns"] is not None else "-"
+        change = f"{row['change']:+.1%}" if row["change"] is not None else "-"
+        flag = "  REGRESSED" if row["regressed"] else ""
+        lines.append(f"{row['name']:<30} {row['ns']:>12.1f} {baseline:>12} {change:>8}{flag}")
+    return "\n".join(lines)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--filter", default="", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if a benchmark regressed")
+    parser.add_argument("--update", action="store_true", help="Write the results as the new baseline")
+    parser.add_argument("--baseline", type=Path, default=BASELINE_PATH)
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results")
+    args = parser.parse_args()
+
+    names = [name for name in BENCHMARKS if args.filter in name]
+    if args.check:
+        regressed = check(names, args.baseline)
+        for row in regressed:
+            print(f"{row['name']}: {row['change']:+.1%} (threshold {row['threshold']:.0%})", file=sys.stderr)
+        sys.exit(1 if regressed else 0)
+
+    result = run_median(names) if args.update else run(names)
+    baseline = load_baseline(args.baseline) or {"benchmarks": {}, "relative": {}}
+    rows = compare(result, baseline)
+    print(json.dumps({**result, "comparison": rows}, indent=2) if args.json else _format(rows))
+    if args.update:
+        save_baseline(result, args.baseline)
+        print(f"baseline written to {args.baseline}", file=sys.stderr)
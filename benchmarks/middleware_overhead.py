@@ -0,0 +1,118 @@
+"""Measure the per-request cost of the router's middleware stack.
+
+The benchmark drives ``main.app`` in-process through ``httpx.ASGITransport``
+with the backend handler replaced by an instant fake, and compares it with a
+bare FastAPI app that mounts the same router without any middleware.  The
+difference is the middleware overhead, reported for non-streaming requests
+and for streaming requests (per request and per SSE chunk).
+
+Request logs go to stderr; redirect it to keep the terminal quiet.
+
+Usage::
+
+    python -m benchmarks.middleware_overhead --requests 2000 --chunks 50 2>/dev/null
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from typing import Any, Dict
+
+import httpx
+
+API_KEY = "bench-key"
+
+
+def _configure_env() -> None:
+    # Exercise auth and rate limiting without ever rejecting.
+    os.environ["GENAI_API_KEYS"] = API_KEY
+    os.environ["GENAI_RATE_LIMIT"] = "100000000/sec"
+    os.environ["GENAI_CACHE_MAX_BYTES"] = "0"
+    os.environ["GENAI_COALESCE_REQUESTS"] = "false"
+    # Keep OpenTelemetry instrumentation out of the measurement.
+    sys.modules.setdefault("opentelemetry.instrumentation.fastapi", None)  # type: ignore[arg-type]
+
+
+def _fake_handler(chunks: int):
+    response = {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "model": "bench",
+        "choices": [
+            {"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}
+        ],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+    }
+    chunk = 'data: {"choices":[{"index":0,"delta":{"content":"tok"}}]}\n\n'
+
+    async def stream():
+        for _ in range(chunks):
+            yield chunk
+        yield "data: [DONE]\n\n"
+
+    async def handle(body, base_url=None):
+        if body.stream:
+            return stream()
+        return dict(response)
+
+    return handle
+
+
+def _build_apps(chunks: int):
+    from fastapi import FastAPI
+
+    import router as router_module
+
+    router_module.http_handle = _fake_handler(chunks)
+    router_module.resolve_backend = lambda model: {"name": "bench", "type": "http", "base_url": "http://bench"}
+
+    import main
+
+    bare = FastAPI()
+    bare.include_router(router_module.router, prefix="/v1")
+    return main.app, bare
+
+
+async def _run(app: Any, requests: int, stream: bool) -> float:
+    payload = {"model": "bench", "stream": stream, "messages": [{"role": "user", "content": "hi"}]}
+    headers = {"Authorization": f"Bearer {API_KEY}"}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        # Warm up (builds the middleware stack, JIT caches, ...)
+        for _ in range(50):
+            await client.post("/v1/chat/completions", json=payload, headers=headers)
+        start = time.perf_counter()
+        for _ in range(requests):
+            resp = await client.post("/v1/chat/completions", json=payload, headers=headers)
+            assert resp.status_code == 200, resp.text
+        return (time.perf_counter() - start) / requests
+
+
+async def main(requests: int, chunks: int) -> Dict[str, float]:
+    _configure_env()
+    app, bare = _build_apps(chunks)
+
+    results: Dict[str, float] = {}
+    for mode, stream in (("non_stream", False), ("stream", True)):
+        with_mw = await _run(app, requests, stream)
+        without = await _run(bare, requests, stream)
+        overhead = with_mw - without
+        results[f"{mode}_us_per_request"] = round(with_mw * 1e6, 1)
+        results[f"{mode}_bare_us_per_request"] = round(without * 1e6, 1)
+        results[f"{mode}_middleware_overhead_us"] = round(overhead * 1e6, 1)
+        if stream:
+            results["stream_middleware_overhead_us_per_chunk"] = round(overhead * 1e6 / (chunks + 1), 2)
+    return results
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--chunks", type=int, default=50)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.requests, args.chunks)), indent=2))
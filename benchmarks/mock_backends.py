@@ -0,0 +1,203 @@
+"""Mock Ollama and OpenAI-compatible backends for load tests.
+
+:class:`MockBackend` is a raw ASGI app that answers chat requests with
+canned tokens on a fixed schedule: the first token after ``ttft`` seconds,
+then one token every ``1 / tokens_per_sec`` seconds.  A fraction
+``error_rate`` of chat requests fails with HTTP 500.  Health probes
+(``/api/tags``, ``/v1/models``) always succeed.
+
+* ``kind="ollama"`` serves ``POST /api/chat`` (NDJSON stream or one JSON
+  object).
+* ``kind="openai"`` serves ``POST /v1/chat/completions`` (SSE stream or one
+  ``chat.completion`` object).
+
+Run one standalone::
+
+    python -m benchmarks.mock_backends --kind openai --port 9001 --ttft 0.05
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import random
+from typing import Any, Dict
+
+KINDS = ("ollama", "openai")
+CHAT_PATHS = {"ollama": "/api/chat", "openai": "/v1/chat/completions"}
+_HEALTH_BODIES = {
+    "/api/tags": b'{"models":[{"name":"bench"}]}',
+    "/v1/models": b'{"object":"list","data":[{"id":"bench","object":"model"}]}',
+}
+TOKEN = " tok"
+CREATED_AT = "2024-05-01T10:00:00.000000Z"
+
+
+class MockBackend:
+    """ASGI app emulating an LLM server with a configurable token schedule."""
+
+    def __init__(
+        self,
+        kind: str = "openai",
+        ttft: float = 0.05,
+        tokens: int = 32,
+        tokens_per_sec: float = 200.0,
+        error_rate: float = 0.0,
+        seed: int | None = None,
+    ) -> None:
+        if kind not in KINDS:
+            raise ValueError(f"kind must be one of {KINDS}, got {kind!r}")
+        self.kind = kind
+        self.ttft = ttft
+        self.tokens = max(1, tokens)
+        self.interval = 1.0 / tokens_per_sec if tokens_per_sec > 0 else 0.0
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._chunk, self._final = self._render_stream()
+
+    @property
+    def generation_time(self) -> float:
+        """Seconds from request to last token (the backend's share of latency)."""
+
+        return self.ttft + (self.tokens - 1) * self.interval
+
+    async def __call__(self, scope: Dict[str, Any], receive, send) -> None:
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        path = scope["path"]
+        if scope["method"] == "GET" and path in _HEALTH_BODIES:
+            await _respond(send, 200, _HEALTH_BODIES[path])
+            return
+        if scope["method"] != "POST" or path != CHAT_PATHS[self.kind]:
+            await _respond(send, 404, b'{"error":"not found"}')
+            return
+
+        body = b""
+        more = True
+        while more:
+            message = await receive()
+            body += message.get("body", b"")
+            more = message.get("more_body", False)
+        request = json.loads(body or b"{}")
+
+        if self.error_rate and self._random.random() < self.error_rate:
+            await _respond(send, 500, b'{"error":"injected failure"}')
+            return
+        if request.get("stream"):
+            await self._stream(send)
+        else:
+            await asyncio.sleep(self.generation_time)
+            await _respond(send, 200, self._completion(request.get("model", "bench")))
+
+    async def _stream(self, send) -> None:
+        content_type = b"application/x-ndjson" if self.kind == "ollama" else b"text/event-stream"
+        await send(
+            {"type": "http.response.start", "status": 200, "headers": [(b"content-type", content_type)]}
+        )
+        await asyncio.sleep(self.ttft)
+        for i in range(self.tokens):
+            if i:
+                await asyncio.sleep(self.interval)
+            await send({"type": "http.response.body", "body": self._chunk, "more_body": True})
+        await send({"type": "http.response.body", "body": self._final})
+
+    def _render_stream(self) -> tuple[bytes, bytes]:
+        if self.kind == "ollama":
+            chunk = {
+                "model": "bench",
+                "created_at": CREATED_AT,
+                "message": {"role": "assistant", "content": TOKEN},
+                "done": False,
+            }
+            final = {
+                "model": "bench",
+                "created_at": CREATED_AT,
+                "message": {"role": "assistant", "content": ""},
+                "done": True,
+                "prompt_eval_count": 1,
+                "eval_count": self.tokens,
+            }
+            return _dumps(chunk) + b"\n", _dumps(final) + b"\n"
+        chunk = {
+            "id": "chatcmpl-mock",
+            "object": "chat.completion.chunk",
+            "model": "bench",
+            "choices": [{"index": 0, "delta": {"content": TOKEN}, "finish_reason": None}],
+        }
+        final = dict(chunk, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+        return b"data: " + _dumps(chunk) + b"\n\n", b"data: " + _dumps(final) + b"\n\ndata: [DONE]\n\n"
+
+    def _completion(self, model: str) -> bytes:
+        content = TOKEN * self.tokens
+        if self.kind == "ollama":
+            return _dumps(
+                {
+                    "model": model,
+                    "created_at": CREATED_AT,
+                    "message": {"role": "assistant", "content": content},
+                    "done": True,
+                    "prompt_eval_count": 1,
+                    "eval_count": self.tokens,
+                }
+            )
+        return _dumps(
+            {
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "model": model,
+                "choices": [
+                    {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}
+                ],
+                "usage": {"prompt_tokens": 1, "completion_tokens": self.tokens, "total_tokens": self.tokens + 1},
+            }
+        )
+
+
+def _dumps(obj: Any) -> bytes:
+    return json.dumps(obj, separators=(",", ":")).encode("utf-8")
+
+
+async def _respond(send, status: int, body: bytes) -> None:
+    await send(
+        {"type": "http.response.start", "status": status, "headers": [(b"content-type", b"application/json")]}
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+def serve(port: int, host: str = "127.0.0.1", **options: Any) -> None:
+    """Serve a :class:`MockBackend` with uvicorn (blocks; run it in a process)."""
+
+    import uvicorn
+
+    uvicorn.run(MockBackend(**options), host=host, port=port, log_level="warning", access_log=False)
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--kind", choices=KINDS, default="openai")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9001)
+    parser.add_argument("--ttft", type=float, default=0.05, help="Seconds to first token")
+    parser.add_argument("--tokens", type=int, default=32, help="Tokens per response")
+    parser.add_argument("--tokens-per-sec", type=float, default=200.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of requests answered with 500")
+    args = parser.parse_args()
+    serve(
+        args.port,
+        host=args.host,
+        kind=args.kind,
+        ttft=args.ttft,
+        tokens=args.tokens,
+        tokens_per_sec=args.tokens_per_sec,
+        error_rate=args.error_rate,
+    )
@@ -0,0 +1,99 @@
+"""Measure CPU spent turning a backend response into response bytes.
+
+Three paths are compared for non-streaming chat completions of growing size:
+
+* ``legacy`` – what the router did before: build ``ChatCompletionResponse``,
+  then let FastAPI validate it again against ``response_model``, convert it
+  to JSON-able data and encode it with ``json.dumps``.
+* ``validated`` – validate once and serialize the model straight to bytes.
+* ``trusted`` – backends marked ``trusted: true``: encode the dict as-is
+  (``orjson`` when installed).
+
+All paths produce the same bytes for schema-conforming responses; the script
+checks this before timing.
+
+Usage::
+
+    python -m benchmarks.response_serialization --iterations 200
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+from typing import Any, Callable, Dict
+
+from pydantic import TypeAdapter
+
+from dispatch import fastjson
+from schemas.chat import ChatCompletionResponse
+
+_RESPONSE_ADAPTER = TypeAdapter(ChatCompletionResponse)
+
+
+def _response(content_bytes: int, choices: int) -> Dict[str, Any]:
+    text = ("lorem ipsum dolor sit amet, " * (content_bytes // 28 + 1))[:content_bytes]
+    return {
+        "id": "chatcmpl-bench",
+        "object": "chat.completion",
+        "model": "bench",
+        "choices": [
+            {"index": i, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}
+            for i in range(choices)
+        ],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 1000, "total_tokens": 1010},
+    }
+
+
+def legacy(result: Dict[str, Any]) -> bytes:
+    validated = ChatCompletionResponse(**result)
+    # FastAPI's serialize_response: re-validate against response_model, dump
+    # to JSON-able Python data, then JSONResponse.render.
+    revalidated = _RESPONSE_ADAPTER.validate_python(validated, from_attributes=True)
+    content = _RESPONSE_ADAPTER.dump_python(revalidated, mode="json")
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def validated(result: Dict[str, Any]) -> bytes:
+    return ChatCompletionResponse.model_validate(result).model_dump_json().encode("utf-8")
+
+
+def trusted(result: Dict[str, Any]) -> bytes:
+    return fastjson.dumps(result)
+
+
+PATHS: Dict[str, Callable[[Dict[str, Any]], bytes]] = {
+    "legacy": legacy,
+    "validated": validated,
+    "trusted": trusted,
+}
+
+
+def _time(fn: Callable[[Dict[str, Any]], bytes], result: Dict[str, Any], iterations: int) -> float:
+    start = time.process_time()
+    for _ in range(iterations):
+        fn(result)
+    return (time.process_time() - start) / iterations
+
+
+def main(iterations: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for content_bytes, choices in ((1_000, 1), (64_000, 1), (256_000, 4)):
+        result = _response(content_bytes, choices)
+        expected = legacy(result)
+        assert all(fn(result) == expected for fn in PATHS.values()), "paths disagree"
+
+        timings = {name: _time(fn, result, iterations) for name, fn in PATHS.items()}
+        row = {f"{name}_us": round(t * 1e6, 1) for name, t in timings.items()}
+        row["validated_speedup"] = round(timings["legacy"] / timings["validated"], 2)
+        row["trusted_speedup"] = round(timings["legacy"] / timings["trusted"], 2)
+        results[f"{len(expected)}_bytes"] = row
+    return results
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+    print(json.dumps(main(args.iterations), indent=2))
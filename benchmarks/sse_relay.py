@@ -0,0 +1,100 @@
+"""Compare SSE relay throughput: line decode/re-encode vs. byte-level relay.
+
+Both implementations read the same upstream stream through an in-memory
+``httpx.Response``:
+
+* ``lines`` – the previous ``_stream_chat`` loop: ``aiter_lines()``, then an
+  f-string per event.
+* ``bytes`` – ``handlers.sse.SSERelay`` over ``aiter_bytes()``.
+
+Two read patterns are measured: one upstream read per event (token-by-token
+streaming) and large reads that carry many events at once.
+
+Usage::
+
+    python -m benchmarks.sse_relay --events 50000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import time
+from typing import AsyncIterator, Dict, List
+
+import httpx
+
+from handlers.sse import SSERelay
+
+_EVENT = (
+    b'data: {"id":"chatcmpl-bench","object":"chat.completion.chunk","model":"bench",'
+    b'"choices":[{"index":0,"delta":{"content":"token"},"finish_reason":null}]}\n\n'
+)
+
+
+def _reads(events: int, read_size: int | None) -> List[bytes]:
+    stream = _EVENT * events + b"data: [DONE]\n\n"
+    if read_size is None:
+        return [_EVENT] * events + [b"data: [DONE]\n\n"]
+    return [stream[i : i + read_size] for i in range(0, len(stream), read_size)]
+
+
+def _response(reads: List[bytes]) -> httpx.Response:
+    async def body() -> AsyncIterator[bytes]:
+        for read in reads:
+            yield read
+
+    return httpx.Response(200, content=body())
+
+
+async def lines(reads: List[bytes]) -> int:
+    count = 0
+    async for line in _response(reads).aiter_lines():
+        if not line:
+            continue
+        if not line.startswith("data:"):
+            line = f"data: {line}"
+        _ = line + "\n\n"
+        count += 1
+    return count
+
+
+async def relay(reads: List[bytes]) -> int:
+    count = 0
+    sse = SSERelay()
+    async for chunk in _response(reads).aiter_bytes():
+        events = sse.feed(chunk)
+        if events:
+            count += 1
+    if sse.flush():
+        count += 1
+    return count
+
+
+async def _events_per_sec(fn, reads: List[bytes], events: int) -> float:
+    await fn(reads[:100])  # warm up
+    start = time.perf_counter()
+    await fn(reads)
+    return events / (time.perf_counter() - start)
+
+
+async def main(events: int) -> Dict[str, Dict[str, float]]:
+    results: Dict[str, Dict[str, float]] = {}
+    for label, read_size in (("read_per_event", None), ("16k_reads", 16384)):
+        reads = _reads(events, read_size)
+        before = await _events_per_sec(lines, reads, events + 1)
+        after = await _events_per_sec(relay, reads, events + 1)
+        results[label] = {
+            "lines_events_per_sec": round(before),
+            "bytes_events_per_sec": round(after),
+            "speedup": round(after / before, 2),
+        }
+    return results
+
+
+if __name__ == "__main__":  # pragma: no cover
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--events", type=int, default=50000)
+    args = parser.parse_args()
+    print(json.dumps(asyncio.run(main(args.events)), indent=2))
@@ -7,12 +7,17 @@ Usage examples::
 
     # Quick chat completion call to the server
     genai-router chat --model llama3 "Hello!"
+
+    # Run a JSONL file of requests in-process (re-run to resume)
+    genai-router batch requests.jsonl results.jsonl --concurrency 16
 """
 
 from __future__ import annotations
 
+import asyncio
 import json
 import sys
+from pathlib import Path
 from typing import Optional
 
 import httpx
@@ -64,5 +69,36 @@ def chat(
             print(json.dumps(resp.json(), indent=2))
 
 
+@app.command()
+def batch(
+    input_path: Path = typer.Argument(..., exists=True, dir_okay=False, help="JSONL file of requests"),
+    output_path: Path = typer.Argument(..., dir_okay=False, help="JSONL file results are appended to"),
+    concurrency: Optional[int] = typer.Option(
+        None, "--concurrency", "-c", help="Requests in flight per backend [default: GENAI_BATCH_CONCURRENCY]"
+    ),
+    progress_interval: float = typer.Option(5.0, help="Seconds between progress lines (0 = off)"),
+):
+    """Run a batch of chat completions through the configured backends.
+
+    Results are appended to OUTPUT_PATH as they complete; running the same
+    command again skips requests whose custom_id is already there.
+    """
+    from config.settings import get_settings
+    from dispatch.batch import run_file
+
+    if concurrency is None:
+        concurrency = get_settings().batch_concurrency
+    stats = asyncio.run(
+        run_file(
+            input_path,
+            output_path,
+            concurrency=concurrency,
+            progress_interval=progress_interval,
+            echo=lambda line: print(line, file=sys.stderr),
+        )
+    )
+    print(json.dumps(stats.summary(), indent=2))
+
+
 if __name__ == "__main__":  # pragma: no cover
     app() 
\ No newline at end of file
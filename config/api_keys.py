@@ -0,0 +1,248 @@
+"""API key registry.
+
+Keys come from *GENAI_API_KEYS* / *GENAI_ADMIN_API_KEYS* (comma-separated,
+no metadata) and, optionally, a YAML file named by *GENAI_API_KEYS_FILE*
+with per-key metadata::
+
+    rate_limit_tiers:
+      free: "1/sec,100/day"
+      gold: "50/sec"
+    keys:
+      - key_sha256: 2c26b46b68ffc68ff99b453c1d30413413422d706483bfa0f98a5e886266e7ae
+        tenant: acme
+        models: ["llama3*", company-gpt]   # globs; default: every model
+        rate_limit: gold                   # tier; default: GENAI_RATE_LIMIT
+        priority: 5                        # admission priority (caps X-GenAI-Priority)
+      - key: plain-text-key                # accepted, hashed on load
+        tenant: ops
+        admin: true                        # may call /debug
+
+Only SHA-256 digests are kept (``printf %s "$KEY" | sha256sum`` gives the
+``key_sha256`` value).  A lookup hashes the presented token once and does a
+single dict lookup by digest, so its cost does not depend on the number of
+keys and plaintext keys are never compared.
+
+``APIKeyAuthMiddleware`` attaches the matching :class:`KeyIdentity` to the
+request (``request.state.identity``); rate limiting, model access, admission
+priority and request logs use it instead of looking at headers again.
+The registry is rebuilt when the settings change and reloaded with
+``reload_keys`` (see ``dispatch.config_reload``).
+"""
+
+from __future__ import annotations
+
+import fnmatch
+import hashlib
+import re
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Tuple
+
+import yaml
+
+from .settings import Settings, get_settings, parse_rate_limit
+
+Limits = Tuple[Tuple[int, int], ...]
+
+
+class KeyConfigError(ValueError):
+    """Raised when the API keys file cannot be loaded or is invalid."""
+
+
+def key_digest(key: str) -> bytes:
+    return hashlib.sha256(key.encode("utf-8")).digest()
+
+
+@dataclass(frozen=True)
+class KeyIdentity:
+    """Who a request authenticated as.
+
+    ``key_id`` (the first 12 hex digits of the key's SHA-256) is safe to
+    log and is the rate-limit bucket of the key.
+    """
+
+    key_id: str
+    tenant: str
+    models: Tuple[str, ...] | None = None
+    rate_limit_tier: str | None = None
+    rate_limit: Limits | None = None
+    priority: int | None = None
+    admin: bool = False
+    _model_pattern: re.Pattern[str] | None = field(default=None, repr=False, compare=False)
+
+    def allows(self, model: str) -> bool:
+        """Whether the key may use *model* (every model unless ``models`` is set)."""
+
+        return self._model_pattern is None or self._model_pattern.fullmatch(model) is not None
+
+
+def _split(keys: str | None) -> List[str]:
+    return [key.strip() for key in (keys or "").split(",") if key.strip()]
+
+
+def _key_id(digest: bytes) -> str:
+    return digest.hex()[:12]
+
+
+def _model_pattern(models: Iterable[str]) -> re.Pattern[str]:
+    return re.compile("|".join(f"(?:{fnmatch.translate(model)})" for model in models))
+
+
+def _file_identity(entry: Any, index: int, tiers: Mapping[str, Limits | None]) -> Tuple[bytes, KeyIdentity]:
+    where = f"keys[{index}]"
+    if not isinstance(entry, Mapping):
+        raise KeyConfigError(f"{where} must be a mapping")
+
+    if entry.get("key_sha256"):
+        try:
+            digest = bytes.fromhex(str(entry["key_sha256"]))
+        except ValueError:
+            digest = b""
+        if len(digest) != 32:
+            raise KeyConfigError(f"{where}: key_sha256 must be 64 hex digits")
+    elif entry.get("key"):
+        digest = key_digest(str(entry["key"]))
+    else:
+        raise KeyConfigError(f"{where} needs key_sha256 or key")
+
+    models = entry.get("models")
+    if models is not None:
+        if not isinstance(models, list) or not all(isinstance(model, str) for model in models):
+            raise KeyConfigError(f"{where}: models must be a list of names or globs")
+        models = tuple(models)
+
+    tier = entry.get("rate_limit")
+    if tier is not None and tier not in tiers:
+        raise KeyConfigError(f"{where}: unknown rate_limit tier '{tier}'")
+
+    priority = entry.get("priority")
+    if priority is not None and (not isinstance(priority, int) or isinstance(priority, bool)):
+        raise KeyConfigError(f"{where}: priority must be an integer")
+
+    key_id = _key_id(digest)
+    return digest, KeyIdentity(
+        key_id=key_id,
+        tenant=str(entry.get("tenant") or key_id),
+        models=models,
+        rate_limit_tier=tier,
+        rate_limit=tiers.get(tier) if tier is not None else None,
+        priority=priority,
+        admin=bool(entry.get("admin", False)),
+        _model_pattern=_model_pattern(models) if models is not None else None,
+    )
+
+
+def _load_file(path: Path) -> Dict[bytes, KeyIdentity]:
+    try:
+        with path.open("r", encoding="utf-8") as f:
+            data = yaml.safe_load(f) or {}
+    except (OSError, yaml.YAMLError) as exc:
+        raise KeyConfigError(f"cannot load API keys file {path}: {exc}") from exc
+    if not isinstance(data, Mapping):
+        raise KeyConfigError(f"{path}: expected a mapping")
+
+    raw_tiers = data.get("rate_limit_tiers") or {}
+    if not isinstance(raw_tiers, Mapping):
+        raise KeyConfigError("rate_limit_tiers must be a mapping")
+    tiers: Dict[str, Limits | None] = {}
+    for name, spec in raw_tiers.items():
+        parsed = parse_rate_limit(str(spec)) if spec else None
+        if spec and not parsed:
+            raise KeyConfigError(f"rate_limit_tiers.{name}: cannot parse '{spec}'")
+        # An empty tier means "no limit" (unlike a key without a tier).
+        tiers[str(name)] = tuple(parsed) if parsed else ()
+
+    entries = data.get("keys") or []
+    if not isinstance(entries, list):
+        raise KeyConfigError("keys must be a list")
+    identities: Dict[bytes, KeyIdentity] = {}
+    for index, entry in enumerate(entries):
+        digest, identity = _file_identity(entry, index, tiers)
+        if digest in identities:
+            raise KeyConfigError(f"keys[{index}]: duplicate key")
+        identities[digest] = identity
+    return identities
+
+
+class KeyRegistry:
+    """Immutable map of key digests to :class:`KeyIdentity`."""
+
+    __slots__ = ("settings", "_identities", "auth_required", "has_admin")
+
+    def __init__(self, settings: Settings, identities: Dict[bytes, KeyIdentity]) -> None:
+        self.settings = settings
+        self._identities = identities
+        # Admin keys alone do not turn authentication on (they guard /debug).
+        self.auth_required = any(not identity.admin for identity in identities.values()) or bool(
+            _split(settings.api_keys)
+        )
+        self.has_admin = any(identity.admin for identity in identities.values())
+
+    def __len__(self) -> int:
+        return len(self._identities)
+
+    @classmethod
+    def load(cls, settings: Settings) -> KeyRegistry:
+        """Build the registry from *settings* (and the keys file it names)."""
+
+        identities: Dict[bytes, KeyIdentity] = {}
+        for key in _split(settings.api_keys):
+            digest = key_digest(key)
+            identities[digest] = KeyIdentity(key_id=_key_id(digest), tenant=_key_id(digest))
+        if settings.api_keys_file:
+            identities.update(_load_file(Path(settings.api_keys_file)))
+        for key in _split(settings.admin_api_keys):
+            digest = key_digest(key)
+            existing = identities.get(digest)
+            identities[digest] = (
+                replace(existing, admin=True)
+                if existing
+                else KeyIdentity(key_id=_key_id(digest), tenant=_key_id(digest), admin=True)
+            )
+        return cls(settings, identities)
+
+    def lookup(self, token: str | None) -> KeyIdentity | None:
+        if not token:
+            return None
+        return self._identities.get(key_digest(token))
+
+
+def token_from_headers(headers: Mapping[str, str]) -> str | None:
+    """API key from ``Authorization: Bearer <key>`` or ``X-API-Key``."""
+
+    auth_header = headers.get("authorization")
+    if auth_header and auth_header.lower().startswith("bearer "):
+        return auth_header[7:].strip()
+    api_key_header = headers.get("x-api-key")
+    return api_key_header.strip() if api_key_header else None
+
+
+_registry: KeyRegistry | None = None
+
+
+def get_key_registry() -> KeyRegistry:
+    """Return the registry for the current settings, loading it if needed."""
+
+    global _registry
+    registry = _registry
+    settings = get_settings()
+    if registry is None or registry.settings is not settings:
+        registry = _registry = KeyRegistry.load(settings)
+    return registry
+
+
+def reload_keys() -> KeyRegistry:
+    """Re-read the API keys (and keys file) and swap the registry in.
+
+    Raises:
+        KeyConfigError: the keys file is invalid; the current registry stays.
+    """
+
+    global _registry
+    registry = _registry = KeyRegistry.load(get_settings())
+    return registry
+
+
+def keys_file_path() -> Path | None:
+    path = get_settings().api_keys_file
+    return Path(path) if path else None
@@ -1,8 +1,31 @@
 """Backend routing configuration loader.
 
-Reads the `backends.yaml` file once and caches the content to provide fast
-resolution of *model name → backend definition*.  Falls back to the
-environment-driven Ollama default if no configuration is found.
+``backends.yaml`` is compiled into an immutable :class:`RoutingTable`: model
+name → backend object map, each backend with its ``fallbacks`` already
+resolved, per-model limits and a prerendered ``/v1/models`` payload.  Falls
+back to the environment-driven Ollama default if no configuration is found.
+
+Besides exact names under ``routing:``, models can be matched by rules::
+
+    routing_rules:
+      - {prefix: "llama3:", backend: ollama}
+      - {glob: "mistral*-instruct", backend: ollama}
+      - {regex: "gpt-4(o|-turbo)?(-\\d{4}-\\d{2}-\\d{2})?", backend: http-mcp}
+
+Precedence is explicit: an exact name wins, then the longest matching
+prefix (a glob whose only wildcard is a trailing ``*`` counts as a prefix),
+then the first glob or regex (in list order) that matches the whole name,
+then a backend that reported serving the model (``dispatch.discovery``),
+then ``default_backend``.  Rules are compiled into a prefix trie and a
+single combined regex, and each resolved name is memoized per table.
+
+:func:`reload_config` validates a new version of the file (including the
+balancer, pool, hedge and concurrency options of every backend) and swaps
+the active table in one assignment; a broken file leaves the old table in
+place.  :func:`load_config` and :func:`activate` split the two steps.
+Requests hold on to the backend objects they resolved, so a reload never
+changes the routing of a request that is already running (see
+``dispatch.config_reload`` for the SIGHUP / file watcher).
 
 This tiny helper keeps routing logic isolated from FastAPI routes and is
 covered by unit-tests in ``tests/test_backend_loader.py``.
@@ -10,55 +33,525 @@ covered by unit-tests in ``tests/test_backend_loader.py``.
 
 from __future__ import annotations
 
-from functools import lru_cache
+import fnmatch
+import re
 from pathlib import Path
-from typing import Dict, Any
+from types import MappingProxyType
+from typing import Any, Dict, List, Mapping, NoReturn, Tuple
 
 import yaml
 
+from schemas.models import ModelInfo, ModelList
+
 from .settings import get_settings
 
 CONFIG_FILE_NAME = "backends.yaml"
 
+BACKEND_TYPES = ("ollama", "http")
+
+# Model listed when running without a config file (single Ollama backend).
+DEFAULT_MODEL = "llama3"
+
+RULE_KINDS = ("prefix", "glob", "regex")
+
+# Resolved model names remembered per table (clients can send any name).
+RESOLVE_MEMO_SIZE = 4096
+
+
+class ConfigError(ValueError):
+    """Raised when ``backends.yaml`` cannot be loaded or is inconsistent."""
+
+
+class Backend(dict):
+    """A compiled, read-only backend entry.
+
+    Behaves like the YAML mapping it came from (plus ``name``);
+    ``fallback_entries`` holds the :class:`Backend` objects named under
+    ``fallbacks`` in the same table.
+    """
+
+    __slots__ = ("fallback_entries",)
+
+    def __init__(self, *args: Any, **kwargs: Any) -> None:
+        super().__init__(*args, **kwargs)
+        self.fallback_entries: Tuple[Backend, ...] = ()
+
+    def _readonly(self, *args: Any, **kwargs: Any) -> NoReturn:
+        raise TypeError("backend entries are read-only; edit backends.yaml and reload")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly  # type: ignore[assignment]
+
+
+def config_path() -> Path:
+    return Path(__file__).parent / CONFIG_FILE_NAME
+
 
-@lru_cache()
 def _load_raw_config() -> Dict[str, Any]:
-    """Load the backend configuration YAML once and cache it."""
-    config_path = Path(__file__).parent / CONFIG_FILE_NAME
-    if not config_path.exists():
+    """Parse the backend configuration YAML (empty dict if there is none)."""
+
+    path = config_path()
+    if not path.exists():
         # Return empty dict → fallback to default Ollama backend
         return {}
 
-    with config_path.open("r", encoding="utf-8") as f:
-        data = yaml.safe_load(f) or {}
-    return data
+    with path.open("r", encoding="utf-8") as f:
+        return yaml.safe_load(f) or {}
+
+
+def _mapping(value: Any, what: str) -> Mapping[str, Any]:
+    if value is None:
+        return {}
+    if not isinstance(value, Mapping):
+        raise ConfigError(f"{what} must be a mapping")
+    return value
+
+
+class _PrefixTrie:
+    """Prefix lookups over model names (nested dicts, one per char)."""
+
+    __slots__ = ("_root",)
+
+    _VALUE = object()
+
+    def __init__(self) -> None:
+        self._root: Dict[Any, Any] = {}
+
+    def __bool__(self) -> bool:
+        return bool(self._root)
+
+    def add(self, prefix: str, value: Any) -> None:
+        node = self._root
+        for char in prefix:
+            node = node.setdefault(char, {})
+        # The first rule for a prefix wins, like everywhere else.
+        node.setdefault(self._VALUE, value)
+
+    def longest(self, name: str) -> Any:
+        """Value of the longest prefix of *name* (``None`` if there is none)."""
+
+        node = self._root
+        found = node.get(self._VALUE)
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            found = node.get(self._VALUE, found)
+        return found
+
+    def along(self, name: str) -> List[Any]:
+        """Values of every prefix of *name*, shortest first."""
+
+        node = self._root
+        found = [node[self._VALUE]] if self._VALUE in node else []
+        for char in name:
+            node = node.get(char)
+            if node is None:
+                break
+            if self._VALUE in node:
+                found.append(node[self._VALUE])
+        return found
+
+
+_GLOB_META = re.compile(r"[*?\[]")
+_REGEX_LITERAL = re.compile(r"[A-Za-z0-9_:/@=,# -]*")
+
+
+def _top_level_alternation(pattern: str) -> bool:
+    depth, escaped, in_class = 0, False, False
+    for char in pattern:
+        if escaped:
+            escaped = False
+        elif char == "\\":
+            escaped = True
+        elif in_class:
+            in_class = char != "]"
+        elif char == "[":
+            in_class = True
+        elif char == "(":
+            depth += 1
+        elif char == ")":
+            depth -= 1
+        elif char == "|" and depth == 0:
+            return True
+    return False
+
+
+def _literal_prefix(kind: str, value: str) -> str:
+    """Text every name matched by a glob / regex rule must start with."""
+
+    if kind == "glob":
+        return _GLOB_META.split(value, 1)[0]
+    if _top_level_alternation(value):
+        return ""
+    value = value[1:] if value.startswith("^") else value
+    prefix = _REGEX_LITERAL.match(value).group()  # type: ignore[union-attr]
+    if prefix != value and value[len(prefix)] in "?*{":
+        prefix = prefix[:-1]  # the last char is optional
+    return prefix
+
+
+_LEADING_FLAGS = re.compile(r"\(\?([aiLmsux]+)\)")
+
+
+def _scope_flags(pattern: str) -> str:
+    """Turn leading ``(?i)`` style flags into ``(?i:...)`` so *pattern* can be combined."""
+
+    match = _LEADING_FLAGS.match(pattern)
+    return f"(?{match.group(1)}:{pattern[match.end():]})" if match else pattern
+
+
+class _RuleMatcher:
+    """Compiled ``routing_rules``.
+
+    Prefix rules live in a trie (longest prefix wins).  Glob and regex rules
+    are indexed by their literal prefix in a second trie, so only rules that
+    can match a name are tried; rules without one are combined into a single
+    regex.  Either way the earliest matching rule wins.
+    """
+
+    __slots__ = ("prefixes", "_indexed", "_unindexed", "_patterns", "_targets")
+
+    def __init__(self, rules: List[Tuple[str, str, Any]]) -> None:
+        self.prefixes = _PrefixTrie()
+        self._indexed = _PrefixTrie()
+        self._patterns: List[re.Pattern[str]] = []
+        self._targets: List[Any] = []
+        by_prefix: Dict[str, List[int]] = {}
+        unindexed: List[str] = []
+        for kind, value, target in rules:
+            if kind == "glob" and value.endswith("*") and not _GLOB_META.search(value[:-1]):
+                kind, value = "prefix", value[:-1]
+            if kind == "prefix":
+                self.prefixes.add(value, target)
+                continue
+            index = len(self._patterns)
+            pattern = fnmatch.translate(value) if kind == "glob" else value
+            self._patterns.append(re.compile(pattern))
+            self._targets.append(target)
+            prefix = _literal_prefix(kind, value)
+            if prefix:
+                by_prefix.setdefault(prefix, []).append(index)
+            else:
+                unindexed.append(f"(?P<_r{index}>{_scope_flags(pattern)})")
+        for prefix, indices in by_prefix.items():
+            self._indexed.add(prefix, indices)
+        # ``lastgroup`` names the first alternative that matched the whole name.
+        self._unindexed = re.compile("|".join(unindexed)) if unindexed else None
+
+    def match(self, name: str) -> Any:
+        if self.prefixes:
+            target = self.prefixes.longest(name)
+            if target is not None:
+                return target
+        first = len(self._patterns)
+        if self._unindexed is not None:
+            match = self._unindexed.fullmatch(name)
+            if match is not None:
+                first = int(match.lastgroup[2:])  # type: ignore[index]
+        if self._indexed:
+            for index in sorted(i for indices in self._indexed.along(name) for i in indices):
+                if index > first:
+                    break
+                if self._patterns[index].fullmatch(name):
+                    return self._targets[index]
+        return self._targets[first] if first < len(self._targets) else None
+
+
+def _compile_rules(raw_rules: Any, lookup: Any) -> _RuleMatcher:
+    if raw_rules is None:
+        raw_rules = []
+    if not isinstance(raw_rules, list):
+        raise ConfigError("'routing_rules' must be a list")
+    rules = []
+    for index, rule in enumerate(raw_rules):
+        where = f"routing_rules[{index}]"
+        rule = _mapping(rule, where)
+        kinds = [kind for kind in RULE_KINDS if kind in rule]
+        if len(kinds) != 1 or not isinstance(rule[kinds[0]], str):
+            raise ConfigError(f"{where} needs exactly one of {', '.join(RULE_KINDS)} (a string)")
+        kind, value = kinds[0], rule[kinds[0]]
+        if kind == "regex":
+            try:
+                pattern = re.compile(value)
+            except re.error as exc:
+                raise ConfigError(f"{where}: invalid regex: {exc}") from exc
+            if pattern.groupindex.keys() & {f"_r{i}" for i in range(len(raw_rules))} or re.search(r"\\\d", value):
+                raise ConfigError(f"{where}: numbered back-references and _rN group names are not supported")
+        rules.append((kind, value, lookup(rule.get("backend"), where)))
+    return _RuleMatcher(rules)
+
+
+def _check_options(where: str, entry: Mapping[str, Any], *, backend: bool = True) -> None:
+    """Build what dispatch creates lazily from *entry*, so bad options fail the load.
+
+    *entry* is a backend, or a ``model_limits`` section if *backend* is false.
+
+    Otherwise a typo such as ``balancer: bogus`` would only surface as a 502
+    on every request to the backend.
+    """
+
+    # Imported here: these modules import this one.
+    from dispatch import adaptive, balancer, health, hedging, limits
+    from handlers import client_pool
+
+    try:
+        if entry.get("max_concurrency"):
+            int(entry["max_concurrency"])
+            limits.queue_options(entry)
+        if not backend:
+            return
+        balancer.make_policy(entry.get("balancer", balancer.DEFAULT_POLICY))
+        health.breaker_options(_mapping(entry.get("circuit_breaker"), "circuit_breaker"))
+        hedging.hedge_options(entry)
+        if entry.get("adaptive_concurrency"):
+            section = _mapping(entry["adaptive_concurrency"], "adaptive_concurrency")
+            adaptive.make_algorithm(section)
+            limits.queue_options(section)
+        if entry["type"] == "http":
+            client_pool.pool_options(entry)
+    except (TypeError, ValueError) as exc:
+        raise ConfigError(f"{where}: {exc}") from exc
+
+
+class RoutingTable:
+    """Immutable, precompiled view of one version of ``backends.yaml``."""
+
+    __slots__ = (
+        "raw",
+        "backends",
+        "routes",
+        "rules",
+        "default",
+        "discovered",
+        "model_limits",
+        "models",
+        "models_payload",
+        "_memo",
+    )
+
+    def __init__(self, raw: Mapping[str, Any]) -> None:
+        raw = _mapping(raw, "the configuration")
+        backends: Dict[str, Backend] = {}
+        for key, entry in _mapping(raw.get("backends"), "'backends'").items():
+            entry = _mapping(entry, f"backend '{key}'")
+            if entry.get("type") not in BACKEND_TYPES:
+                raise ConfigError(f"backend '{key}': type must be one of {', '.join(BACKEND_TYPES)}")
+            if entry["type"] == "http" and not (entry.get("base_url") or entry.get("replicas")):
+                raise ConfigError(f"backend '{key}': http backends need base_url or replicas")
+            # Let each backend entry know its own key (used for metrics/limits).
+            backends[key] = Backend(entry, name=entry.get("name", key))
+            _check_options(f"backend '{key}'", backends[key])
+
+        def lookup(key: Any, where: str) -> Backend:
+            if key not in backends:
+                raise ConfigError(f"{where} refers to unknown backend '{key}'")
+            return backends[key]
+
+        for key, backend in backends.items():
+            backend.fallback_entries = tuple(
+                lookup(name, f"backend '{key}' fallbacks") for name in backend.get("fallbacks") or ()
+            )
+
+        routes = {
+            str(model): lookup(key, f"routing for '{model}'")
+            for model, key in _mapping(raw.get("routing"), "'routing'").items()
+        }
+        rules = _compile_rules(raw.get("routing_rules"), lookup)
+        default_key = raw.get("default_backend")
+        if raw:
+            default = lookup(default_key, "default_backend") if default_key is not None else None
+        else:
+            # No YAML file → single Ollama backend (URL from GENAI_OLLAMA_BASE_URL).
+            default = Backend(name="ollama", type="ollama")
+            routes = {DEFAULT_MODEL: default}
+
+        model_limits = {
+            str(model): dict(_mapping(options, f"model_limits for '{model}'"))
+            for model, options in _mapping(raw.get("model_limits"), "'model_limits'").items()
+        }
+        for model, options in model_limits.items():
+            _check_options(f"model_limits for '{model}'", options, backend=False)
+
+        self.raw = raw
+        self.backends: Mapping[str, Backend] = MappingProxyType(backends)
+        # Plain dict on purpose: ``resolve`` is on every request's path.
+        self.routes: Dict[str, Backend] = routes
+        self.rules = rules
+        self.default = default
+        self.model_limits: Mapping[str, Dict[str, Any]] = MappingProxyType(model_limits)
+        self._set_discovered({})
+
+    def _set_discovered(self, discovered: Dict[str, Backend]) -> None:
+        self.discovered = discovered
+        self._memo: Dict[str, Backend] = {}
+        # Without a config file the ``llama3`` placeholder is only listed
+        # until the Ollama backend reported what it really serves.
+        listed = dict(self.routes) if self.raw or not discovered else {}
+        for model, backend in discovered.items():
+            listed.setdefault(model, backend)
+        self.models: Tuple[str, ...] = tuple(listed)
+        self.models_payload: bytes = ModelList(
+            data=[ModelInfo(id=model, owned_by=backend.get("type", "backend")) for model, backend in listed.items()]
+        ).model_dump_json().encode()
+
+    @property
+    def sources(self) -> Mapping[str, Backend]:
+        """Backends to discover models from (the implicit Ollama one without a config)."""
 
+        if self.backends or self.default is None:
+            return self.backends
+        return {self.default["name"]: self.default}
 
-def resolve_backend(model_name: str) -> Dict[str, Any]:
+    def with_discovered(self, models_by_backend: Mapping[str, Any]) -> RoutingTable:
+        """Copy of this table that also routes the models backends reported.
+
+        *models_by_backend* maps backend keys to model names; when several
+        backends serve a model, the one listed first in the config wins.
+        """
+
+        discovered: Dict[str, Backend] = {}
+        for key, backend in self.sources.items():
+            for model in models_by_backend.get(key) or ():
+                discovered.setdefault(model, backend)
+        table = object.__new__(RoutingTable)
+        for slot in ("raw", "backends", "routes", "rules", "default", "model_limits"):
+            setattr(table, slot, getattr(self, slot))
+        table._set_discovered(discovered)
+        return table
+
+    def resolve(self, model_name: str) -> Backend:
+        backend = self.routes.get(model_name)
+        if backend is None:
+            backend = self._memo.get(model_name)
+            if backend is None:
+                backend = self.rules.match(model_name) or self.discovered.get(model_name) or self.default
+                if backend is None:
+                    raise ValueError(f"No backend configured for model '{model_name}' and no default backend set")
+                if len(self._memo) >= RESOLVE_MEMO_SIZE:
+                    self._memo.clear()
+                self._memo[model_name] = backend
+        return backend
+
+
+_table: RoutingTable | None = None
+
+# Backend key -> model names reported by the backend (dispatch.discovery).
+_discovered: Mapping[str, Any] = {}
+
+
+def _compile(raw: Mapping[str, Any]) -> RoutingTable:
+    table = RoutingTable(raw)
+    return table.with_discovered(_discovered) if _discovered else table
+
+
+def get_routing_table() -> RoutingTable:
+    """Return the active routing table, compiling the config on first use."""
+
+    global _table
+    table = _table
+    if table is None:
+        table = _table = _compile(_load_raw_config())
+    return table
+
+
+def set_discovered_models(models_by_backend: Mapping[str, Any]) -> RoutingTable:
+    """Make the active table route the models each backend reported.
+
+    The discovered models survive config reloads (for backends that still
+    exist).
+    """
+
+    global _table, _discovered
+    _discovered = dict(models_by_backend)
+    table = _table = get_routing_table().with_discovered(_discovered)
+    return table
+
+
+def load_config() -> RoutingTable:
+    """Re-read and validate ``backends.yaml`` without activating it.
+
+    Raises:
+        ConfigError: the file is unreadable or invalid.
+    """
+
+    try:
+        return RoutingTable(_load_raw_config())
+    except ConfigError:
+        raise
+    except (OSError, yaml.YAMLError) as exc:
+        raise ConfigError(f"cannot load {CONFIG_FILE_NAME}: {exc}") from exc
+
+
+def activate(table: RoutingTable) -> RoutingTable:
+    """Make *table* (from :func:`load_config`) the active routing table."""
+
+    global _table
+    table = _table = table.with_discovered(_discovered) if _discovered else table
+    return table
+
+
+def reload_config() -> RoutingTable:
+    """Re-read and validate ``backends.yaml``, then make it the active table.
+
+    Raises:
+        ConfigError: the file is unreadable or invalid; the current table
+            stays active.
+    """
+
+    return activate(load_config())
+
+
+def resolve_backend(model_name: str) -> Backend:
     """Return backend settings dict for a given model name.
 
     If no explicit mapping exists, use the `default_backend` entry or fall back
     to the built-in Ollama base URL from environment variables.
     """
 
-    raw_cfg = _load_raw_config()
+    return get_routing_table().resolve(model_name)
 
-    if not raw_cfg:
-        # No YAML file → single Ollama backend
-        return {
-            "type": "ollama",
-            "base_url": get_settings().ollama_base_url,
-        }
 
-    backends: Dict[str, Any] = raw_cfg.get("backends", {})
-    default_backend_key: str | None = raw_cfg.get("default_backend")
+def backend_urls(backend: Mapping[str, Any]) -> list[str]:
+    """Return the replica base URLs of a backend definition.
+
+    A backend either lists ``replicas`` or a single ``base_url``.  Ollama
+    backends without either fall back to *GENAI_OLLAMA_BASE_URL*.
+    """
+
+    replicas = backend.get("replicas")
+    if replicas:
+        return [str(url) for url in replicas]
+    if backend.get("base_url"):
+        return [backend["base_url"]]
+    if backend.get("type") == "ollama":
+        return [get_settings().ollama_base_url]
+    return []
+
 
-    backend_key: str | None = raw_cfg.get("routing", {}).get(model_name, default_backend_key)
+def fallback_backends(backend: Mapping[str, Any]) -> list[Mapping[str, Any]]:
+    """Return the backends listed under ``fallbacks`` of *backend*, in order.
+
+    Compiled entries answer from their own table, so a request keeps its
+    fallbacks across a reload.
+    """
 
-    if backend_key is None or backend_key not in backends:
-        raise ValueError(f"No backend configured for model '{model_name}' and no default backend set")
+    if isinstance(backend, Backend):
+        return list(backend.fallback_entries)
+    backends = get_backends()
+    return [backends[key] for key in backend.get("fallbacks") or [] if key in backends]
 
-    return backends[backend_key]
+
+def get_backends() -> Mapping[str, Backend]:
+    """Return the ``backends`` section of the configuration (may be empty)."""
+
+    return get_routing_table().backends
+
+
+def get_model_limits() -> Mapping[str, Dict[str, Any]]:
+    """Return the per-model concurrency limits from ``model_limits``."""
+
+    return get_routing_table().model_limits
 
 
 def list_models() -> list[str]:
@@ -67,9 +560,4 @@ def list_models() -> list[str]:
     This is a lightweight convenience wrapper used by the `/v1/models` route.
     """
 
-    raw_cfg = _load_raw_config()
-
-    if not raw_cfg:
-        return ["llama3"]
-
-    return list(raw_cfg.get("routing", {}).keys()) 
\ No newline at end of file
+    return list(get_routing_table().models)
@@ -8,48 +8,137 @@ class Settings(BaseSettings):
 
     ollama_base_url: str = "http://localhost:11434"
     api_keys: str | None = None  # Comma-separated list of accepted keys
-    # e.g. "60/min" or "100/hour". Empty → no rate limiting.
+    # Keys allowed to call the /debug endpoints (disabled when empty).
+    admin_api_keys: str | None = None
+    # YAML file with hashed keys and per-key metadata (see config/api_keys.py).
+    api_keys_file: str | None = None
+    # e.g. "60/min" or "10/sec,1000/hour". Empty → no rate limiting.
     rate_limit: str | None = None
+    # Hard cap on clients tracked by the rate limiter (least recently seen
+    # clients are evicted first).
+    rate_limit_max_clients: int = 100_000
+    # Where limiter state lives: "memory" (per process), "shm" (shared by the
+    # workers on one host) or "redis://host:port/db" (shared across hosts).
+    rate_limit_store: str = "memory"
+    rate_limit_shm_path: str | None = None
+    # Response cache byte budget (0 disables the cache), default TTL in
+    # seconds and optional per-model TTLs, e.g. "llama3=60,company-gpt=600".
+    cache_max_bytes: int = 64 * 1024 * 1024
+    cache_ttl: float = 300.0
+    cache_model_ttls: str | None = None
+    # Share one upstream call between identical in-flight deterministic
+    # (temperature 0) requests; chunks of a shared stream kept for late
+    # joiners and slow subscribers.
+    coalesce_requests: bool = True
+    coalesce_max_chunks: int = 1024
+    # Active health checks (interval 0 disables) and circuit breaker defaults.
+    health_check_interval: float = 10.0
+    health_check_timeout: float = 2.0
+    breaker_failure_threshold: int = 5
+    breaker_recovery_time: float = 30.0
+    # Retries/failover: attempts per request (1 disables) and the global
+    # retry budget (fraction of requests plus a per-second floor).
+    retry_max_attempts: int = 2
+    retry_budget_ratio: float = 0.1
+    retry_budget_min_per_sec: float = 1.0
+    # Hedging defaults for backends with ``hedge: true``.
+    hedge_percentile: float = 95.0
+    hedge_min_delay: float = 0.05
+    hedge_min_samples: int = 20
+    # Admission queue defaults for backends/models with ``max_concurrency``.
+    limiter_max_queue: int = 100
+    limiter_queue_timeout: float = 30.0
+    # Merge streamed SSE events into fewer frames: window in milliseconds
+    # (0 disables), per-model windows like "llama3=20" and a frame size cap.
+    stream_coalesce_ms: float = 0.0
+    stream_coalesce_models: str | None = None
+    stream_coalesce_max_bytes: int = 8192
+    # Requests in flight per backend for batch jobs (/v1/batch, cli batch).
+    batch_concurrency: int = 8
+    # Distinct model names used as metric labels; later ones become "other".
+    metrics_max_models: int = 100
+    # Seconds between event-loop lag probes (0 disables the probe).
+    loop_lag_interval: float = 0.5
+    # Seconds between checks of backends.yaml for changes (0 disables; SIGHUP
+    # always reloads).
+    config_watch_interval: float = 2.0
+    # Model discovery from the backends (/api/tags, /v1/models); interval 0
+    # disables it.  A backend's models are dropped after ttl without answer.
+    model_discovery_interval: float = 30.0
+    model_discovery_ttl: float = 120.0
 
     @property
-    def allowed_api_keys(self) -> set[str]:
-        """Return a set of allowed API keys.
+    def parsed_rate_limit(self) -> list[tuple[int, int]] | None:
+        """Return `[(max_requests, window_seconds), ...]` if rate limiting is configured.
 
-        If the *GENAI_API_KEYS* env-var is unset or empty, authentication is
-        disabled and the returned set is empty.
+        Several limits may be given comma-separated, e.g. ``"10/sec,1000/hour"``;
+        a request must satisfy all of them.  Malformed entries are ignored.
         """
 
-        if not self.api_keys:
-            return set()
+        return parse_rate_limit(self.rate_limit)
 
-        # Split on comma and strip whitespace.
-        return {k.strip() for k in self.api_keys.split(",") if k.strip()}
+    @property
+    def parsed_cache_model_ttls(self) -> dict[str, float]:
+        """Return a ``{model: ttl_seconds}`` mapping from *GENAI_CACHE_MODEL_TTLS*."""
+
+        return _parse_model_floats(self.cache_model_ttls)
 
     @property
-    def parsed_rate_limit(self) -> tuple[int, int] | None:
-        """Return `(max_requests, window_seconds)` if rate limiting is configured."""
+    def parsed_stream_coalesce_models(self) -> dict[str, float]:
+        """Return a ``{model: window_ms}`` mapping from *GENAI_STREAM_COALESCE_MODELS*."""
+
+        return _parse_model_floats(self.stream_coalesce_models)
+
+    class Config:
+        env_prefix = "GENAI_"
+        case_sensitive = False
+
 
-        if not self.rate_limit:
-            return None
+def parse_rate_limit(value: str | None) -> list[tuple[int, int]] | None:
+    """Parse ``"10/sec,1000/hour"`` into ``[(max_requests, window_seconds), ...]``."""
 
+    if not value:
+        return None
+
+    limits: list[tuple[int, int]] = []
+    for item in value.split(","):
         try:
-            amount, per = self.rate_limit.split("/")
+            amount, per = item.strip().split("/")
             max_req = int(amount)
-            if per == "sec":
+            per = per.strip().lower()
+            if per in ("s", "sec", "second"):
                 window = 1
-            elif per == "min" or per == "minute":
+            elif per in ("m", "min", "minute"):
                 window = 60
-            elif per == "hour":
+            elif per in ("h", "hour"):
                 window = 3600
+            elif per == "day":
+                window = 86400
             else:
                 window = int(per)
-            return max_req, window
-        except Exception:  # pragma: no cover
-            return None
+        except ValueError:
+            continue
+        if max_req > 0 and window > 0:
+            limits.append((max_req, window))
+    return limits or None
 
-    class Config:
-        env_prefix = "GENAI_"
-        case_sensitive = False
+
+def _parse_model_floats(value: str | None) -> dict[str, float]:
+    """Parse ``"model=value,other=value"`` into a dict, skipping bad items."""
+
+    if not value:
+        return {}
+
+    parsed: dict[str, float] = {}
+    for item in value.split(","):
+        model, sep, number = item.partition("=")
+        if not sep or not model.strip():
+            continue
+        try:
+            parsed[model.strip()] = float(number)
+        except ValueError:
+            continue
+    return parsed
 
 
 @lru_cache()
@@ -0,0 +1,7 @@
+"""Runtime diagnostics for the router process.
+
+Admin-only ``/debug`` endpoints (see :mod:`diagnostics.routes`) expose a
+time-boxed CPU profiler, event-loop lag and task statistics, and a
+tracemalloc allocation diff.  Apart from the cheap loop lag probe nothing
+runs until an endpoint is called.
+"""
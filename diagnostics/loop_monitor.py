@@ -0,0 +1,103 @@
+"""Event-loop lag probe and task statistics.
+
+:class:`LoopLagMonitor` runs one background task that sleeps for
+*interval* seconds and records how late it wakes up.  Anything that blocks
+the loop (CPU-heavy parsing, synchronous I/O) shows up as lag, and every
+request on the process waits that long.  Recent samples are kept for
+percentiles and each one is observed in ``genai_event_loop_lag_seconds``.
+
+The probe costs one timer wake-up per interval (default 0.5 s, see
+*GENAI_LOOP_LAG_INTERVAL*).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import collections
+import math
+from typing import Any, Deque, Dict, List
+
+from dispatch import metrics
+
+
+class LoopLagMonitor:
+    """Background probe of event-loop scheduling lag."""
+
+    def __init__(self, interval: float = 0.5, window: int = 1200) -> None:
+        self.interval = interval
+        self.samples: Deque[float] = collections.deque(maxlen=window)
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.get_running_loop().create_task(self._run(), name="genai-loop-lag-probe")
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.samples.append(lag)
+            metrics.EVENT_LOOP_LAG.observe(lag)
+
+    def summary(self) -> Dict[str, Any]:
+        """Lag percentiles (milliseconds) over the retained samples."""
+
+        ordered = sorted(self.samples)
+        result: Dict[str, Any] = {
+            "running": self.running,
+            "interval_s": self.interval,
+            "samples": len(ordered),
+            "window_s": round(len(ordered) * self.interval, 1),
+        }
+        for name, pct in (("p50", 50), ("p90", 90), ("p99", 99)):
+            result[f"{name}_ms"] = _ms(_percentile(ordered, pct))
+        result["max_ms"] = _ms(ordered[-1] if ordered else None)
+        return result
+
+
+def _percentile(ordered: List[float], pct: float) -> float | None:
+    if not ordered:
+        return None
+    return ordered[min(len(ordered) - 1, max(0, math.ceil(pct / 100 * len(ordered)) - 1))]
+
+
+def _ms(value: float | None) -> float | None:
+    return None if value is None else round(value * 1000, 3)
+
+
+def task_counts() -> Dict[str, int]:
+    """Live asyncio tasks on the running loop grouped by coroutine, most first."""
+
+    counts: collections.Counter[str] = collections.Counter()
+    for task in asyncio.all_tasks():
+        coro = task.get_coro()
+        name = getattr(coro, "__qualname__", None) or type(coro).__name__
+        module = getattr(getattr(coro, "cr_code", None), "co_filename", "")
+        counts[f"{name} ({module.rsplit('/', 1)[-1]})" if module else name] += 1
+    return dict(counts.most_common())
+
+
+_monitor: LoopLagMonitor | None = None
+
+
+def get_loop_monitor() -> LoopLagMonitor:
+    """Return the process-wide monitor (configured from settings)."""
+
+    global _monitor
+    if _monitor is None:
+        from config.settings import get_settings
+
+        _monitor = LoopLagMonitor(get_settings().loop_lag_interval)
+    return _monitor
@@ -0,0 +1,71 @@
+"""Time-boxed tracemalloc allocation diffs.
+
+:func:`allocation_diff` starts ``tracemalloc`` (unless it is already
+tracing), snapshots, waits, snapshots again and returns the call sites whose
+live allocations grew the most in between.  Tracing is stopped again
+afterwards, so it only slows the process down while a diff is running.
+Memory allocated before the window is invisible to tracemalloc: the diff
+shows growth, not the total footprint.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import tracemalloc
+from typing import Any, Dict
+
+from diagnostics.profiler import MAX_SECONDS, ProfilerBusy
+
+GROUP_BY = ("lineno", "filename", "traceback")
+
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+)
+
+_active = False
+
+
+async def allocation_diff(
+    seconds: float, limit: int = 25, group_by: str = "lineno", frames: int = 1
+) -> Dict[str, Any]:
+    """Return the top allocation growth over *seconds*."""
+
+    global _active
+    if group_by not in GROUP_BY:
+        raise ValueError(f"group_by must be one of {GROUP_BY}")
+    if _active:
+        raise ProfilerBusy("an allocation diff is already running")
+
+    _active = True
+    started = not tracemalloc.is_tracing()
+    try:
+        if started:
+            tracemalloc.start(max(1, frames))
+        before = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        await asyncio.sleep(min(seconds, MAX_SECONDS))
+        after = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        if started:
+            tracemalloc.stop()
+        _active = False
+
+    stats = after.compare_to(before, group_by)
+    return {
+        "seconds": min(seconds, MAX_SECONDS),
+        "traced_bytes": current,
+        "traced_peak_bytes": peak,
+        "size_diff_total": sum(stat.size_diff for stat in stats),
+        "top": [
+            {
+                "location": [str(frame) for frame in stat.traceback],
+                "size_diff": stat.size_diff,
+                "size": stat.size,
+                "count_diff": stat.count_diff,
+                "count": stat.count,
+            }
+            for stat in stats[:limit]
+        ],
+    }
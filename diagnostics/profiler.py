@@ -0,0 +1,120 @@
+"""Time-boxed CPU profiles of the event-loop thread.
+
+* :func:`sample` – a helper thread snapshots the loop thread's stack every
+  few milliseconds (``sys._current_frames``) and returns the counts in
+  collapsed-stack format, ready for ``flamegraph.pl`` or speedscope.  The
+  loop itself is not instrumented, so the overhead is a few microseconds per
+  sample.  The sampler only runs when the loop thread releases the GIL, so
+  short CPU bursts between awaits are attributed to the selector; code that
+  holds the loop for milliseconds at a time (what this is for) shows up.
+* :func:`trace` – ``cProfile`` enabled on the loop thread for the window;
+  exact call counts, but every call in the window is slowed down.
+
+Both must be awaited from the event loop being profiled, and only one
+profile runs at a time (:class:`ProfilerBusy` otherwise).
+"""
+
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import collections
+import contextlib
+import io
+import marshal
+import os
+import pstats
+import sys
+import threading
+from types import CodeType, FrameType
+from typing import Dict, Iterator
+
+MAX_SECONDS = 60.0
+
+_active = False
+
+
+class ProfilerBusy(RuntimeError):
+    """Raised when a profile is requested while another one is running."""
+
+
+@contextlib.contextmanager
+def _exclusive() -> Iterator[None]:
+    global _active
+    if _active:
+        raise ProfilerBusy("a profile is already being captured")
+    _active = True
+    try:
+        yield
+    finally:
+        _active = False
+
+
+def _label(code: CodeType, cache: Dict[CodeType, str]) -> str:
+    label = cache.get(code)
+    if label is None:
+        path = code.co_filename.rsplit(os.sep, 2)
+        label = cache[code] = f"{code.co_name} ({'/'.join(path[-2:])}:{code.co_firstlineno})"
+    return label
+
+
+def _collapse(frame: FrameType | None, cache: Dict[CodeType, str]) -> str:
+    stack = []
+    while frame is not None:
+        stack.append(_label(frame.f_code, cache))
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+
+async def sample(seconds: float, interval: float = 0.005) -> str:
+    """Sample the loop thread for *seconds*; return collapsed stacks."""
+
+    seconds = min(seconds, MAX_SECONDS)
+    with _exclusive():
+        target = threading.get_ident()
+        counts: collections.Counter[str] = collections.Counter()
+        cache: Dict[CodeType, str] = {}
+        stop = threading.Event()
+
+        def run() -> None:
+            while not stop.wait(interval):
+                frame = sys._current_frames().get(target)
+                if frame is not None:
+                    counts[_collapse(frame, cache)] += 1
+
+        sampler = threading.Thread(target=run, name="genai-profiler", daemon=True)
+        sampler.start()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            stop.set()
+            sampler.join()
+
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+async def trace(seconds: float) -> cProfile.Profile:
+    """Run ``cProfile`` on the loop thread for *seconds*."""
+
+    seconds = min(seconds, MAX_SECONDS)
+    with _exclusive():
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+    profiler.create_stats()
+    return profiler
+
+
+def pstats_dump(profiler: cProfile.Profile) -> bytes:
+    """The bytes ``Profile.dump_stats`` would write (loadable by ``pstats``)."""
+
+    return marshal.dumps(profiler.stats)  # type: ignore[attr-defined]
+
+
+def pstats_text(profiler: cProfile.Profile, limit: int = 50, sort: str = "cumulative") -> str:
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
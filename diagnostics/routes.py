@@ -0,0 +1,89 @@
+"""Admin-only ``/debug`` endpoints.
+
+The endpoints exist only when admin keys are configured (404 otherwise):
+*GENAI_ADMIN_API_KEYS* or ``admin: true`` in the keys file (see
+``config.api_keys``).  The request must authenticate with one of them as
+``Authorization: Bearer <key>`` or ``X-API-Key``::
+
+    curl -H "Authorization: Bearer $ADMIN" "localhost:8000/debug/profile?seconds=10" > out.folded
+    curl -H "Authorization: Bearer $ADMIN" "localhost:8000/debug/profile?format=pstats" > out.pstats
+    curl -H "Authorization: Bearer $ADMIN" localhost:8000/debug/loop
+    curl -H "Authorization: Bearer $ADMIN" "localhost:8000/debug/memory?seconds=30"
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Literal
+
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
+
+from config.api_keys import get_key_registry
+from diagnostics import memory, profiler
+from diagnostics.loop_monitor import get_loop_monitor, task_counts
+
+
+async def require_admin(request: Request) -> None:
+    if not get_key_registry().has_admin:
+        raise HTTPException(status_code=404, detail="Not Found")
+    identity = getattr(request.state, "identity", None)
+    if identity is None or not identity.admin:
+        raise HTTPException(status_code=403, detail="Admin key required")
+
+
+router = APIRouter(prefix="/debug", dependencies=[Depends(require_admin)], include_in_schema=False)
+
+
+def _busy(exc: profiler.ProfilerBusy) -> JSONResponse:
+    return JSONResponse(status_code=409, content={"error": str(exc)})
+
+
+@router.get("/profile")
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=profiler.MAX_SECONDS),
+    format: Literal["collapsed", "pstats", "text"] = "collapsed",
+    interval_ms: float = Query(5.0, ge=1, le=1000),
+    limit: int = Query(50, ge=1, le=1000),
+) -> Response:
+    """CPU profile of the event-loop thread over the next *seconds*.
+
+    ``collapsed`` samples stacks (low overhead, flame-graph input);
+    ``pstats`` and ``text`` run ``cProfile`` (exact, slower while running).
+    """
+
+    try:
+        if format == "collapsed":
+            return PlainTextResponse(await profiler.sample(seconds, interval_ms / 1000))
+        stats = await profiler.trace(seconds)
+    except profiler.ProfilerBusy as exc:
+        return _busy(exc)
+    if format == "pstats":
+        return Response(
+            profiler.pstats_dump(stats),
+            media_type="application/octet-stream",
+            headers={"Content-Disposition": 'attachment; filename="router.pstats"'},
+        )
+    return PlainTextResponse(profiler.pstats_text(stats, limit))
+
+
+@router.get("/loop")
+async def loop_stats() -> Dict[str, Any]:
+    """Event-loop lag percentiles and live tasks grouped by coroutine."""
+
+    tasks = task_counts()
+    return {"lag": get_loop_monitor().summary(), "tasks_total": sum(tasks.values()), "tasks": tasks}
+
+
+@router.get("/memory")
+async def memory_diff(
+    seconds: float = Query(10.0, gt=0, le=profiler.MAX_SECONDS),
+    limit: int = Query(25, ge=1, le=500),
+    group_by: Literal["lineno", "filename", "traceback"] = "lineno",
+    frames: int = Query(1, ge=1, le=64),
+):
+    """Allocation growth over the next *seconds* (tracemalloc snapshot diff)."""
+
+    try:
+        return await memory.allocation_diff(seconds, limit, group_by, frames)
+    except profiler.ProfilerBusy as exc:
+        return _busy(exc)
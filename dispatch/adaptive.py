@@ -0,0 +1,135 @@
+"""Adaptive concurrency limit algorithms.
+
+Instead of a hand-tuned ``max_concurrency`` a backend can let the router
+discover its capacity from observed latency and errors::
+
+    backends:
+      ollama:
+        type: ollama
+        adaptive_concurrency:
+          algorithm: gradient     # gradient | aimd
+          initial_limit: 8
+          min_limit: 1
+          max_limit: 64
+
+Each algorithm receives one sample per finished request (latency in seconds,
+whether it succeeded, and how many requests were in flight) and returns the
+new limit.  ``dispatch.limits.AdaptiveConcurrencyLimiter`` applies it.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Any, Callable, Dict, Mapping
+
+
+class AIMDLimit:
+    """Additive-increase / multiplicative-decrease, like TCP congestion control.
+
+    The limit grows by one per successful sample while the backend is actually
+    being driven near the limit, and is multiplied by ``backoff`` on errors or
+    when latency exceeds ``latency_threshold``.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 10,
+        min_limit: float = 1,
+        max_limit: float = 200,
+        backoff: float = 0.9,
+        latency_threshold: float | None = None,
+    ) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.backoff = float(backoff)
+        self.latency_threshold = float(latency_threshold) if latency_threshold is not None else None
+
+    def update(self, latency: float, ok: bool, in_flight: int) -> float:
+        overloaded = not ok or (
+            self.latency_threshold is not None and latency > self.latency_threshold
+        )
+        if overloaded:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+        elif in_flight * 2 >= self.limit:
+            self.limit = min(self.max_limit, self.limit + 1)
+        return self.limit
+
+
+class GradientLimit:
+    """Latency-gradient limit in the style of TCP Vegas / Netflix *gradient2*.
+
+    A slow EWMA of latency estimates the no-load RTT.  The ratio of that
+    baseline to the latest sample (the *gradient*) shrinks the limit when
+    queueing delay builds up, while a ``sqrt(limit)`` headroom term lets it
+    probe for more capacity.  Errors back off multiplicatively.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = 20,
+        min_limit: float = 1,
+        max_limit: float = 200,
+        smoothing: float = 0.2,
+        tolerance: float = 1.5,
+        long_window: int = 600,
+        backoff: float = 0.9,
+    ) -> None:
+        self.limit = float(initial_limit)
+        self.min_limit = float(min_limit)
+        self.max_limit = float(max_limit)
+        self.smoothing = float(smoothing)
+        self.tolerance = float(tolerance)
+        self.backoff = float(backoff)
+        self._alpha = 2.0 / (int(long_window) + 1)
+        self.long_rtt = 0.0
+
+    def update(self, latency: float, ok: bool, in_flight: int) -> float:
+        if not ok:
+            self.limit = max(self.min_limit, self.limit * self.backoff)
+            return self.limit
+        if latency <= 0:
+            return self.limit
+
+        if self.long_rtt == 0.0:
+            self.long_rtt = latency
+        else:
+            self.long_rtt += self._alpha * (latency - self.long_rtt)
+            # Recover quickly after a period of unusually high latency.
+            if self.long_rtt / latency > 2.0:
+                self.long_rtt *= 0.95
+
+        # Don't grow while the backend is not actually driven near the limit.
+        if in_flight < self.limit / 2:
+            return self.limit
+
+        gradient = max(0.5, min(1.0, self.tolerance * self.long_rtt / latency))
+        target = self.limit * gradient + math.sqrt(self.limit)
+        self.limit = self.limit * (1 - self.smoothing) + target * self.smoothing
+        self.limit = max(self.min_limit, min(self.max_limit, self.limit))
+        return self.limit
+
+
+_ALGORITHMS: Dict[str, Callable[..., Any]] = {
+    "aimd": AIMDLimit,
+    "gradient": GradientLimit,
+}
+
+_OPTION_KEYS = {
+    "aimd": ("initial_limit", "min_limit", "max_limit", "backoff", "latency_threshold"),
+    "gradient": ("initial_limit", "min_limit", "max_limit", "smoothing", "tolerance", "long_window", "backoff"),
+}
+
+
+def make_algorithm(options: Mapping[str, Any]) -> Any:
+    """Build the algorithm described by an ``adaptive_concurrency`` section.
+
+    Raises:
+        TypeError, ValueError: unknown algorithm or a non-numeric option.
+    """
+
+    name = options.get("algorithm", "gradient")
+    if name not in _ALGORITHMS:
+        raise ValueError(f"Unknown adaptive concurrency algorithm '{name}'")
+    kwargs = {key: options[key] for key in _OPTION_KEYS[name] if key in options}
+    return _ALGORITHMS[name](**kwargs)
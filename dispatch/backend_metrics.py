@@ -0,0 +1,196 @@
+"""Record per backend / model upstream metrics.
+
+The router creates an :class:`Attempt` for every upstream attempt.  It
+counts the request in ``genai_backend_in_flight`` and, when it finishes,
+records its duration, token usage and (on failure) the error class.
+Streaming attempts are wrapped with :meth:`Attempt.track_stream`, which also
+records time to first token, the gaps between chunks and the duration to
+the end of the stream.
+
+Label values stay bounded:
+
+* ``backend`` is the configured backend name;
+* ``model`` is the requested model for the first *GENAI_METRICS_MAX_MODELS*
+  distinct names (and always for models listed under ``routing:``), then
+  ``"other"``;
+* ``error`` is one of a fixed set of classes (see :func:`error_class`).
+
+Connection pool utilisation is exported at scrape time as
+``genai_pool_connections{replica,state}`` and ``genai_pool_max_connections``.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import re
+import time
+from typing import Any, AsyncIterator, Iterable, Tuple
+
+import httpx
+
+from config import backend_loader
+from config.settings import get_settings
+from dispatch import metrics
+
+OTHER = "other"
+
+_seen_models: set[str] = set()
+
+# Usage objects in stream chunks (OpenAI ``include_usage``, Ollama final chunk).
+_USAGE = re.compile(rb'"usage":\{[^{}]*\}')
+_PROMPT_TOKENS = re.compile(rb'"prompt_tokens":(\d+)')
+_COMPLETION_TOKENS = re.compile(rb'"completion_tokens":(\d+)')
+
+
+def model_label(model: str) -> str:
+    """Return *model* if it may be used as a label value, else ``"other"``."""
+
+    if model in _seen_models:
+        return model
+    if (
+        model in backend_loader.get_routing_table().routes
+        or len(_seen_models) < get_settings().metrics_max_models
+    ):
+        _seen_models.add(model)
+        return model
+    return OTHER
+
+
+def error_class(exc: BaseException) -> str:
+    """Map an upstream failure to a small, fixed set of label values."""
+
+    if isinstance(exc, httpx.TimeoutException):
+        return "timeout"
+    if isinstance(exc, httpx.ConnectError):
+        return "connect"
+    if isinstance(exc, httpx.TransportError):
+        return "transport"
+    status = getattr(exc, "status_code", None)
+    if isinstance(status, int):
+        return "http_5xx" if status >= 500 else "http_4xx"
+    if isinstance(exc, ValueError):
+        return "invalid_response"
+    return OTHER
+
+
+def _as_bytes(chunk: Any) -> bytes:
+    return chunk.encode("utf-8") if isinstance(chunk, str) else chunk
+
+
+class Attempt:
+    """Metrics for one upstream attempt (see module docstring)."""
+
+    __slots__ = ("labels", "started", "_done")
+
+    def __init__(self, backend: dict, model: str) -> None:
+        self.labels = (backend.get("name", "default"), model_label(model))
+        self.started = time.perf_counter()
+        self._done = False
+        metrics.BACKEND_IN_FLIGHT.labels(*self.labels).inc()
+
+    def finish(self, stream: bool, exc: BaseException | None = None) -> None:
+        """Record the end of the attempt (idempotent)."""
+
+        if self._done:
+            return
+        self._done = True
+        metrics.BACKEND_IN_FLIGHT.labels(*self.labels).dec()
+        if exc is not None:
+            # Abandoned attempts (hedge losers, client disconnects) are not errors.
+            if not isinstance(exc, (asyncio.CancelledError, GeneratorExit)):
+                metrics.BACKEND_ERRORS.labels(*self.labels, error_class(exc)).inc()
+            return
+        metrics.BACKEND_DURATION.labels(*self.labels, "true" if stream else "false").observe(
+            time.perf_counter() - self.started
+        )
+
+    def record_usage(self, result: Any) -> None:
+        """Count tokens from a non-streaming result (dict, model or bytes)."""
+
+        if isinstance(result, (bytes, bytearray)):
+            match = _USAGE.search(result)
+            if match is not None:
+                self._count_usage_bytes(match.group())
+            return
+        usage = result.get("usage") if isinstance(result, dict) else getattr(result, "usage", None)
+        if usage is None:
+            return
+        if not isinstance(usage, dict):
+            usage = usage.model_dump()
+        self._count(usage.get("prompt_tokens"), usage.get("completion_tokens"))
+
+    def _count_usage_bytes(self, usage: bytes) -> None:
+        prompt = _PROMPT_TOKENS.search(usage)
+        completion = _COMPLETION_TOKENS.search(usage)
+        self._count(prompt and int(prompt.group(1)), completion and int(completion.group(1)))
+
+    def _count(self, prompt: Any, completion: Any) -> None:
+        if prompt:
+            metrics.BACKEND_TOKENS.labels(*self.labels, "prompt").inc(prompt)
+        if completion:
+            metrics.BACKEND_TOKENS.labels(*self.labels, "completion").inc(completion)
+
+    async def track_stream(self, stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """Yield *stream* unchanged while recording TTFT, chunk gaps and usage."""
+
+        ttft = metrics.BACKEND_TTFT.labels(*self.labels)
+        gaps = metrics.BACKEND_INTER_TOKEN.labels(*self.labels)
+        last: float | None = None
+        error: BaseException | None = None
+        try:
+            async for chunk in stream:
+                now = time.perf_counter()
+                if last is None:
+                    ttft.observe(now - self.started)
+                else:
+                    gaps.observe(now - last)
+                last = now
+                data = _as_bytes(chunk)
+                if b'"usage"' in data:
+                    match = _USAGE.search(data)
+                    if match is not None:
+                        self._count_usage_bytes(match.group())
+                yield chunk
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            self.finish(True, error)
+
+
+def _connection_stats() -> Iterable[Tuple[str, dict]]:
+    from handlers import client_pool, ollama_handler
+
+    yield from client_pool.connection_stats().items()
+    yield from ollama_handler.connection_stats().items()
+
+
+if metrics.PROM_AVAILABLE:
+    from prometheus_client import REGISTRY
+    from prometheus_client.core import GaugeMetricFamily
+
+    class _PoolCollector:
+        """Read connection pool usage from the live clients at scrape time."""
+
+        def collect(self):
+            connections = GaugeMetricFamily(
+                "genai_pool_connections",
+                "Upstream connections per replica pool by state",
+                labels=["replica", "state"],
+            )
+            limit = GaugeMetricFamily(
+                "genai_pool_max_connections",
+                "Connection limit per replica pool",
+                labels=["replica"],
+            )
+            for replica, usage in _connection_stats():
+                connections.add_metric([replica, "active"], usage["active"])
+                connections.add_metric([replica, "idle"], usage["idle"])
+                limit.add_metric([replica], usage["max"])
+            yield connections
+            yield limit
+
+        def describe(self):
+            return []
+
+    REGISTRY.register(_PoolCollector())
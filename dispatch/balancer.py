@@ -0,0 +1,287 @@
+"""Replica pools and load-balancing policies.
+
+A backend in ``config/backends.yaml`` may list several interchangeable
+replicas instead of a single ``base_url``::
+
+    backends:
+      ollama:
+        type: ollama
+        balancer: least_outstanding   # round_robin | least_outstanding | p2c_ewma
+        replicas:
+          - http://gpu1:11434
+          - http://gpu2:11434
+
+The router keeps one :class:`ReplicaPool` per backend.  Every dispatch takes a
+:class:`Lease` on a replica chosen by the pool's policy; the lease tracks the
+replica's in-flight count and feeds the observed latency into an EWMA when it
+is released.  Additional policies can be added with :func:`register_policy`.
+"""
+
+from __future__ import annotations
+
+import itertools
+import random
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Collection, Dict, List, Mapping, Sequence, Tuple
+
+from config.backend_loader import backend_urls
+from dispatch import metrics
+from dispatch.health import HALF_OPEN, BackendUnavailableError, CircuitBreaker, get_breaker
+
+DEFAULT_POLICY = "round_robin"
+EWMA_ALPHA = 0.3
+
+
+class Replica:
+    """One upstream endpoint of a backend together with its live statistics."""
+
+    __slots__ = ("url", "in_flight", "ewma_latency", "requests", "breaker")
+
+    def __init__(self, url: str, breaker: CircuitBreaker | None = None) -> None:
+        self.url = url
+        self.in_flight = 0
+        self.ewma_latency = 0.0
+        self.requests = 0
+        self.breaker = breaker if breaker is not None else get_breaker(url)
+
+    def observe(self, latency: float) -> None:
+        """Fold a latency sample (seconds) into the exponentially weighted average."""
+
+        self.requests += 1
+        if self.ewma_latency == 0.0:
+            self.ewma_latency = latency
+        else:
+            self.ewma_latency = EWMA_ALPHA * latency + (1 - EWMA_ALPHA) * self.ewma_latency
+        metrics.REPLICA_LATENCY_EWMA.labels(replica=self.url).set(self.ewma_latency)
+
+    def __repr__(self) -> str:  # pragma: no cover - debugging aid
+        return f"Replica({self.url!r}, in_flight={self.in_flight}, ewma={self.ewma_latency:.3f})"
+
+
+class LatencyWindow:
+    """Sliding window of recent latency samples for percentile queries."""
+
+    def __init__(self, size: int = 512) -> None:
+        self._samples: deque[float] = deque(maxlen=size)
+        self._sorted: List[float] | None = None
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def add(self, latency: float) -> None:
+        self._samples.append(latency)
+        self._sorted = None
+
+    def percentile(self, pct: float) -> float | None:
+        """Return the *pct*-th percentile (0-100) or ``None`` without samples."""
+
+        if not self._samples:
+            return None
+        if self._sorted is None:
+            self._sorted = sorted(self._samples)
+        index = min(len(self._sorted) - 1, int(len(self._sorted) * pct / 100.0))
+        return self._sorted[index]
+
+
+# ---------------------------------------------------------------------------
+# Policies
+# ---------------------------------------------------------------------------
+
+
+class RoundRobinPolicy:
+    """Cycle through replicas in order."""
+
+    def __init__(self) -> None:
+        self._counter = itertools.count()
+
+    def choose(self, replicas: Sequence[Replica]) -> Replica:
+        return replicas[next(self._counter) % len(replicas)]
+
+
+class LeastOutstandingPolicy:
+    """Pick the replica with the fewest in-flight requests (random tie-break)."""
+
+    def choose(self, replicas: Sequence[Replica]) -> Replica:
+        lowest = min(r.in_flight for r in replicas)
+        return random.choice([r for r in replicas if r.in_flight == lowest])
+
+
+class PowerOfTwoEWMAPolicy:
+    """Power-of-two-choices on latency EWMA weighted by outstanding requests.
+
+    Two random replicas are sampled and the one with the lower
+    ``ewma_latency * (in_flight + 1)`` score wins.  Replicas without samples
+    score zero so that new replicas are explored first.
+    """
+
+    def choose(self, replicas: Sequence[Replica]) -> Replica:
+        if len(replicas) == 1:
+            return replicas[0]
+        a, b = random.sample(list(replicas), 2)
+        return a if _p2c_score(a) <= _p2c_score(b) else b
+
+
+def _p2c_score(replica: Replica) -> float:
+    return replica.ewma_latency * (replica.in_flight + 1)
+
+
+_POLICIES: Dict[str, Callable[[], Any]] = {
+    "round_robin": RoundRobinPolicy,
+    "least_outstanding": LeastOutstandingPolicy,
+    "p2c_ewma": PowerOfTwoEWMAPolicy,
+}
+
+
+def register_policy(name: str, factory: Callable[[], Any]) -> None:
+    """Register a custom policy; *factory* returns an object with ``choose``."""
+
+    _POLICIES[name] = factory
+
+
+def make_policy(name: str) -> Any:
+    try:
+        return _POLICIES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown balancer policy '{name}'") from None
+
+
+# ---------------------------------------------------------------------------
+# Pools and leases
+# ---------------------------------------------------------------------------
+
+
+class Lease:
+    """In-flight reservation of a replica for one request."""
+
+    __slots__ = ("replica", "window", "trial", "_start", "_released")
+
+    def __init__(self, replica: Replica, window: LatencyWindow | None = None, trial: bool = False) -> None:
+        self.replica = replica
+        self.window = window
+        # Holds one of the breaker's half-open trial slots.
+        self.trial = trial
+        self._start = time.perf_counter()
+        self._released = False
+        replica.in_flight += 1
+        metrics.REPLICA_IN_FLIGHT.labels(replica=replica.url).inc()
+
+    @property
+    def url(self) -> str:
+        return self.replica.url
+
+    def release(self, *, ok: bool | None = True) -> None:
+        """Return the slot and report the outcome.
+
+        ``ok=True`` records a latency sample and a breaker success, ``False``
+        a breaker failure; ``None`` (e.g. client went away) records neither
+        but gives a half-open trial slot back.
+        """
+
+        self._finish(ok, sample=ok is True)
+
+    async def track_stream(self, stream: AsyncIterator[Any]) -> AsyncIterator[Any]:
+        """Wrap a streaming result so the lease lives as long as the stream.
+
+        Latency for streams is the time to the first chunk.  An upstream error
+        mid-stream counts as a failure, an abandoned stream as neither.
+        """
+
+        sampled = False
+        outcome: bool | None = None
+        try:
+            async for chunk in stream:
+                if not sampled:
+                    sampled = True
+                    self._observe()
+                yield chunk
+            outcome = True
+        except Exception:
+            outcome = False
+            raise
+        finally:
+            self._finish(outcome, sample=False)
+
+    def _observe(self) -> None:
+        latency = time.perf_counter() - self._start
+        self.replica.observe(latency)
+        if self.window is not None:
+            self.window.add(latency)
+
+    def _finish(self, outcome: bool | None, *, sample: bool) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.replica.in_flight -= 1
+        metrics.REPLICA_IN_FLIGHT.labels(replica=self.replica.url).dec()
+        if sample:
+            self._observe()
+        if outcome is True:
+            self.replica.breaker.record_success()
+        elif outcome is False:
+            self.replica.breaker.record_failure()
+        elif self.trial:
+            self.replica.breaker.record_neutral()
+
+
+class ReplicaPool:
+    """Set of replicas for one backend plus the policy used to pick among them."""
+
+    def __init__(
+        self,
+        urls: Sequence[str],
+        policy: str = DEFAULT_POLICY,
+        breaker_options: Mapping[str, Any] | None = None,
+    ) -> None:
+        if not urls:
+            raise ValueError("A replica pool needs at least one URL")
+        self.replicas: List[Replica] = [Replica(u, get_breaker(u, breaker_options)) for u in urls]
+        self.policy_name = policy
+        self.policy = make_policy(policy)
+        # Recent latencies across all replicas, used for hedge delays.
+        self.recent = LatencyWindow()
+
+    def choose(self, candidates: Sequence[Replica] | None = None) -> Replica:
+        replicas = candidates if candidates is not None else self.replicas
+        if len(replicas) == 1:
+            return replicas[0]
+        return self.policy.choose(replicas)
+
+    def available(self, exclude: Collection[str] = ()) -> List[Replica]:
+        """Replicas whose circuit breaker currently admits traffic."""
+
+        return [r for r in self.replicas if r.breaker.available and r.url not in exclude]
+
+    def acquire(self, exclude: Collection[str] = ()) -> Lease:
+        """Choose a healthy replica and reserve an in-flight slot on it.
+
+        Args:
+            exclude: Replica URLs already tried for this request.
+
+        Raises:
+            BackendUnavailableError: no healthy, untried replica is left.
+        """
+
+        candidates = self.available(exclude)
+        if not candidates:
+            raise BackendUnavailableError(
+                "All replicas unavailable: " + ", ".join(r.url for r in self.replicas)
+            )
+        replica = self.choose(candidates)
+        trial = replica.breaker.allow() and replica.breaker.state == HALF_OPEN
+        return Lease(replica, self.recent, trial)
+
+
+_pools: Dict[Tuple[Tuple[str, ...], str], ReplicaPool] = {}
+
+
+def get_pool(backend: Mapping[str, Any]) -> ReplicaPool:
+    """Return the (cached) replica pool for a backend definition."""
+
+    urls = tuple(backend_urls(backend))
+    policy = backend.get("balancer", DEFAULT_POLICY)
+    key = (urls, policy)
+    pool = _pools.get(key)
+    if pool is None:
+        pool = _pools[key] = ReplicaPool(urls, policy, backend.get("circuit_breaker"))
+    return pool
@@ -0,0 +1,368 @@
+"""Offline batch completions over JSONL files.
+
+Input lines use the OpenAI batch format (a bare request body per line is
+accepted too, its line number becoming the ``custom_id``)::
+
+    {"custom_id": "q-1", "method": "POST", "url": "/v1/chat/completions",
+     "body": {"model": "llama3", "messages": [{"role": "user", "content": "hi"}]}}
+
+and every result is written as an OpenAI batch output line as soon as it
+completes::
+
+    {"id": "batch_req_…", "custom_id": "q-1",
+     "response": {"status_code": 200, "body": {…chat.completion…}}, "error": null}
+
+Requests go through the router's normal dispatch (routing, limits,
+balancing, failover) at low admission priority, with at most
+``concurrency`` requests in flight per backend; a busy backend does not
+hold up lines for another one.
+
+:func:`run_file` powers ``genai-router batch``: output is appended and
+flushed line by line, and re-running the same command skips every
+``custom_id`` already present in the output, so a crashed job resumes where
+it stopped.  Failures worth retrying (429, 408, 5xx such as a rejected
+admission, or no response at all) are removed from the output on resume and
+run again; other failures stay.  The input file is read in blocks off the
+event loop.  ``POST /v1/batch`` runs a JSONL request body and streams the
+output lines back.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import IO, Any, AsyncIterable, AsyncIterator, Awaitable, Callable, Dict, Iterable, Set, Tuple
+
+from pydantic import ValidationError
+
+from schemas.chat import ChatCompletionRequest
+
+# Batch work yields to interactive traffic in the admission queues.
+BATCH_PRIORITY = -10
+
+# Failed requests with these statuses are run again when a job resumes.
+RETRYABLE_STATUSES = frozenset({408, 429})
+
+READ_BLOCK = 1 << 20
+
+# Parsed lines queued for (or running on) their backend, across backends.
+MAX_PENDING = 1024
+
+_DONE = object()
+
+
+@dataclass
+class BatchStats:
+    """Counters for one batch run."""
+
+    total: int = 0
+    skipped: int = 0
+    succeeded: int = 0
+    failed: int = 0
+    tokens: int = 0
+    started: float = field(default_factory=time.perf_counter)
+
+    @property
+    def completed(self) -> int:
+        return self.succeeded + self.failed
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {
+            "total": self.total,
+            "skipped": self.skipped,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "elapsed_s": round(elapsed, 3),
+            "requests_per_s": round(self.completed / elapsed, 2) if elapsed else 0.0,
+            "total_tokens": self.tokens,
+            "tokens_per_s": round(self.tokens / elapsed, 2) if elapsed else 0.0,
+        }
+
+
+def parse_line(line: str, lineno: int) -> Tuple[str, ChatCompletionRequest]:
+    """Return ``(custom_id, request)`` for one input line.
+
+    Raises:
+        ValueError: the line is not valid JSON or not a chat completion request.
+    """
+
+    data = json.loads(line)
+    if not isinstance(data, dict):
+        raise ValueError("batch line must be a JSON object")
+    if "body" in data:
+        url = data.get("url", "/v1/chat/completions")
+        if url != "/v1/chat/completions":
+            raise ValueError(f"unsupported batch url '{url}'")
+        custom_id, data = str(data.get("custom_id", f"line-{lineno}")), data["body"]
+    else:
+        custom_id = f"line-{lineno}"
+    return custom_id, ChatCompletionRequest.model_validate(data)
+
+
+def _record(custom_id: str, *, body: Any = None, status: int = 200, error: Exception | None = None) -> Dict[str, Any]:
+    record: Dict[str, Any] = {"id": f"batch_req_{uuid.uuid4().hex}", "custom_id": custom_id}
+    if error is None:
+        record["response"] = {"status_code": status, "body": body}
+        record["error"] = None
+    else:
+        record["response"] = {"status_code": status, "body": None} if status else None
+        record["error"] = {"code": type(error).__name__, "message": str(error)}
+    return record
+
+
+class BatchRunner:
+    """Run parsed batch lines through *complete* with per-backend concurrency.
+
+    Each backend gets its own queue and ``concurrency`` workers, so a
+    saturated backend does not hold up lines for the others.  At most
+    ``max_pending`` parsed lines wait in (or run from) the queues at a time.
+
+    Args:
+        complete: coroutine running one non-streaming request (``router.complete``).
+        backend_of: maps a model name to the key its concurrency bound is
+            shared under (the backend name).
+        error_status: maps a failure to the HTTP status recorded for it.
+        concurrency: requests in flight per backend.
+        max_pending: lines read ahead of the workers, across all backends.
+    """
+
+    def __init__(
+        self,
+        complete: Callable[[ChatCompletionRequest], Awaitable[Any]],
+        backend_of: Callable[[str], str],
+        error_status: Callable[[BaseException], int],
+        concurrency: int = 8,
+        max_pending: int = MAX_PENDING,
+    ) -> None:
+        self._complete = complete
+        self._backend_of = backend_of
+        self._error_status = error_status
+        self.concurrency = max(1, int(concurrency))
+        self.max_pending = max(1, int(max_pending))
+        self.stats = BatchStats()
+
+    async def run(
+        self, lines: Iterable[str] | AsyncIterable[str], skip: Set[str] = frozenset()
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Yield one output record per input line, in completion order.
+
+        Lines whose ``custom_id`` is in *skip* are not run.
+        """
+
+        results: asyncio.Queue = asyncio.Queue()
+        queues: Dict[str, asyncio.Queue] = {}
+        workers: Set[asyncio.Task] = set()
+        pending = asyncio.Semaphore(self.max_pending)
+
+        async def work(queue: asyncio.Queue) -> None:
+            while True:
+                custom_id, body = await queue.get()
+                try:
+                    await self._run_one(custom_id, body, results)
+                finally:
+                    pending.release()
+                    queue.task_done()
+
+        async def produce() -> None:
+            try:
+                async for lineno, line in _numbered(lines):
+                    if not line.strip():
+                        continue
+                    self.stats.total += 1
+                    try:
+                        custom_id, body = parse_line(line, lineno)
+                        backend = self._backend_of(body.model)
+                    except (ValueError, ValidationError) as exc:
+                        if f"line-{lineno}" in skip:
+                            self.stats.skipped += 1
+                        else:
+                            self.stats.failed += 1
+                            results.put_nowait(_record(f"line-{lineno}", status=400, error=exc))
+                        continue
+                    if custom_id in skip:
+                        self.stats.skipped += 1
+                        continue
+
+                    await pending.acquire()
+                    queue = queues.get(backend)
+                    if queue is None:
+                        queue = queues[backend] = asyncio.Queue()
+                        for _ in range(self.concurrency):
+                            workers.add(asyncio.ensure_future(work(queue)))
+                    queue.put_nowait((custom_id, body))
+                for queue in queues.values():
+                    await queue.join()
+            finally:
+                results.put_nowait(_DONE)
+
+        producer = asyncio.ensure_future(produce())
+        try:
+            while True:
+                record = await results.get()
+                if record is _DONE:
+                    break
+                yield record
+            await producer
+        finally:
+            producer.cancel()
+            for task in workers:
+                task.cancel()
+
+    async def _run_one(self, custom_id: str, body: ChatCompletionRequest, results: asyncio.Queue) -> None:
+        try:
+            result = await self._complete(body)
+            if isinstance(result, (bytes, bytearray)):
+                result = json.loads(result)
+            elif hasattr(result, "model_dump"):
+                result = result.model_dump(mode="json")
+            usage = result.get("usage") or {}
+        except Exception as exc:
+            self.stats.failed += 1
+            results.put_nowait(_record(custom_id, status=self._error_status(exc), error=exc))
+            return
+
+        self.stats.succeeded += 1
+        self.stats.tokens += int(usage.get("total_tokens") or 0)
+        results.put_nowait(_record(custom_id, body=result))
+
+
+def _retryable(record: Any) -> bool:
+    """Whether an output record is a failure worth running again."""
+
+    if not isinstance(record, dict) or record.get("error") is None:
+        return False
+    status = (record.get("response") or {}).get("status_code")
+    return not status or status >= 500 or status in RETRYABLE_STATUSES
+
+
+def completed_ids(path: Path) -> Set[str]:
+    """Return the ``custom_id``\\ s in *path* that are not run again.
+
+    Records of retryable failures (see :func:`_retryable`) are removed from
+    the file so that their requests run again.  A trailing partial line
+    (left by a crash mid-write) is truncated so that appending continues on
+    a clean line boundary.
+    """
+
+    if not path.exists():
+        return set()
+
+    with path.open("rb+") as fh:
+        data = fh.read()
+        end = data.rfind(b"\n") + 1
+        if end != len(data):
+            fh.truncate(end)
+
+    done: Set[str] = set()
+    kept = []
+    for line in data[:end].splitlines(keepends=True):
+        try:
+            record = json.loads(line)
+            custom_id = record["custom_id"]
+        except (ValueError, KeyError, TypeError):
+            kept.append(line)
+            continue
+        if _retryable(record):
+            continue
+        done.add(custom_id)
+        kept.append(line)
+
+    if len(kept) != data[:end].count(b"\n"):
+        tmp = path.with_name(path.name + ".tmp")
+        with tmp.open("wb") as fh:
+            fh.writelines(kept)
+            fh.flush()
+            os.fsync(fh.fileno())
+        os.replace(tmp, path)
+    return done
+
+
+async def _numbered(lines: Iterable[str] | AsyncIterable[str]) -> AsyncIterator[Tuple[int, str]]:
+    lineno = 0
+    if isinstance(lines, AsyncIterable):
+        async for line in lines:
+            lineno += 1
+            yield lineno, line
+    else:
+        for line in lines:
+            lineno += 1
+            yield lineno, line
+
+
+async def read_lines(fh: IO[str], block: int = READ_BLOCK) -> AsyncIterator[str]:
+    """Yield the lines of *fh*, reading about *block* bytes at a time in a thread."""
+
+    while True:
+        lines = await asyncio.to_thread(fh.readlines, block)
+        if not lines:
+            return
+        for line in lines:
+            yield line
+
+
+def _count_lines(path: Path) -> int:
+    count = 0
+    with path.open("rb") as fh:
+        for block in iter(lambda: fh.read(1 << 20), b""):
+            count += block.count(b"\n")
+    return count
+
+
+async def run_file(
+    input_path: Path,
+    output_path: Path,
+    concurrency: int = 8,
+    progress_interval: float = 5.0,
+    echo: Callable[[str], None] = print,
+) -> BatchStats:
+    """Run *input_path* in-process and append results to *output_path*."""
+
+    import router
+    from config import backend_loader
+    from handlers import client_pool, ollama_handler
+
+    def backend_of(model: str) -> str:
+        return router.resolve_backend(model).get("name", "default")
+
+    runner = BatchRunner(
+        lambda body: router.complete(body, priority=BATCH_PRIORITY),
+        backend_of,
+        router.error_status,
+        concurrency,
+    )
+    skip = await asyncio.to_thread(completed_ids, output_path)
+    total = await asyncio.to_thread(_count_lines, input_path)
+    if skip:
+        echo(f"resuming: {len(skip)} requests already in {output_path}")
+
+    await client_pool.startup(backend_loader.get_backends())
+    last_report = time.perf_counter()
+    try:
+        with input_path.open("r", encoding="utf-8") as src, output_path.open("a", encoding="utf-8") as out:
+            async for record in runner.run(read_lines(src), skip):
+                out.write(json.dumps(record, ensure_ascii=False) + "\n")
+                out.flush()
+                now = time.perf_counter()
+                if progress_interval > 0 and now - last_report >= progress_interval:
+                    last_report = now
+                    echo(_progress(runner.stats, total))
+            os.fsync(out.fileno())
+    finally:
+        await ollama_handler.shutdown()
+        await client_pool.shutdown()
+    return runner.stats
+
+
+def _progress(stats: BatchStats, total: int) -> str:
+    summary = stats.summary()
+    done = stats.completed + stats.skipped
+    return (
+        f"{done}/{total} done ({stats.failed} failed, {stats.skipped} skipped), "
+        f"{summary['requests_per_s']} req/s, {summary['tokens_per_s']} tokens/s"
+    )
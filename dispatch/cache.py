@@ -0,0 +1,162 @@
+"""Exact-match response cache for non-streaming chat completions.
+
+Deterministic requests (``temperature == 0``) or requests that explicitly opt
+in via the ``X-GenAI-Cache: force`` header are answered from an in-process
+LRU cache keyed by a canonical hash of the request.  Entries expire after a
+per-model TTL and the cache is bounded by a total byte budget.
+
+Clients can bypass the cache with ``X-GenAI-Cache: bypass`` or
+``Cache-Control: no-cache`` / ``no-store``.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, Mapping, NamedTuple
+
+from config.settings import get_settings
+from dispatch import fastjson, metrics
+from schemas.chat import ChatCompletionRequest
+
+CACHE_HEADER = "x-genai-cache"
+
+
+def request_key(body: ChatCompletionRequest) -> str:
+    """Return a canonical hash of model, messages and sampling parameters.
+
+    The ``stream`` flag does not influence the generated text and is therefore
+    excluded from the key.
+    """
+
+    payload = body.model_dump(exclude={"stream"})
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def is_cacheable(body: ChatCompletionRequest, headers: Mapping[str, str]) -> bool:
+    """Return ``True`` when the response for *body* may be served from cache."""
+
+    if body.stream:
+        return False
+
+    directive = (headers.get(CACHE_HEADER) or "").strip().lower()
+    if directive in ("bypass", "no-cache", "off"):
+        return False
+
+    cache_control = (headers.get("cache-control") or "").lower()
+    if "no-cache" in cache_control or "no-store" in cache_control:
+        return False
+
+    return directive == "force" or body.temperature == 0
+
+
+class _Entry(NamedTuple):
+    expires_at: float
+    data: bytes
+
+
+class ResponseCache:
+    """LRU cache bounded by total payload size with per-model TTLs."""
+
+    def __init__(
+        self,
+        max_bytes: int,
+        default_ttl: float,
+        model_ttls: Mapping[str, float] | None = None,
+    ) -> None:
+        self.max_bytes = max_bytes
+        self.default_ttl = default_ttl
+        self.model_ttls: Dict[str, float] = dict(model_ttls or {})
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._bytes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    @property
+    def size_bytes(self) -> int:
+        return self._bytes
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def ttl_for(self, model: str) -> float:
+        return self.model_ttls.get(model, self.default_ttl)
+
+    def get(self, key: str) -> Dict[str, Any] | None:
+        """Return a fresh copy of the cached response, or ``None``."""
+
+        data = self.get_raw(key)
+        return None if data is None else fastjson.loads(data)
+
+    def get_raw(self, key: str) -> bytes | None:
+        """Return the cached response body as stored (JSON bytes), or ``None``."""
+
+        entry = self._entries.get(key)
+        if entry is None:
+            metrics.CACHE_MISSES.inc()
+            return None
+
+        if entry.expires_at <= time.monotonic():
+            self._remove(key, reason="expired")
+            metrics.CACHE_MISSES.inc()
+            return None
+
+        self._entries.move_to_end(key)
+        metrics.CACHE_HITS.inc()
+        return entry.data
+
+    def put(self, key: str, model: str, response: Mapping[str, Any]) -> None:
+        """Store *response* under *key*, evicting LRU entries to fit the budget."""
+
+        self.put_raw(key, model, fastjson.dumps(response))
+
+    def put_raw(self, key: str, model: str, data: bytes) -> None:
+        """Store an already encoded JSON response body under *key*."""
+
+        ttl = self.ttl_for(model)
+        if not self.enabled or ttl <= 0:
+            return
+
+        if len(data) > self.max_bytes:
+            return
+
+        if key in self._entries:
+            self._remove(key, reason=None)
+
+        while self._bytes + len(data) > self.max_bytes and self._entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest, reason="size")
+
+        self._entries[key] = _Entry(time.monotonic() + ttl, data)
+        self._bytes += len(data)
+        metrics.CACHE_BYTES.set(self._bytes)
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+        metrics.CACHE_BYTES.set(0)
+
+    def _remove(self, key: str, *, reason: str | None) -> None:
+        entry = self._entries.pop(key)
+        self._bytes -= len(entry.data)
+        metrics.CACHE_BYTES.set(self._bytes)
+        if reason is not None:
+            metrics.CACHE_EVICTIONS.labels(reason=reason).inc()
+
+
+@lru_cache()
+def get_response_cache() -> ResponseCache:
+    """Return the process-wide response cache configured from settings."""
+
+    settings = get_settings()
+    return ResponseCache(
+        max_bytes=settings.cache_max_bytes,
+        default_ttl=settings.cache_ttl,
+        model_ttls=settings.parsed_cache_model_ttls,
+    )
@@ -0,0 +1,126 @@
+"""Reload ``config/backends.yaml`` and the API keys file without a restart.
+
+:class:`ConfigWatcher` reloads the routing table and the key registry
+(``config.api_keys``) on ``SIGHUP`` and, every
+*GENAI_CONFIG_WATCH_INTERVAL* seconds, when a file's mtime, size or inode
+changed.  A reload compiles and validates the new file first
+(``backend_loader.reload_config``, ``api_keys.reload_keys``); an invalid
+file is logged and the running table or keys stay active.  Pooled clients
+for new backend URLs are created and warmed before the new routing table is
+swapped in; the health checker then picks up the new replicas.
+
+Requests that already resolved their backend keep using the old table.
+Clients of removed backends stay open until shutdown.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import signal
+from pathlib import Path
+from typing import Tuple
+
+from config import api_keys, backend_loader
+from dispatch import metrics
+from dispatch.health import HealthChecker
+from handlers import client_pool
+
+logger = logging.getLogger("genai-router")
+
+
+def _file_state(path: Path | None) -> Tuple[int, int, int] | None:
+    if path is None:
+        return None
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+    return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+
+class ConfigWatcher:
+    """Background task reloading the routing table and keys when their files change."""
+
+    def __init__(self, interval: float, health_checker: HealthChecker | None = None) -> None:
+        self.interval = interval
+        self.health_checker = health_checker
+        self._state = _file_state(backend_loader.config_path())
+        self._keys_state = _file_state(api_keys.keys_file_path())
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task[None] | None = None
+        self._signal_installed = False
+
+    async def reload(self) -> bool:
+        """Reload now; return whether the new configuration was applied."""
+
+        async with self._lock:
+            self._state = _file_state(backend_loader.config_path())
+            try:
+                table = backend_loader.load_config()
+                # Clients first: the new table is only swapped in once every
+                # backend it routes to can be reached through the pool.
+                await client_pool.startup(table.backends)
+            except Exception as exc:
+                metrics.CONFIG_RELOADS.labels(config="backends", result="invalid").inc()
+                logger.warning(
+                    {"event": "config_reload_failed", "error": str(exc)},
+                    exc_info=not isinstance(exc, backend_loader.ConfigError),
+                )
+                return False
+
+            table = backend_loader.activate(table)
+            if self.health_checker is not None:
+                self.health_checker.set_backends(table.backends)
+            metrics.CONFIG_RELOADS.labels(config="backends", result="ok").inc()
+            logger.info({"event": "config_reloaded", "backends": len(table.backends), "models": len(table.models)})
+            return True
+
+    def reload_keys(self) -> bool:
+        """Reload the API keys; return whether the new keys were applied."""
+
+        self._keys_state = _file_state(api_keys.keys_file_path())
+        try:
+            registry = api_keys.reload_keys()
+        except api_keys.KeyConfigError as exc:
+            metrics.CONFIG_RELOADS.labels(config="api_keys", result="invalid").inc()
+            logger.warning({"event": "api_keys_reload_failed", "error": str(exc)})
+            return False
+        metrics.CONFIG_RELOADS.labels(config="api_keys", result="ok").inc()
+        logger.info({"event": "api_keys_reloaded", "keys": len(registry)})
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            if _file_state(api_keys.keys_file_path()) != self._keys_state:
+                self.reload_keys()
+            if _file_state(backend_loader.config_path()) != self._state:
+                await self.reload()
+
+    def _on_sighup(self) -> None:
+        self.reload_keys()
+        asyncio.get_running_loop().create_task(self.reload())
+
+    def start(self) -> None:
+        loop = asyncio.get_running_loop()
+        if not self._signal_installed and hasattr(signal, "SIGHUP"):
+            try:
+                loop.add_signal_handler(signal.SIGHUP, self._on_sighup)
+                self._signal_installed = True
+            except (NotImplementedError, RuntimeError):  # pragma: no cover - not the main thread / Windows
+                pass
+        if self._task is None and self.interval > 0:
+            self._task = loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._signal_installed:
+            asyncio.get_running_loop().remove_signal_handler(signal.SIGHUP)
+            self._signal_installed = False
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
@@ -0,0 +1,129 @@
+"""Background discovery of the models each backend serves.
+
+:class:`ModelDiscovery` asks every configured backend's replicas what they
+serve (Ollama ``/api/tags``, OpenAI-style ``/v1/models``) every
+*GENAI_MODEL_DISCOVERY_INTERVAL* seconds and hands the result to
+``backend_loader.set_discovered_models``.  The routing table then
+
+* lists the discovered models in its prerendered ``/v1/models`` payload, and
+* routes a model name that no exact route or rule covers to a backend that
+  reported serving it (instead of ``default_backend``).
+
+Nothing on the request path talks to a backend for this.  A backend that
+stops answering keeps its last list for *GENAI_MODEL_DISCOVERY_TTL* seconds
+before its models are dropped.  Ollama's ``name:latest`` is also routed as
+plain ``name``, like Ollama itself does.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Tuple
+
+import httpx
+
+from config import backend_loader
+from config.backend_loader import backend_urls
+from handlers import client_pool
+
+logger = logging.getLogger("genai-router")
+
+MODEL_PATHS = {
+    "ollama": "/api/tags",
+    "http": "/v1/models",
+}
+
+_LATEST = ":latest"
+
+
+def parse_models(backend_type: str, payload: Any) -> List[str]:
+    """Model names from an ``/api/tags`` or ``/v1/models`` response body."""
+
+    if not isinstance(payload, dict):
+        return []
+    if backend_type == "ollama":
+        entries = [entry for entry in payload.get("models") or [] if isinstance(entry, dict)]
+        names = [entry.get("name") or entry.get("model") for entry in entries]
+        names += [name[: -len(_LATEST)] for name in names if name and name.endswith(_LATEST)]
+    else:
+        names = [entry.get("id") for entry in payload.get("data") or [] if isinstance(entry, dict)]
+    return [name for name in names if isinstance(name, str) and name]
+
+
+class ModelDiscovery:
+    """Background task refreshing the discovered model list."""
+
+    def __init__(self, interval: float, ttl: float, timeout: float) -> None:
+        self.interval = interval
+        self.ttl = max(ttl, interval)
+        self.timeout = timeout
+        # backend key -> (monotonic time of the last answer, models)
+        self._found: Dict[str, Tuple[float, List[str]]] = {}
+        self._applied: Dict[str, List[str]] | None = None
+        self._task: asyncio.Task[None] | None = None
+
+    async def _fetch(self, url: str, backend: Mapping[str, Any]) -> List[str] | None:
+        path = MODEL_PATHS.get(backend.get("type", ""))
+        if path is None:
+            return None
+        try:
+            resp = await client_pool.get_client(url).get(url.rstrip("/") + path, timeout=self.timeout)
+            resp.raise_for_status()
+            return parse_models(backend["type"], resp.json())
+        except (httpx.HTTPError, ValueError) as exc:
+            logger.debug({"event": "model_discovery_failed", "replica": url, "error": str(exc)})
+            return None
+
+    async def _discover(self, backend: Mapping[str, Any]) -> List[str] | None:
+        """Union of the models the backend's reachable replicas serve."""
+
+        results = await asyncio.gather(*(self._fetch(url, backend) for url in backend_urls(backend)))
+        answered = [models for models in results if models is not None]
+        if not answered:
+            return None
+        return list(dict.fromkeys(name for models in answered for name in models))
+
+    async def refresh(self) -> Dict[str, List[str]]:
+        """Query every backend once and apply the result; return it."""
+
+        sources = backend_loader.get_routing_table().sources
+        keys = list(sources)
+        results = await asyncio.gather(*(self._discover(sources[key]) for key in keys))
+        now = time.monotonic()
+        for key, models in zip(keys, results):
+            if models is not None:
+                self._found[key] = (now, models)
+
+        live = {
+            key: models
+            for key, (seen, models) in self._found.items()
+            if key in sources and now - seen <= self.ttl
+        }
+        if live != self._applied:
+            backend_loader.set_discovered_models(live)
+            self._applied = live
+            logger.info({"event": "models_discovered", "models": {key: len(models) for key, models in live.items()}})
+        return live
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.refresh()
+            except Exception as exc:  # noqa: BLE001 - never let the loop die
+                logger.info({"event": "model_discovery_failed", "error": str(exc)})
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
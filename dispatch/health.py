@@ -0,0 +1,278 @@
+"""Circuit breakers and active health checking for backend replicas.
+
+Every replica URL owns a :class:`CircuitBreaker`:
+
+* **closed** – traffic flows; consecutive failures are counted.
+* **open** – the replica is skipped by routing until ``recovery_time`` passed.
+* **half_open** – a limited number of trial requests decide whether the
+  breaker closes again or re-opens.
+
+Breakers are fed by real request outcomes (see ``dispatch.balancer.Lease``)
+and by the :class:`HealthChecker` background task, which probes each replica
+(Ollama ``/api/tags``, OpenAI-style ``/v1/models``) every
+*GENAI_HEALTH_CHECK_INTERVAL* seconds.  A failed probe counts like a failed
+request, so a single slow probe does not open the breaker.
+
+A half-open trial that ends without a verdict (cancelled hedge, client gone,
+4xx) gives its slot back; trials still outstanding after ``recovery_time``
+expire so a lost lease cannot pin the breaker in half-open.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import time
+from typing import Any, Dict, List, Mapping, Tuple
+
+import httpx
+
+from config.backend_loader import backend_urls
+from config.settings import get_settings
+from dispatch import metrics
+from handlers import client_pool
+
+logger = logging.getLogger("genai-router")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+_STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+HEALTH_PATHS = {
+    "ollama": "/api/tags",
+    "http": "/v1/models",
+}
+
+
+class CircuitBreaker:
+    """Closed/open/half-open breaker for one replica."""
+
+    def __init__(
+        self,
+        name: str,
+        failure_threshold: int = 5,
+        recovery_time: float = 30.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.recovery_time = recovery_time
+        self.half_open_max_calls = half_open_max_calls
+        self.state = CLOSED
+        self.failures = 0
+        self._opened_at = 0.0
+        self._half_open_calls = 0
+        self._trial_started = 0.0
+        self._publish()
+
+    def allow(self) -> bool:
+        """Return ``True`` when a request may be sent to this replica."""
+
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            if time.monotonic() - self._opened_at < self.recovery_time:
+                return False
+            self._transition(HALF_OPEN)
+        # half-open: admit a limited number of trial calls
+        if self._trials_expired():
+            self._half_open_calls = 0
+        if self._half_open_calls >= self.half_open_max_calls:
+            return False
+        self._half_open_calls += 1
+        self._trial_started = time.monotonic()
+        return True
+
+    @property
+    def available(self) -> bool:
+        """Non-mutating variant of :meth:`allow` used for filtering."""
+
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN:
+            return time.monotonic() - self._opened_at >= self.recovery_time
+        return self._half_open_calls < self.half_open_max_calls or self._trials_expired()
+
+    def _trials_expired(self) -> bool:
+        return self._half_open_calls > 0 and time.monotonic() - self._trial_started >= self.recovery_time
+
+    def record_success(self) -> None:
+        self.failures = 0
+        if self.state != CLOSED:
+            self._transition(CLOSED)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == HALF_OPEN or self.failures >= self.failure_threshold:
+            self.trip()
+
+    def record_neutral(self) -> None:
+        """A trial call ended without a verdict; give its half-open slot back."""
+
+        if self.state == HALF_OPEN and self._half_open_calls > 0:
+            self._half_open_calls -= 1
+
+    def probe_succeeded(self) -> None:
+        """Let an open breaker move to half-open without waiting it out.
+
+        A passing health probe does not close the breaker on its own; real
+        traffic has to confirm recovery through the half-open state.  It does
+        free half-open trial slots that have been outstanding for longer
+        than ``recovery_time`` and resets the count of a closed breaker's
+        consecutive failures.
+        """
+
+        if self.state == OPEN:
+            self._opened_at = time.monotonic() - self.recovery_time
+        elif self.state == HALF_OPEN:
+            if self._trials_expired():
+                self._half_open_calls = 0
+        else:
+            self.failures = 0
+
+    def trip(self) -> None:
+        """Force the breaker open (e.g. after a failed health probe)."""
+
+        self._opened_at = time.monotonic()
+        if self.state != OPEN:
+            self._transition(OPEN)
+
+    def _transition(self, state: str) -> None:
+        logger.info({"event": "circuit_breaker", "replica": self.name, "from": self.state, "to": state})
+        self.state = state
+        self._half_open_calls = 0
+        if state == CLOSED:
+            self.failures = 0
+        self._publish()
+
+    def _publish(self) -> None:
+        metrics.CIRCUIT_STATE.labels(replica=self.name).set(_STATE_VALUES[self.state])
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_breaker(url: str, options: Mapping[str, Any] | None = None) -> CircuitBreaker:
+    """Return the breaker for *url*, creating it from settings/options."""
+
+    breaker = _breakers.get(url)
+    if breaker is None:
+        breaker = _breakers[url] = CircuitBreaker(url, **breaker_options(options))
+    return breaker
+
+
+def breaker_options(options: Mapping[str, Any] | None) -> Dict[str, Any]:
+    """Return :class:`CircuitBreaker` arguments from a ``circuit_breaker`` section.
+
+    Raises:
+        TypeError, ValueError: an option is not a number.
+    """
+
+    settings = get_settings()
+    opts = dict(options or {})
+    return {
+        "failure_threshold": int(opts.get("failure_threshold", settings.breaker_failure_threshold)),
+        "recovery_time": float(opts.get("recovery_time", settings.breaker_recovery_time)),
+        "half_open_max_calls": int(opts.get("half_open_max_calls", 1)),
+    }
+
+
+def breaker_states() -> Dict[str, str]:
+    """Return ``{replica_url: state}`` for all known breakers."""
+
+    return {url: breaker.state for url, breaker in _breakers.items()}
+
+
+class BackendUnavailableError(Exception):
+    """Raised when every replica of a backend has an open circuit breaker."""
+
+
+def is_backend_failure(exc: BaseException) -> bool:
+    """Return ``True`` if *exc* says the replica itself is unhealthy.
+
+    Transport errors and 5xx responses count; client errors (4xx) and
+    cancellations do not.
+    """
+
+    if isinstance(exc, httpx.TransportError):
+        return True
+    if not isinstance(exc, Exception):
+        return False
+    status = getattr(exc, "status_code", None)
+    return status is None or status >= 500
+
+
+# ---------------------------------------------------------------------------
+# Active health checks
+# ---------------------------------------------------------------------------
+
+
+def probe_targets(backends: Mapping[str, Mapping[str, Any]]) -> List[Tuple[str, str, Mapping[str, Any]]]:
+    """Return ``(replica_url, probe_url, backend)`` for every configured replica."""
+
+    if not backends:
+        backends = {"ollama": {"type": "ollama"}}
+
+    targets = []
+    for backend in backends.values():
+        path = backend.get("health_path") or HEALTH_PATHS.get(backend.get("type", ""))
+        if not path:
+            continue
+        for url in backend_urls(backend):
+            targets.append((url, url.rstrip("/") + path, backend))
+    return targets
+
+
+class HealthChecker:
+    """Background task probing every replica on a fixed interval."""
+
+    def __init__(self, backends: Mapping[str, Mapping[str, Any]], interval: float, timeout: float) -> None:
+        self.targets = probe_targets(backends)
+        self.interval = interval
+        self.timeout = timeout
+        self._task: asyncio.Task[None] | None = None
+
+    def set_backends(self, backends: Mapping[str, Mapping[str, Any]]) -> None:
+        """Probe *backends* from the next round on (after a config reload)."""
+
+        self.targets = probe_targets(backends)
+        self.start()
+
+    async def check_once(self) -> None:
+        await asyncio.gather(*(self._probe(*target) for target in self.targets))
+
+    async def _probe(self, url: str, probe_url: str, backend: Mapping[str, Any]) -> None:
+        breaker = get_breaker(url, backend.get("circuit_breaker"))
+        try:
+            resp = await client_pool.get_client(url).get(probe_url, timeout=self.timeout)
+            healthy = resp.status_code < 500
+        except httpx.HTTPError:
+            healthy = False
+
+        if healthy:
+            breaker.probe_succeeded()
+        else:
+            breaker.record_failure()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.check_once()
+            except Exception as exc:  # noqa: BLE001 - never let the loop die
+                logger.info({"event": "health_check_failed", "error": str(exc)})
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self._task is None and self.targets and self.interval > 0:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
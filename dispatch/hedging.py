@@ -0,0 +1,192 @@
+"""Hedged requests and budgeted retries with failover.
+
+:func:`run_with_failover` drives one logical request through several
+*attempts*.  Each attempt is started by a ``launch`` callable supplied by the
+router, which picks the next untried replica (or fallback backend):
+
+* **Retries** – when an attempt fails with a retryable error (transport
+  errors, 5xx) the next target is tried right away.
+* **Hedging** – when no attempt has produced a response (or first stream
+  chunk) within ``hedge_delay`` seconds, a second attempt is started in
+  parallel.  The first successful attempt wins and the others are cancelled.
+
+Both extra attempts are paid from a process-wide :class:`RetryBudget`, so
+retries cannot multiply traffic during an outage.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import time
+from functools import lru_cache
+from typing import Any, Awaitable, Callable, Dict, Mapping, Optional, Set
+
+from config.settings import get_settings
+from dispatch import metrics
+
+
+class RetryBudget:
+    """Token bucket limiting extra attempts to a fraction of regular traffic.
+
+    Every first attempt deposits ``ratio`` tokens; every retry or hedge
+    withdraws one.  A floor of ``min_per_sec`` tokens per second keeps
+    retries possible at low traffic.  The balance is capped at ``max_tokens``.
+    """
+
+    def __init__(self, ratio: float = 0.1, min_per_sec: float = 1.0, max_tokens: float = 100.0) -> None:
+        self.ratio = ratio
+        self.min_per_sec = min_per_sec
+        self.max_tokens = max_tokens
+        self._tokens = max_tokens
+        self._last = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.max_tokens, self._tokens + (now - self._last) * self.min_per_sec)
+        self._last = now
+
+    def deposit(self, amount: float | None = None) -> None:
+        """Credit ``ratio`` tokens (or *amount*, e.g. to refund a withdrawal)."""
+
+        self._refill()
+        self._tokens = min(self.max_tokens, self._tokens + (self.ratio if amount is None else amount))
+
+    def try_spend(self) -> bool:
+        self._refill()
+        if self._tokens >= 1.0:
+            self._tokens -= 1.0
+            return True
+        return False
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+
+@lru_cache()
+def get_retry_budget() -> RetryBudget:
+    """Return the process-wide retry budget configured from settings."""
+
+    settings = get_settings()
+    return RetryBudget(
+        ratio=settings.retry_budget_ratio,
+        min_per_sec=settings.retry_budget_min_per_sec,
+    )
+
+
+def hedge_options(backend: Mapping[str, Any]) -> Dict[str, Any] | None:
+    """Return the parsed ``hedge`` option of *backend*, ``None`` when not hedged.
+
+    ``hedge: true`` uses the *GENAI_HEDGE_* settings; a mapping may override
+    ``percentile``, ``min_delay`` and ``min_samples``.
+
+    Raises:
+        TypeError, ValueError: the option is malformed (checked when
+            ``backends.yaml`` is loaded).
+    """
+
+    hedge = backend.get("hedge")
+    if not hedge:
+        return None
+    if not isinstance(hedge, (bool, Mapping)):
+        raise TypeError("hedge must be true or a mapping")
+    options = hedge if isinstance(hedge, Mapping) else {}
+    settings = get_settings()
+    parsed = {
+        "percentile": float(options.get("percentile", settings.hedge_percentile)),
+        "min_delay": float(options.get("min_delay", settings.hedge_min_delay)),
+        "min_samples": int(options.get("min_samples", settings.hedge_min_samples)),
+    }
+    if not 0 <= parsed["percentile"] <= 100:
+        raise ValueError("hedge percentile must be between 0 and 100")
+    return parsed
+
+
+Launch = Callable[[], Optional[Awaitable[Any]]]
+
+
+async def run_with_failover(
+    launch: Launch,
+    *,
+    max_attempts: int,
+    hedge_delay: float | None,
+    retryable: Callable[[BaseException], bool],
+    discard: Callable[[Any], Awaitable[None]] | None = None,
+    budget: RetryBudget | None = None,
+) -> Any:
+    """Run attempts until one succeeds, retrying and hedging within budget.
+
+    Args:
+        launch: Starts the next attempt and returns its awaitable, or ``None``
+            when no untried target is left.
+        max_attempts: Upper bound on attempts (first attempt included).
+        hedge_delay: Seconds to wait before hedging; ``None`` disables it.
+        retryable: Decides whether a failed attempt may be retried.
+        discard: Cleans up the result of a losing attempt that completed too.
+        budget: Retry budget; defaults to :func:`get_retry_budget`.
+    """
+
+    budget = budget or get_retry_budget()
+    budget.deposit()
+
+    first = launch()
+    if first is None:
+        raise RuntimeError("run_with_failover: no target to launch")
+
+    pending: Set[asyncio.Future[Any]] = {asyncio.ensure_future(first)}
+    launched = 1
+    hedged = hedge_delay is None
+    last_exc: BaseException | None = None
+
+    def _start_extra(reason: str) -> bool:
+        nonlocal launched
+        if launched >= max_attempts:
+            return False
+        if not budget.try_spend():
+            metrics.RETRY_BUDGET_EXHAUSTED.inc()
+            return False
+        attempt = launch()
+        if attempt is None:
+            budget.deposit(1.0)  # nothing left to try, refund the token
+            return False
+        pending.add(asyncio.ensure_future(attempt))
+        launched += 1
+        metrics.EXTRA_ATTEMPTS.labels(reason=reason).inc()
+        return True
+
+    try:
+        while pending:
+            timeout = None if hedged else hedge_delay
+            done, _ = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+
+            if not done:
+                # Hedge timer fired before any attempt answered.
+                hedged = True
+                _start_extra("hedge")
+                continue
+
+            pending -= done
+            succeeded = [task for task in done if task.exception() is None]
+            if succeeded:
+                if discard is not None:
+                    for extra in succeeded[1:]:
+                        await discard(extra.result())
+                return succeeded[0].result()
+
+            for task in done:
+                last_exc = task.exception()
+                if retryable(last_exc):
+                    _start_extra("retry")
+
+        assert last_exc is not None
+        raise last_exc
+    finally:
+        for task in pending:
+            task.cancel()
+        if pending:
+            results = await asyncio.gather(*pending, return_exceptions=True)
+            if discard is not None:
+                for result in results:
+                    if not isinstance(result, BaseException):
+                        await discard(result)
@@ -0,0 +1,268 @@
+"""Per-backend and per-model concurrency limits with bounded admission queues.
+
+Limits are configured in ``config/backends.yaml``::
+
+    backends:
+      ollama:
+        type: ollama
+        max_concurrency: 4      # in-flight requests sent to this backend
+        max_queue: 32           # waiting requests before rejecting
+        queue_timeout: 10       # seconds a request may wait for a slot
+
+    model_limits:
+      llama3:70b:
+        max_concurrency: 1
+
+Requests that find every slot taken wait in a priority queue (FIFO within a
+priority).  When the queue is full, or no slot frees up within
+``queue_timeout``, the request is rejected with :class:`AdmissionRejected`,
+which the router turns into ``503`` with a ``Retry-After`` header.
+
+Failover and hedge attempts to a ``fallbacks`` backend pass that backend's
+limiters too, but never queue for them: a fallback without a free slot is
+skipped (see :func:`try_admit`).
+
+A backend may also declare ``adaptive_concurrency`` (see
+``dispatch.adaptive``); its limit is then adjusted from observed latency and
+errors by an :class:`AdaptiveConcurrencyLimiter`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import heapq
+import itertools
+import math
+import time
+from typing import Any, Dict, List, Mapping, Tuple
+
+from config.backend_loader import get_model_limits
+from config.settings import get_settings
+from dispatch import metrics
+from dispatch.adaptive import make_algorithm
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request cannot get a concurrency slot in time."""
+
+    def __init__(self, limiter: str, reason: str, retry_after: float) -> None:
+        super().__init__(f"{limiter}: {reason.replace('_', ' ')}")
+        self.limiter = limiter
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class ConcurrencyLimiter:
+    """Counting semaphore with a bounded, prioritised wait queue."""
+
+    def __init__(self, name: str, limit: int, max_queue: int, queue_timeout: float) -> None:
+        self.name = name
+        self.limit = max(1, int(limit))
+        self.max_queue = max(0, int(max_queue))
+        self.queue_timeout = float(queue_timeout)
+        self.in_use = 0
+        self.queued = 0
+        # heap of [-priority, seq, future]
+        self._waiters: List[list] = []
+        self._seq = itertools.count()
+
+    async def acquire(self, priority: int = 0) -> None:
+        """Wait for a slot; higher *priority* values are served first.
+
+        Raises:
+            AdmissionRejected: queue full or ``queue_timeout`` exceeded.
+        """
+
+        if self.try_acquire():
+            return
+
+        if self.queued >= self.max_queue:
+            self._reject("queue_full")
+
+        fut: asyncio.Future[None] = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, [-priority, next(self._seq), fut])
+        self.queued += 1
+        metrics.LIMITER_QUEUE_DEPTH.labels(limiter=self.name).set(self.queued)
+        start = time.perf_counter()
+        try:
+            await asyncio.wait_for(fut, self.queue_timeout)
+        except asyncio.TimeoutError:
+            self._reject("queue_timeout")
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                # Slot was granted just as the caller went away.
+                self.release()
+            raise
+        finally:
+            self.queued -= 1
+            metrics.LIMITER_QUEUE_DEPTH.labels(limiter=self.name).set(self.queued)
+            metrics.LIMITER_WAIT.labels(limiter=self.name).observe(time.perf_counter() - start)
+
+    def try_acquire(self) -> bool:
+        """Take a slot if one is free and nobody is queued; never waits."""
+
+        if self.in_use < self.limit and self.queued == 0:
+            self._grant()
+            return True
+        return False
+
+    def release(self) -> None:
+        """Return a slot and hand it to the next waiter, if any."""
+
+        self.in_use -= 1
+        metrics.LIMITER_IN_USE.labels(limiter=self.name).set(self.in_use)
+        self._drain()
+
+    def set_limit(self, limit: int) -> None:
+        """Change the number of slots, admitting waiters if it grew."""
+
+        self.limit = max(1, int(limit))
+        metrics.LIMITER_LIMIT.labels(limiter=self.name).set(self.limit)
+        self._drain()
+
+    def record(self, latency: float, ok: bool) -> None:
+        """Observe a finished request; static limiters ignore samples."""
+
+    def _grant(self) -> None:
+        self.in_use += 1
+        metrics.LIMITER_IN_USE.labels(limiter=self.name).set(self.in_use)
+
+    def _drain(self) -> None:
+        while self._waiters and self.in_use < self.limit:
+            _, _, fut = heapq.heappop(self._waiters)
+            if fut.done():
+                continue  # timed out or cancelled while queued
+            self._grant()
+            fut.set_result(None)
+
+    def _reject(self, reason: str) -> None:
+        metrics.LIMITER_REJECTIONS.labels(limiter=self.name, reason=reason).inc()
+        raise AdmissionRejected(self.name, reason, retry_after=max(1.0, self.queue_timeout))
+
+
+class AdaptiveConcurrencyLimiter(ConcurrencyLimiter):
+    """Limiter whose slot count follows an adaptive algorithm.
+
+    See ``dispatch.adaptive`` for the available algorithms.
+    """
+
+    def __init__(self, name: str, algorithm: Any, max_queue: int, queue_timeout: float) -> None:
+        super().__init__(name, int(algorithm.limit), max_queue, queue_timeout)
+        self.algorithm = algorithm
+
+    def record(self, latency: float, ok: bool) -> None:
+        new_limit = self.algorithm.update(latency, ok, self.in_use)
+        if int(new_limit) != self.limit:
+            self.set_limit(int(new_limit))
+
+
+_limiters: Dict[str, ConcurrencyLimiter] = {}
+
+
+def queue_options(options: Mapping[str, Any]) -> Tuple[int, float]:
+    """Return ``(max_queue, queue_timeout)`` of a limits section.
+
+    Raises:
+        TypeError, ValueError: an option is not a number.
+    """
+
+    settings = get_settings()
+    return (
+        int(options.get("max_queue", settings.limiter_max_queue)),
+        float(options.get("queue_timeout", settings.limiter_queue_timeout)),
+    )
+
+
+def _limiter(name: str, options: Mapping[str, Any]) -> ConcurrencyLimiter:
+    limit = int(options["max_concurrency"])
+    max_queue, timeout = queue_options(options)
+
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters[name] = ConcurrencyLimiter(name, limit, max_queue, timeout)
+        metrics.LIMITER_LIMIT.labels(limiter=name).set(limiter.limit)
+    else:
+        limiter.max_queue, limiter.queue_timeout = max_queue, timeout
+        if limiter.limit != limit:
+            limiter.set_limit(limit)
+    return limiter
+
+
+def _adaptive_limiter(name: str, options: Mapping[str, Any]) -> ConcurrencyLimiter:
+    limiter = _limiters.get(name)
+    if limiter is None:
+        limiter = _limiters[name] = AdaptiveConcurrencyLimiter(
+            name, make_algorithm(options), *queue_options(options)
+        )
+        metrics.LIMITER_LIMIT.labels(limiter=name).set(limiter.limit)
+    return limiter
+
+
+def limiters_for(backend: Mapping[str, Any], model: str) -> List[ConcurrencyLimiter]:
+    """Return the limiters a request for *model* on *backend* must pass.
+
+    The model limiter comes first so a busy model cannot hold backend slots
+    while waiting for its own.
+    """
+
+    limiters = []
+    model_options = get_model_limits().get(model)
+    if model_options and model_options.get("max_concurrency"):
+        limiters.append(_limiter(f"model:{model}", model_options))
+    limiters.extend(backend_limiters(backend))
+    return limiters
+
+
+def backend_limiters(backend: Mapping[str, Any]) -> List[ConcurrencyLimiter]:
+    """Return the limiters of *backend* alone (without the model limiter)."""
+
+    limiters = []
+    name = backend.get("name", "default")
+    if backend.get("max_concurrency"):
+        limiters.append(_limiter(f"backend:{name}", backend))
+    if backend.get("adaptive_concurrency"):
+        limiters.append(_adaptive_limiter(f"adaptive:{name}", backend["adaptive_concurrency"]))
+    return limiters
+
+
+async def admit(limiters: List[ConcurrencyLimiter], priority: int = 0) -> None:
+    """Acquire every limiter in order, releasing already held ones on failure."""
+
+    held: List[ConcurrencyLimiter] = []
+    try:
+        for limiter in limiters:
+            await limiter.acquire(priority)
+            held.append(limiter)
+    except BaseException:
+        for limiter in reversed(held):
+            limiter.release()
+        raise
+
+
+def try_admit(limiters: List[ConcurrencyLimiter]) -> bool:
+    """Acquire every limiter without waiting; ``False`` (holding none) if one is full."""
+
+    held: List[ConcurrencyLimiter] = []
+    for limiter in limiters:
+        if not limiter.try_acquire():
+            metrics.LIMITER_REJECTIONS.labels(limiter=limiter.name, reason="fallback_busy").inc()
+            release_all(held)
+            return False
+        held.append(limiter)
+    return True
+
+
+def record_all(limiters: List[ConcurrencyLimiter], latency: float, ok: bool) -> None:
+    """Feed one request outcome to every (adaptive) limiter."""
+
+    for limiter in limiters:
+        limiter.record(latency, ok)
+
+
+def release_all(limiters: List[ConcurrencyLimiter]) -> None:
+    for limiter in reversed(limiters):
+        limiter.release()
+
+
+def retry_after_header(exc: AdmissionRejected) -> str:
+    return str(int(math.ceil(exc.retry_after)))
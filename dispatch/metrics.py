@@ -0,0 +1,214 @@
+"""Prometheus metrics for the dispatch layer.
+
+``prometheus_client`` is an optional dependency (see ``main.py``).  When it is
+missing the metric objects below are replaced by no-op stand-ins so the
+dispatch code can record metrics unconditionally.
+"""
+
+from __future__ import annotations
+
+from typing import Any
+
+try:
+    from prometheus_client import Counter, Gauge, Histogram
+
+    PROM_AVAILABLE = True
+except ModuleNotFoundError:  # pragma: no cover
+    PROM_AVAILABLE = False
+
+    class _NoopMetric:
+        def __init__(self, *args: Any, **kwargs: Any) -> None:
+            pass
+
+        def labels(self, *args: Any, **kwargs: Any) -> "_NoopMetric":
+            return self
+
+        def inc(self, amount: float = 1) -> None:
+            pass
+
+        def dec(self, amount: float = 1) -> None:
+            pass
+
+        def set(self, value: float) -> None:
+            pass
+
+        def observe(self, value: float) -> None:
+            pass
+
+    Counter = Gauge = Histogram = _NoopMetric  # type: ignore[misc,assignment]
+
+
+# ---------------------------------------------------------------------------
+# Response cache
+# ---------------------------------------------------------------------------
+
+CACHE_HITS = Counter("genai_cache_hits_total", "Response cache hits")
+CACHE_MISSES = Counter("genai_cache_misses_total", "Response cache misses")
+CACHE_EVICTIONS = Counter(
+    "genai_cache_evictions_total",
+    "Response cache evictions",
+    ["reason"],
+)
+CACHE_BYTES = Gauge("genai_cache_bytes", "Bytes currently held by the response cache")
+
+# ---------------------------------------------------------------------------
+# Request coalescing
+# ---------------------------------------------------------------------------
+
+COALESCED_REQUESTS = Counter(
+    "genai_coalesced_requests_total",
+    "Requests served by joining an identical in-flight upstream call",
+    ["mode"],
+)
+
+# ---------------------------------------------------------------------------
+# Stream frame coalescing
+# ---------------------------------------------------------------------------
+
+STREAM_FRAMES_SENT = Counter(
+    "genai_stream_frames_sent_total",
+    "SSE frames written to clients by the coalescing stage",
+)
+STREAM_FRAMES_SAVED = Counter(
+    "genai_stream_frames_saved_total",
+    "Upstream stream chunks merged into an earlier frame instead of sent alone",
+)
+
+# ---------------------------------------------------------------------------
+# Per backend / model upstream traffic (see dispatch/backend_metrics.py)
+# ---------------------------------------------------------------------------
+
+_TOKEN_BUCKETS = (0.005, 0.01, 0.02, 0.05, 0.1, 0.2, 0.5, 1.0, 2.5)
+
+BACKEND_IN_FLIGHT = Gauge(
+    "genai_backend_in_flight",
+    "Upstream requests in flight per backend and model",
+    ["backend", "model"],
+)
+BACKEND_TTFT = Histogram(
+    "genai_backend_time_to_first_token_seconds",
+    "Time from sending a streaming request upstream to its first chunk",
+    ["backend", "model"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0),
+)
+BACKEND_INTER_TOKEN = Histogram(
+    "genai_backend_inter_token_seconds",
+    "Time between consecutive upstream stream chunks",
+    ["backend", "model"],
+    buckets=_TOKEN_BUCKETS,
+)
+BACKEND_DURATION = Histogram(
+    "genai_backend_request_duration_seconds",
+    "Upstream request duration (to the end of the stream for streaming requests)",
+    ["backend", "model", "stream"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0),
+)
+BACKEND_TOKENS = Counter(
+    "genai_backend_tokens_total",
+    "Tokens reported by backends (usage / Ollama eval counts)",
+    ["backend", "model", "type"],
+)
+BACKEND_ERRORS = Counter(
+    "genai_backend_errors_total",
+    "Failed upstream attempts by error class",
+    ["backend", "model", "error"],
+)
+
+# ---------------------------------------------------------------------------
+# Replica load balancing
+# ---------------------------------------------------------------------------
+
+REPLICA_IN_FLIGHT = Gauge(
+    "genai_replica_in_flight",
+    "In-flight requests per backend replica",
+    ["replica"],
+)
+REPLICA_LATENCY_EWMA = Gauge(
+    "genai_replica_latency_ewma_seconds",
+    "Exponentially weighted average latency per backend replica",
+    ["replica"],
+)
+
+# ---------------------------------------------------------------------------
+# Health checks / circuit breakers
+# ---------------------------------------------------------------------------
+
+CIRCUIT_STATE = Gauge(
+    "genai_circuit_breaker_state",
+    "Circuit breaker state per replica (0=closed, 1=half_open, 2=open)",
+    ["replica"],
+)
+
+# ---------------------------------------------------------------------------
+# Hedging / retries
+# ---------------------------------------------------------------------------
+
+EXTRA_ATTEMPTS = Counter(
+    "genai_extra_attempts_total",
+    "Additional upstream attempts started by hedging or retries",
+    ["reason"],
+)
+RETRY_BUDGET_EXHAUSTED = Counter(
+    "genai_retry_budget_exhausted_total",
+    "Retries or hedges skipped because the retry budget was empty",
+)
+
+# ---------------------------------------------------------------------------
+# Concurrency limits / admission queue
+# ---------------------------------------------------------------------------
+
+LIMITER_LIMIT = Gauge(
+    "genai_limiter_limit",
+    "Configured concurrency limit per limiter",
+    ["limiter"],
+)
+LIMITER_IN_USE = Gauge(
+    "genai_limiter_in_use",
+    "Slots currently held per limiter",
+    ["limiter"],
+)
+LIMITER_QUEUE_DEPTH = Gauge(
+    "genai_limiter_queue_depth",
+    "Requests waiting for a slot per limiter",
+    ["limiter"],
+)
+LIMITER_WAIT = Histogram(
+    "genai_limiter_wait_seconds",
+    "Time spent waiting in the admission queue",
+    ["limiter"],
+)
+LIMITER_REJECTIONS = Counter(
+    "genai_limiter_rejections_total",
+    "Requests rejected by a concurrency limiter",
+    ["limiter", "reason"],
+)
+
+# ---------------------------------------------------------------------------
+# Requests rejected before the logging/metrics middleware (see main.py)
+# ---------------------------------------------------------------------------
+
+REJECTED_REQUESTS = Counter(
+    "genai_rejected_requests_total",
+    "Requests rejected by the auth or rate-limit middleware",
+    ["reason"],
+)
+
+# ---------------------------------------------------------------------------
+# Event loop (see diagnostics/loop_monitor.py)
+# ---------------------------------------------------------------------------
+
+EVENT_LOOP_LAG = Histogram(
+    "genai_event_loop_lag_seconds",
+    "How late the event-loop lag probe woke up",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+# ---------------------------------------------------------------------------
+# Configuration reloads (see dispatch/config_reload.py)
+# ---------------------------------------------------------------------------
+
+CONFIG_RELOADS = Counter(
+    "genai_config_reloads_total",
+    "Configuration reload attempts (backends.yaml, API keys file)",
+    ["config", "result"],
+)
@@ -0,0 +1,100 @@
+"""Zero-parse request passthrough for OpenAI-compatible HTTP backends.
+
+A ``type: http`` backend with ``passthrough: true`` receives the client's
+request body byte for byte, and its response (including SSE streams) is
+relayed without being decoded::
+
+    backends:
+      openai-proxy:
+        type: http
+        base_url: http://llm.internal:8000
+        passthrough: true
+
+Routing only needs ``model`` (and ``stream``), which :func:`peek` pulls out
+of the raw bytes with a regular expression instead of parsing the whole
+conversation.  The expression only matches the keys themselves (a quote
+inside a string value is always escaped), but it cannot tell nesting levels
+apart.  A body with more than one ``model`` or ``stream`` key (a duplicate,
+which JSON parsers resolve to the *last* one, or a nested object using the
+name) or with such a key spelled with ``\\u`` escapes is therefore not
+peeked at and goes through the full parser, so the model that is routed and
+checked is the one the backend serves.
+
+Passthrough requests skip the response cache, request coalescing and
+response validation; auth, rate limiting, concurrency limits, balancing,
+failover and metrics apply as usual.
+"""
+
+from __future__ import annotations
+
+import json
+import re
+from typing import Dict, Tuple
+
+from schemas.chat import ChatCompletionRequest
+
+_KEY_RE = re.compile(rb'"(model|stream)"\s*:')
+_MODEL_VALUE_RE = re.compile(rb'\s*"((?:[^"\\]|\\.)*)"')
+_STREAM_VALUE_RE = re.compile(rb"\s*(true|false)")
+# ``\u0061`` .. ``\u007a``: a body without one cannot spell a key with escapes.
+_ESCAPED_LETTER_RE = re.compile(rb"\\u00(?:6[1-9a-fA-F]|7[0-9aA])")
+
+
+def _key_re(name: str) -> re.Pattern[bytes]:
+    """``"name":`` with any of its letters possibly spelled as ``\\u00XX``."""
+
+    letters = (rb"(?:%s|\\u00(?i:%x))" % (c.encode(), ord(c)) for c in name)
+    return re.compile(b'"' + b"".join(letters) + rb'"\s*:')
+
+
+_ESCAPED_KEY_RES = (_key_re("model"), _key_re("stream"))
+
+
+def _has_escaped_key(body: bytes) -> bool:
+    if b"\\u00" not in body or _ESCAPED_LETTER_RE.search(body) is None:
+        return False
+    return any(b"\\" in match.group() for key_re in _ESCAPED_KEY_RES for match in key_re.finditer(body))
+
+
+def peek(body: bytes) -> Tuple[str, bool] | None:
+    """Return ``(model, stream)`` from a raw JSON request, or ``None``.
+
+    ``None`` also means the keys are ambiguous; the caller parses the body.
+    """
+
+    keys: Dict[bytes, int] = {}
+    for key in _KEY_RE.finditer(body):
+        if key.group(1) in keys:
+            return None
+        keys[key.group(1)] = key.end()
+    if b"model" not in keys or _has_escaped_key(body):
+        return None
+    match = _MODEL_VALUE_RE.match(body, keys[b"model"])
+    if match is None:
+        return None
+    value = match.group(1)
+    try:
+        model = json.loads(b'"' + value + b'"') if b"\\" in value else value.decode("utf-8")
+    except ValueError:
+        return None
+    stream = _STREAM_VALUE_RE.match(body, keys[b"stream"]) if b"stream" in keys else None
+    return model, stream is not None and stream.group(1) == b"true"
+
+
+class RawChatRequest:
+    """A chat request kept as the bytes the client sent."""
+
+    __slots__ = ("body", "model", "stream", "_parsed")
+
+    def __init__(self, body: bytes, model: str, stream: bool) -> None:
+        self.body = body
+        self.model = model
+        self.stream = stream
+        self._parsed: ChatCompletionRequest | None = None
+
+    def parsed(self) -> ChatCompletionRequest:
+        """Parse the body, for fallback backends that cannot take raw bytes."""
+
+        if self._parsed is None:
+            self._parsed = ChatCompletionRequest.model_validate_json(self.body)
+        return self._parsed
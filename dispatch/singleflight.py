@@ -0,0 +1,228 @@
+"""Single-flight coalescing of identical in-flight completion requests.
+
+When several identical deterministic requests (``temperature == 0``, same
+canonical key, see ``dispatch.cache.request_key``) arrive while the first one
+is still being served, only one upstream call is made.  Sampled requests are
+never merged: every caller is owed its own completion.
+
+* Non-streaming callers all await the same upstream task.
+* Streaming callers subscribe to one upstream SSE generator.  Chunks are
+  fanned out to every subscriber; late joiners first replay the chunks that
+  were already emitted.
+
+A shared stream buffers at most *GENAI_COALESCE_MAX_CHUNKS* chunks.  Once
+that many were emitted it stops taking late joiners (they get a stream of
+their own) and drops the chunks every subscriber has seen; upstream is not
+read further while the slowest subscriber is that many chunks behind.
+
+The upstream call is cancelled once the last interested caller goes away.
+"""
+
+from __future__ import annotations
+
+import asyncio
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, TypeVar
+
+from config.settings import get_settings
+from dispatch import metrics
+from dispatch.cache import request_key
+from schemas.chat import ChatCompletionRequest
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters")
+
+    def __init__(self, task: "asyncio.Future[Any]") -> None:
+        self.task = task
+        self.waiters = 0
+
+
+class _Broadcast:
+    """Fan out one upstream async iterator to many subscribers."""
+
+    def __init__(self, source: AsyncIterator[Any], max_chunks: int) -> None:
+        self.chunks: List[Any] = []
+        self.base = 0  # stream index of ``chunks[0]``
+        self.max_chunks = max(1, max_chunks)
+        self.done = False
+        self.error: BaseException | None = None
+        # subscriber token -> index of the next chunk it reads
+        self.positions: Dict[object, int] = {}
+        self.closing = False
+        self._changed = asyncio.Event()
+        self._drained = asyncio.Event()
+        self._task = asyncio.ensure_future(self._pump(source))
+
+    @property
+    def emitted(self) -> int:
+        return self.base + len(self.chunks)
+
+    async def _pump(self, source: AsyncIterator[Any]) -> None:
+        try:
+            async for chunk in source:
+                self.chunks.append(chunk)
+                self._notify()
+                # Backpressure: do not run further ahead of the slowest reader.
+                while self.emitted - self._slowest() >= self.max_chunks:
+                    await self._drained.wait()
+        except asyncio.CancelledError:
+            self.error = asyncio.CancelledError()
+            raise
+        except BaseException as exc:  # noqa: BLE001 - re-raised in subscribers
+            self.error = exc
+        finally:
+            self.done = True
+            self._notify()
+            aclose = getattr(source, "aclose", None)
+            if aclose is not None:
+                await aclose()
+
+    async def wait(self) -> None:
+        """Block until a new chunk is available or the stream ends."""
+        await self._changed.wait()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+
+    def _slowest(self) -> int:
+        return min(self.positions.values(), default=self.emitted)
+
+    def chunk(self, index: int) -> Any:
+        return self.chunks[index - self.base]
+
+    def advance(self, token: object, index: int) -> None:
+        """Record that *token* read up to *index*; drop chunks nobody needs."""
+
+        self.positions[token] = index
+        self._trim()
+
+    def _trim(self) -> None:
+        if self.emitted < self.max_chunks:
+            return  # still replayed to late joiners
+        slowest = self._slowest()
+        if slowest > self.base:
+            del self.chunks[: slowest - self.base]
+            self.base = slowest
+            self._drained.set()
+            self._drained = asyncio.Event()
+
+    @property
+    def joinable(self) -> bool:
+        return (
+            not self.done
+            and not self._task.cancelled()
+            and not self.closing
+            and self.emitted < self.max_chunks
+        )
+
+    def subscribe(self, token: object) -> None:
+        self.positions[token] = self.base
+
+    def release(self, token: object) -> None:
+        """Drop one subscriber; cancel upstream when nobody is listening."""
+
+        del self.positions[token]
+        if not self.positions and not self.done:
+            self.closing = True
+            self._task.cancel()
+        else:
+            self._trim()
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share the same key."""
+
+    def __init__(self, max_chunks: int | None = None) -> None:
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        # ``None``: *GENAI_COALESCE_MAX_CHUNKS*
+        self.max_chunks = max_chunks
+
+    def in_flight(self) -> int:
+        return len(self._calls) + len(self._streams)
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run ``fn()`` once for all concurrent callers using *key*."""
+
+        call = self._calls.get(key)
+        if call is None:
+            task = asyncio.ensure_future(fn())
+            call = self._calls[key] = _Call(task)
+            task.add_done_callback(lambda _t, c=call: self._forget_call(key, c))
+        else:
+            metrics.COALESCED_REQUESTS.labels(mode="unary").inc()
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.waiters == 1 and not call.task.done():
+                call.task.cancel()
+            raise
+        finally:
+            call.waiters -= 1
+
+    def stream(self, key: str, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        """Return an iterator over the shared upstream stream for *key*."""
+
+        return self._subscribe(key, factory)
+
+    async def _subscribe(self, key: str, factory: Callable[[], AsyncIterator[T]]) -> AsyncIterator[T]:
+        broadcast = self._streams.get(key)
+        if broadcast is None or not broadcast.joinable:
+            max_chunks = self.max_chunks if self.max_chunks is not None else get_settings().coalesce_max_chunks
+            broadcast = self._streams[key] = _Broadcast(factory(), max_chunks)
+            broadcast._task.add_done_callback(lambda _t, b=broadcast: self._forget_stream(key, b))
+        else:
+            metrics.COALESCED_REQUESTS.labels(mode="stream").inc()
+
+        token = object()
+        broadcast.subscribe(token)
+        index = broadcast.base
+        try:
+            while True:
+                if index < broadcast.emitted:
+                    chunk = broadcast.chunk(index)
+                    index += 1
+                    broadcast.advance(token, index)
+                    yield chunk
+                    continue
+                if broadcast.done:
+                    if broadcast.error is not None:
+                        raise broadcast.error
+                    return
+                await broadcast.wait()
+        finally:
+            broadcast.release(token)
+
+    def _forget_call(self, key: str, call: _Call) -> None:
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def _forget_stream(self, key: str, broadcast: _Broadcast) -> None:
+        if self._streams.get(key) is broadcast:
+            del self._streams[key]
+
+
+_single_flight = SingleFlight()
+
+
+def get_single_flight() -> SingleFlight:
+    """Return the process-wide coalescer shared by all handlers."""
+    return _single_flight
+
+
+def coalesce_key(body: ChatCompletionRequest, target: str) -> str | None:
+    """Return the coalescing key for *body* sent to *target*.
+
+    ``None`` means the request is not coalesced: it samples
+    (``temperature != 0``) or coalescing is disabled via
+    *GENAI_COALESCE_REQUESTS*.
+    """
+
+    if body.temperature != 0 or not get_settings().coalesce_requests:
+        return None
+    return f"{target}|{request_key(body)}"
@@ -0,0 +1,226 @@
+"""Registry of long-lived, pooled HTTP clients for configured backends.
+
+Creating an ``httpx.AsyncClient`` per request throws away the connection pool
+and forces a fresh TCP (and TLS) handshake for every completion.  This module
+keeps **one** client per backend ``base_url`` (or replica URL) for the
+lifetime of the process.
+
+Pool behaviour can be tuned per backend entry in ``config/backends.yaml``::
+
+    backends:
+      http-mcp:
+        type: http
+        base_url: http://mcp.internal:8000
+        pool:
+          max_connections: 100
+          max_keepalive_connections: 20
+          keepalive_expiry: 30
+          http2: false
+          connect_timeout: 5
+          read_timeout: 60
+          stream_read_timeout: 600   # between chunks of a stream; default: none
+          warm_connections: 2
+
+All keys are optional.  ``read_timeout`` bounds non-streaming requests;
+streams only time out between chunks after ``stream_read_timeout`` since a
+long prefill can delay the first token for minutes (see
+:func:`stream_timeout`).  ``startup`` is called from the FastAPI lifespan to
+create the clients and open warm connections, ``shutdown`` closes them again.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+from typing import Any, Dict, Mapping
+
+import httpx
+
+from config.backend_loader import backend_urls
+
+logger = logging.getLogger("genai-router")
+
+DEFAULT_POOL_OPTIONS: Dict[str, Any] = {
+    "max_connections": 100,
+    "max_keepalive_connections": 20,
+    "keepalive_expiry": 30.0,
+    "http2": False,
+    "connect_timeout": 10.0,
+    "read_timeout": 60.0,
+    "stream_read_timeout": None,
+    "warm_connections": 1,
+}
+
+# base_url (without trailing slash) -> shared client
+_clients: Dict[str, httpx.AsyncClient] = {}
+# base_url (without trailing slash) -> timeout for streaming requests
+_stream_timeouts: Dict[str, httpx.Timeout] = {}
+
+
+def _normalise(base_url: str) -> str:
+    return base_url.rstrip("/")
+
+
+# Numeric pool options and their types; ``None`` means no limit / no timeout.
+_NUMERIC_OPTIONS = {
+    "max_connections": int,
+    "max_keepalive_connections": int,
+    "keepalive_expiry": float,
+    "connect_timeout": float,
+    "read_timeout": float,
+    "stream_read_timeout": float,
+    "warm_connections": int,
+}
+_REQUIRED_OPTIONS = ("warm_connections",)
+
+
+def pool_options(backend: Mapping[str, Any]) -> Dict[str, Any]:
+    """Return the effective pool options for a backend entry.
+
+    Raises:
+        TypeError, ValueError: ``pool`` is not a mapping or an option has the
+            wrong type (checked when ``backends.yaml`` is loaded).
+    """
+
+    pool = backend.get("pool") or {}
+    if not isinstance(pool, Mapping):
+        raise TypeError("pool must be a mapping")
+    options = dict(DEFAULT_POOL_OPTIONS)
+    options.update(pool)
+    for name, kind in _NUMERIC_OPTIONS.items():
+        value = options[name]
+        if value is None and name not in _REQUIRED_OPTIONS:
+            continue
+        try:
+            options[name] = kind(value)
+        except (TypeError, ValueError):
+            raise ValueError(f"pool option {name} must be a number, not {value!r}") from None
+    options["http2"] = bool(options["http2"])
+    return options
+
+
+def build_client(backend: Mapping[str, Any]) -> httpx.AsyncClient:
+    """Create a new ``httpx.AsyncClient`` configured from a backend entry."""
+
+    options = pool_options(backend)
+    limits = httpx.Limits(
+        max_connections=options["max_connections"],
+        max_keepalive_connections=options["max_keepalive_connections"],
+        keepalive_expiry=options["keepalive_expiry"],
+    )
+    timeout = httpx.Timeout(
+        options["read_timeout"],
+        connect=options["connect_timeout"],
+    )
+    return httpx.AsyncClient(
+        limits=limits,
+        timeout=timeout,
+        http2=bool(options["http2"]),
+    )
+
+
+def _stream_timeout(options: Mapping[str, Any]) -> httpx.Timeout:
+    read = options["stream_read_timeout"]
+    return httpx.Timeout(
+        options["read_timeout"],
+        connect=options["connect_timeout"],
+        read=float(read) if read is not None else None,
+    )
+
+
+def stream_timeout(base_url: str) -> httpx.Timeout:
+    """Return the timeout to pass to ``client.stream`` for *base_url*."""
+
+    timeout = _stream_timeouts.get(_normalise(base_url))
+    if timeout is None:
+        timeout = _stream_timeout(DEFAULT_POOL_OPTIONS)
+    return timeout
+
+
+def get_client(base_url: str) -> httpx.AsyncClient:
+    """Return the shared client for *base_url*, creating it on first use.
+
+    Backends registered through :func:`startup` get their configured pool;
+    unknown URLs fall back to :data:`DEFAULT_POOL_OPTIONS`.
+    """
+
+    key = _normalise(base_url)
+    client = _clients.get(key)
+    if client is None or client.is_closed:
+        client = build_client({"base_url": base_url})
+        _clients[key] = client
+    return client
+
+
+def connection_usage(client: httpx.AsyncClient) -> Dict[str, int] | None:
+    """Return ``{"active", "idle", "max"}`` connection counts of *client*'s pool.
+
+    Reads httpcore's pool state; ``None`` when the transport does not expose it.
+    """
+
+    pool = getattr(getattr(client, "_transport", None), "_pool", None)
+    connections = getattr(pool, "connections", None)
+    if connections is None:
+        return None
+    idle = sum(1 for conn in connections if conn.is_idle())
+    return {
+        "active": len(connections) - idle,
+        "idle": idle,
+        "max": getattr(pool, "_max_connections", None) or 0,
+    }
+
+
+def connection_stats() -> Dict[str, Dict[str, int]]:
+    """Return :func:`connection_usage` for every pooled client, by base URL."""
+
+    stats = {}
+    for url, client in list(_clients.items()):
+        usage = connection_usage(client)
+        if usage is not None:
+            stats[url] = usage
+    return stats
+
+
+async def _warm(client: httpx.AsyncClient, base_url: str, connections: int) -> None:
+    """Open *connections* keep-alive connections to *base_url* (best effort)."""
+
+    async def _probe() -> None:
+        try:
+            resp = await client.get(base_url)
+            await resp.aclose()
+        except httpx.HTTPError as exc:
+            logger.info({"event": "pool_warmup_failed", "base_url": base_url, "error": str(exc)})
+
+    await asyncio.gather(*(_probe() for _ in range(connections)))
+
+
+async def startup(backends: Mapping[str, Mapping[str, Any]]) -> None:
+    """Create a pooled client for every HTTP backend replica and warm it."""
+
+    warmups = []
+    for backend in backends.values():
+        if backend.get("type") != "http":
+            continue
+        connections = pool_options(backend)["warm_connections"]
+        for url in backend_urls(backend):
+            key = _normalise(url)
+            if key in _clients:
+                continue
+            client = build_client(backend)
+            _clients[key] = client
+            _stream_timeouts[key] = _stream_timeout(pool_options(backend))
+            if connections > 0:
+                warmups.append(_warm(client, key, connections))
+
+    if warmups:
+        await asyncio.gather(*warmups)
+
+
+async def shutdown() -> None:
+    """Close every pooled client (called on FastAPI shutdown)."""
+
+    clients = list(_clients.values())
+    _clients.clear()
+    _stream_timeouts.clear()
+    for client in clients:
+        await client.aclose()
@@ -7,60 +7,133 @@ server that already speaks the OpenAI protocol (e.g. an internal MCP service).
 from __future__ import annotations
 
 from typing import Dict, Any, AsyncGenerator, Union
-import json
 
 import httpx
 
+from dispatch import fastjson
+from dispatch.singleflight import coalesce_key, get_single_flight
+from handlers import client_pool
+from handlers.sse import SSERelay
 from schemas.chat import ChatCompletionRequest
 
 
 class HTTPBackendError(Exception):
-    """Raised when remote HTTP backend returns an error."""
+    """Raised when remote HTTP backend returns an error.
 
+    ``status_code`` holds the upstream HTTP status when there was one.
+    """
+
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
+
+
+async def _post_chat(
+    client: httpx.AsyncClient, url: str, payload: Dict[str, Any]
+) -> Dict[str, Any]:
+    resp = await client.post(url, json=payload)
+    if resp.status_code >= 400:
+        raise HTTPBackendError(
+            f"HTTP backend error {resp.status_code}: {resp.text}", resp.status_code
+        )
+    return fastjson.loads(resp.content)
+
+
+async def _stream_chat(
+    client: httpx.AsyncClient, url: str, payload: Dict[str, Any], timeout: httpx.Timeout
+) -> AsyncGenerator[bytes, None]:
+    """Stream chat completion chunks from an OpenAI-compatible HTTP backend.
+
+    Upstream reads are relayed as complete SSE events, see ``handlers.sse``.
+    """
+
+    async with client.stream("POST", url, json=payload, timeout=timeout) as resp:
+        if resp.status_code >= 400:
+            raise HTTPBackendError(
+                f"HTTP backend error {resp.status_code}: {await resp.aread()}",
+                resp.status_code,
+            )
+
+        relay = SSERelay()
+        async for chunk in resp.aiter_bytes():
+            events = relay.feed(chunk)
+            if events:
+                yield events
+        tail = relay.flush()
+        if tail:
+            yield tail
 
-async def _post_chat(url: str, payload: Dict[str, Any]) -> Dict[str, Any]:
-    async with httpx.AsyncClient(timeout=60.0) as client:
-        resp = await client.post(url, json=payload)
+
+_RAW_HEADERS = {"content-type": "application/json"}
+
+
+async def _post_raw(client: httpx.AsyncClient, url: str, body: bytes) -> bytes:
+    resp = await client.post(url, content=body, headers=_RAW_HEADERS)
     if resp.status_code >= 400:
-        raise HTTPBackendError(f"HTTP backend error {resp.status_code}: {resp.text}")
-    return resp.json()
+        raise HTTPBackendError(
+            f"HTTP backend error {resp.status_code}: {resp.text}", resp.status_code
+        )
+    return resp.content
 
 
-async def _stream_chat(url: str, payload: Dict[str, Any]) -> AsyncGenerator[str, None]:
-    """Stream chat completion chunks from an OpenAI-compatible HTTP backend."""
+async def _stream_raw(
+    client: httpx.AsyncClient, url: str, body: bytes, timeout: httpx.Timeout
+) -> AsyncGenerator[bytes, None]:
+    """Relay the upstream SSE byte stream as received."""
 
-    async with httpx.AsyncClient(timeout=None) as client:
-        async with client.stream("POST", url, json=payload) as resp:
-            if resp.status_code >= 400:
-                raise HTTPBackendError(
-                    f"HTTP backend error {resp.status_code}: {await resp.aread()}"
-                )
+    async with client.stream("POST", url, content=body, headers=_RAW_HEADERS, timeout=timeout) as resp:
+        if resp.status_code >= 400:
+            raise HTTPBackendError(
+                f"HTTP backend error {resp.status_code}: {await resp.aread()}",
+                resp.status_code,
+            )
 
-            async for line in resp.aiter_lines():
-                if not line:
-                    continue
-                # Ensure SSE format (prefix with data: )
-                if not line.startswith("data:"):
-                    line = f"data: {line}"
-                yield line + "\n\n"
+        async for chunk in resp.aiter_bytes():
+            yield chunk
+
+
+async def forward_raw(
+    body: bytes, *, base_url: str, stream: bool
+) -> Union[bytes, AsyncGenerator[bytes, None]]:
+    """Forward a raw request body unchanged (see ``dispatch.passthrough``).
+
+    Returns the upstream response body, or an async generator of raw SSE
+    bytes when *stream* is set.
+    """
+
+    url = base_url.rstrip("/") + "/v1/chat/completions"
+    client = client_pool.get_client(base_url)
+    if stream:
+        return _stream_raw(client, url, body, client_pool.stream_timeout(base_url))
+    return await _post_raw(client, url, body)
 
 
 async def handle_chat_completion(
     request_body: ChatCompletionRequest, *, base_url: str
-) -> Union[Dict[str, Any], AsyncGenerator[str, None]]:
+) -> Union[Dict[str, Any], AsyncGenerator[bytes, None]]:
     """Forward request to HTTP backend.
 
-    Currently only supports non-streaming responses. Streaming could be added
-    similarly to the Ollama handler.
+    Returns the response dict, or an async generator of SSE event bytes when
+    the request asks for a stream.
     """
 
     payload = request_body.model_dump()
 
     url = base_url.rstrip("/") + "/v1/chat/completions"
+    # Long-lived pooled client, see ``handlers.client_pool``.
+    client = client_pool.get_client(base_url)
 
-    if payload.get("stream"):
-        return _stream_chat(url, payload)
+    # Identical in-flight requests share one upstream call.
+    key = coalesce_key(request_body, url)
 
-    resp = await _post_chat(url, payload)
+    if payload.get("stream"):
+        timeout = client_pool.stream_timeout(base_url)
+        if key is None:
+            return _stream_chat(client, url, payload, timeout)
+        return get_single_flight().stream(key, lambda: _stream_chat(client, url, payload, timeout))
+
+    if key is None:
+        return await _post_chat(client, url, payload)
+    resp = await get_single_flight().do(key, lambda: _post_chat(client, url, payload))
     # Ensure OpenAI schema (backend assumed compatible)
     return resp 
\ No newline at end of file
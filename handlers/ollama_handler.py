@@ -15,10 +15,14 @@ It adheres to the project rules:
 
 from typing import Dict, Any, AsyncGenerator, Union
 import json
+import re
 
 import httpx
 
 from config.settings import get_settings
+from dispatch import fastjson
+from dispatch.singleflight import coalesce_key, get_single_flight
+from handlers import client_pool
 from schemas.chat import ChatCompletionRequest
 
 # Re-use a single AsyncClient across requests (created lazily).
@@ -36,12 +40,18 @@ async def _get_client() -> httpx.AsyncClient:
 
 
 class OllamaBackendError(Exception):
-    """Raised when Ollama backend returns an unexpected error."""
+    """Raised when Ollama backend returns an unexpected error.
 
+    ``status_code`` holds the upstream HTTP status when there was one.
+    """
+
+    def __init__(self, message: str, status_code: int | None = None) -> None:
+        super().__init__(message)
+        self.status_code = status_code
 
-async def _post_ollama_chat(payload: Dict[str, Any]) -> Dict[str, Any]:
-    settings = get_settings()
-    url = settings.ollama_base_url.rstrip("/") + "/api/chat"
+
+async def _post_ollama_chat(payload: Dict[str, Any], base_url: str) -> Dict[str, Any]:
+    url = base_url.rstrip("/") + "/api/chat"
 
     # Ensure we explicitly ask for non-streaming, but Ollama may still stream.
     payload.setdefault("stream", False)
@@ -50,18 +60,19 @@ async def _post_ollama_chat(payload: Dict[str, Any]) -> Dict[str, Any]:
 
     if payload.get("stream"):
         # We expect a streamed response; return generator to caller
-        return await _stream_ollama_chat(payload)
+        return _stream_ollama_chat(payload, base_url)
 
     # Non-streaming request – first try a simple POST; Ollama might still stream
     resp = await client.post(url, json=payload)
     if resp.status_code >= 400:
         raise OllamaBackendError(
-            f"Ollama backend error {resp.status_code}: {resp.text}"  # text reads entire body
+            f"Ollama backend error {resp.status_code}: {resp.text}",  # text reads entire body
+            resp.status_code,
         )
 
     content_type = resp.headers.get("content-type", "")
     if content_type.startswith("application/json"):
-        return _ollama_to_openai(resp.json())
+        return _ollama_to_openai(fastjson.loads(resp.content))
 
     # Fallback: Ollama ignored stream=false and is streaming; aggregate chunks
     last_msg: Dict[str, Any] | None = None
@@ -79,45 +90,59 @@ async def _post_ollama_chat(payload: Dict[str, Any]) -> Dict[str, Any]:
     return _ollama_to_openai(last_msg)
 
 
-async def _stream_ollama_chat(payload: Dict[str, Any]) -> AsyncGenerator[str, None]:
-    """Stream completion chunks from Ollama and yield as SSE lines."""
+async def _stream_ollama_chat(payload: Dict[str, Any], base_url: str) -> AsyncGenerator[bytes, None]:
+    """Stream completion chunks from Ollama and yield them as SSE events.
+
+    Each upstream read is split into NDJSON lines and transcoded in one batch
+    (see :class:`_ChunkTranscoder`).
+    """
 
-    settings = get_settings()
-    url = settings.ollama_base_url.rstrip("/") + "/api/chat"
+    url = base_url.rstrip("/") + "/api/chat"
 
     client = await _get_client()
     async with client.stream("POST", url, json=payload) as resp:
         if resp.status_code >= 400:
             text = await resp.aread()
-            raise OllamaBackendError(f"Ollama backend error {resp.status_code}: {text}")
-
-        async for line in resp.aiter_lines():
-            # Skip empty keep-alive lines.
-            if not line:
-                continue
-
-            try:
-                raw_msg: Dict[str, Any] = json.loads(line)
-            except json.JSONDecodeError:
-                # Forward raw line if it is not valid JSON (unexpected).
-                yield f"data: {line}\n\n"
-                continue
-
-            # Convert Ollama chunk → OpenAI ChatCompletionChunk shape.
-            openai_chunk = _ollama_chunk_to_openai(raw_msg)
-            yield f"data: {json.dumps(openai_chunk, separators=(',', ':'))}\n\n"
-
-
-async def handle_chat_completion(request_body: ChatCompletionRequest) -> Union[Dict[str, Any], AsyncGenerator[str, None]]:
-    """Forward a ChatCompletionRequest to the Ollama HTTP server and return the raw JSON."""
+            raise OllamaBackendError(f"Ollama backend error {resp.status_code}: {text}", resp.status_code)
+
+        transcoder = _ChunkTranscoder()
+        pending = b""
+        async for chunk in resp.aiter_bytes():
+            lines = (pending + chunk).split(b"\n")
+            pending = lines.pop()
+            events = b"".join(transcoder.encode(line) for line in lines if line.strip())
+            if events:
+                yield events
+        if pending.strip():
+            yield transcoder.encode(pending)
+
+
+async def handle_chat_completion(
+    request_body: ChatCompletionRequest, *, base_url: str | None = None
+) -> Union[Dict[str, Any], AsyncGenerator[str, None]]:
+    """Forward a ChatCompletionRequest to the Ollama HTTP server and return the raw JSON.
+
+    Args:
+        request_body: Validated OpenAI-style request.
+        base_url: Replica chosen by the router.  Defaults to
+            *GENAI_OLLAMA_BASE_URL* when omitted.
+    """
 
     payload = request_body.model_dump()
+    base_url = base_url or get_settings().ollama_base_url
+
+    # Identical in-flight requests share one upstream generation.
+    key = coalesce_key(request_body, base_url)
 
     if payload.get("stream"):
         # Return an async generator producing SSE text lines
-        return _stream_ollama_chat(payload)
+        if key is None:
+            return _stream_ollama_chat(payload, base_url)
+        return get_single_flight().stream(key, lambda: _stream_ollama_chat(payload, base_url))
 
-    return await _post_ollama_chat(payload)
+    if key is None:
+        return await _post_ollama_chat(payload, base_url)
+    return await get_single_flight().do(key, lambda: _post_ollama_chat(payload, base_url))
 
 
 async def shutdown() -> None:
@@ -128,6 +153,13 @@ async def shutdown() -> None:
         _client = None
 
 
+def connection_stats() -> Dict[str, Dict[str, int]]:
+    """Connection pool usage of the shared client (see ``client_pool.connection_usage``)."""
+
+    usage = client_pool.connection_usage(_client) if _client is not None else None
+    return {"ollama": usage} if usage is not None else {}
+
+
 # ---------------------------------------------------------------------------
 # Helpers
 # ---------------------------------------------------------------------------
@@ -137,6 +169,15 @@ def _ollama_to_openai(msg: Dict[str, Any]) -> Dict[str, Any]:
     """Convert Ollama's final chunk into an OpenAI-compatible response."""
 
     message = msg.get("message", {})
+    usage = msg.get("usage")
+    if usage is None:
+        prompt_tokens = msg.get("prompt_eval_count", 0)
+        completion_tokens = msg.get("eval_count", 0)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+        }
     return {
         "id": msg.get("id", "chatcmpl-ollama"),
         "object": "chat.completion",
@@ -148,14 +189,7 @@ def _ollama_to_openai(msg: Dict[str, Any]) -> Dict[str, Any]:
                 "finish_reason": msg.get("done_reason", "stop"),
             }
         ],
-        "usage": msg.get(
-            "usage",
-            {
-                "prompt_tokens": msg.get("prompt_eval_count", 0),
-                "completion_tokens": msg.get("eval_count", 0),
-                "total_tokens": msg.get("eval_count", 0) + msg.get("prompt_eval_count", 0),
-            },
-        ),
+        "usage": usage,
     }
 
 
@@ -204,7 +238,7 @@ def _ollama_chunk_to_openai(msg: Dict[str, Any]) -> Dict[str, Any]:
         if "content" in message:
             delta["content"] = message["content"]
 
-    return {
+    chunk: Dict[str, Any] = {
         "id": msg.get("id", "chatcmpl-ollama"),
         "object": "chat.completion.chunk",
         "model": msg.get("model"),
@@ -218,3 +252,71 @@ def _ollama_chunk_to_openai(msg: Dict[str, Any]) -> Dict[str, Any]:
             }
         ],
     }
+    if msg.get("done") and "eval_count" in msg:
+        # Token counts on the final chunk, like OpenAI's ``include_usage``.
+        prompt_tokens = msg.get("prompt_eval_count", 0)
+        chunk["usage"] = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": msg["eval_count"],
+            "total_tokens": prompt_tokens + msg["eval_count"],
+        }
+    return chunk
+
+
+# Ollama's usual per-token line.  Anything else takes the full decode path.
+_TOKEN_LINE = re.compile(
+    rb'\{"model":"(?P<model>[^"\\]*)","created_at":"[^"\\]*",'
+    rb'"message":\{"role":"assistant","content":"(?P<content>(?:[^"\\]|\\.)*)"\},'
+    rb'"done":false\}'
+)
+# Bytes that ``json.dumps`` (ensure_ascii) would not copy verbatim.
+_NEEDS_ESCAPE = re.compile(rb'[^\x20-\x7e]|\\')
+_EVENT_SUFFIX = b'},"finish_reason":null}]}\n\n'
+
+
+class _ChunkTranscoder:
+    """Turn Ollama stream lines into OpenAI ``chat.completion.chunk`` events.
+
+    Regular token lines are rewritten by splicing the (re-escaped) content into
+    an envelope pre-rendered once per stream, producing the same bytes as
+    ``_ollama_chunk_to_openai`` + ``json.dumps``.  Other lines (the final
+    ``done`` chunk, tool calls, unknown fields) go through the full path.
+    """
+
+    def __init__(self) -> None:
+        self._model: bytes | None = None
+        self._prefix = b""
+
+    def encode(self, line: bytes) -> bytes:
+        line = line.rstrip()
+        match = _TOKEN_LINE.fullmatch(line)
+        if match is None:
+            return self._encode_full(line)
+
+        model = match.group("model")
+        if model != self._model:
+            self._model = model
+            self._prefix = (
+                b'data: {"id":"chatcmpl-ollama","object":"chat.completion.chunk","model":'
+                + json.dumps(model.decode("utf-8")).encode()
+                + b',"choices":[{"index":0,"delta":{"role":"assistant","content":'
+            )
+
+        content = match.group("content")
+        if _NEEDS_ESCAPE.search(content):
+            content = json.dumps(json.loads(b'"' + content + b'"')).encode()
+        else:
+            content = b'"' + content + b'"'
+        return self._prefix + content + _EVENT_SUFFIX
+
+    @staticmethod
+    def _encode_full(line: bytes) -> bytes:
+        try:
+            raw_msg: Dict[str, Any] = json.loads(line)
+        except json.JSONDecodeError:
+            # Forward raw line if it is not valid JSON (unexpected).
+            return b"data: " + line + b"\n\n"
+
+        # Convert Ollama chunk → OpenAI ChatCompletionChunk shape.
+        openai_chunk = _ollama_chunk_to_openai(raw_msg)
+        return b"data: " + json.dumps(openai_chunk, separators=(",", ":")).encode() + b"\n\n"
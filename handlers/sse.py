@@ -0,0 +1,108 @@
+"""Incremental, byte-level Server-Sent Events relay.
+
+:class:`SSERelay` is fed upstream network reads and returns the *complete*
+events they finish, as bytes and untouched: multi-line events, ``event:`` /
+``id:`` fields, ``:`` comments (keep-alives) and ``data: [DONE]`` pass through
+verbatim.  A read that ends mid-event is buffered until the blank line that
+terminates it arrives, so event boundaries are never split.  When a read
+holds only whole events (the common case for token streaming) it is returned
+as-is without copying.
+
+Some OpenAI-compatible servers stream bare JSON lines instead of SSE, or
+end each ``data:`` line with a single newline.  When the first line is not
+an SSE field, or the first event holds a complete JSON payload followed
+directly by another ``data:`` line, the relay switches to line mode: every
+non-empty line becomes its own event (bare lines are wrapped as
+``data: <line>\\n\\n``).
+
+``\\r\\n`` and ``\\r`` line endings are normalised to ``\\n``.
+"""
+
+from __future__ import annotations
+
+_SSE_FIELDS = (b"data:", b"event:", b"id:", b"retry:", b":", b"data\n")
+
+
+class SSERelay:
+    """Split an upstream byte stream into complete SSE events."""
+
+    def __init__(self) -> None:
+        self._buffer = b""
+        self._lines: bool | None = None  # None until the first line is seen
+        # SSE framing is confirmed by the first complete event with data.
+        self._confirmed = False
+        self._cr = False
+
+    def feed(self, chunk: bytes) -> bytes:
+        """Add *chunk*; return the complete events it finishes (maybe ``b""``)."""
+
+        if self._cr or b"\r" in chunk:
+            chunk = self._normalise(chunk)
+        data = self._buffer + chunk if self._buffer else chunk
+
+        if self._lines is None:
+            head = data.lstrip(b"\n")
+            if b"\n" not in head:
+                self._buffer = data
+                return b""
+            self._lines = not head.startswith(_SSE_FIELDS)
+
+        if not self._lines and not self._confirmed:
+            first = data.find(b"\n\n")
+            event = data if first < 0 else data[:first]
+            if _framed_by_lines(event):
+                self._lines = True
+            elif first >= 0 and b"data:" in event:
+                self._confirmed = True
+
+        if self._lines:
+            end = data.rfind(b"\n") + 1
+            self._buffer = data[end:]
+            return _wrap_lines(data[:end])
+
+        end = data.rfind(b"\n\n") + 2
+        if end == 1:
+            self._buffer = data
+            return b""
+        self._buffer = data[end:]
+        return data[:end]
+
+    def flush(self) -> bytes:
+        """Return whatever is left once upstream closed, terminated as an event."""
+
+        data, self._buffer = self._buffer + (b"\n" if self._cr else b""), b""
+        self._cr = False
+        if not data.strip():
+            return b""
+        if self._lines or (self._lines is None and not data.lstrip(b"\n").startswith(_SSE_FIELDS)):
+            return _wrap_lines(data)
+        return data.rstrip(b"\n") + b"\n\n"
+
+    def _normalise(self, chunk: bytes) -> bytes:
+        if self._cr:
+            chunk = b"\r" + chunk
+        # A trailing "\r" may be the first half of "\r\n" split across reads.
+        self._cr = chunk.endswith(b"\r")
+        if self._cr:
+            chunk = chunk[:-1]
+        return chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+
+
+def _framed_by_lines(event: bytes) -> bool:
+    """Whether *event* is really several ``data:`` events one newline apart."""
+
+    lines = event.split(b"\n")
+    for line, following in zip(lines, lines[1:]):
+        if line.startswith(b"data:") and following.startswith(b"data:"):
+            payload = line[5:].strip()
+            if payload == b"[DONE]" or (payload.startswith(b"{") and payload.endswith(b"}")):
+                return True
+    return False
+
+
+def _wrap_lines(data: bytes) -> bytes:
+    return b"".join(
+        (line if line.startswith(_SSE_FIELDS) else b"data: " + line) + b"\n\n"
+        for line in data.split(b"\n")
+        if line.strip()
+    )
@@ -1,13 +1,22 @@
 """Application entry point.
 
 Creates the FastAPI app, attaches logging middleware, mounts router, and
-registers shutdown handler to cleanly close shared HTTP clients.
+registers a lifespan handler that warms pooled backend HTTP clients on startup
+and cleanly closes them on shutdown.
 """
 
 from fastapi import FastAPI
 from router import router as api_router
 from middleware.logging_middleware import RequestLoggingMiddleware
-from handlers import ollama_handler
+from handlers import ollama_handler, client_pool
+from config import backend_loader
+from config.api_keys import get_key_registry
+from config.settings import get_settings
+from dispatch import health
+from dispatch.config_reload import ConfigWatcher
+from dispatch.discovery import ModelDiscovery
+from diagnostics.loop_monitor import get_loop_monitor
+from diagnostics.routes import router as debug_router
 from middleware.auth_middleware import APIKeyAuthMiddleware
 from fastapi.responses import Response
 from middleware.ratelimit_middleware import RateLimitMiddleware
@@ -40,13 +49,50 @@ except ModuleNotFoundError:  # pragma: no cover
 
 @asynccontextmanager
 async def lifespan(app):
+    # Fail at startup (not on the first request) if the API keys file is invalid.
+    get_key_registry()
+
+    # Create pooled per-backend HTTP clients and open warm connections.
+    backends = backend_loader.get_backends()
+    await client_pool.startup(backends)
+
+    # Probe backends in the background and feed their circuit breakers.
+    settings = get_settings()
+    checker = health.HealthChecker(
+        backends,
+        interval=settings.health_check_interval,
+        timeout=settings.health_check_timeout,
+    )
+    checker.start()
+    # Reload backends.yaml on SIGHUP or when the file changes.
+    watcher = ConfigWatcher(settings.config_watch_interval, checker)
+    watcher.start()
+    # Learn which models the backends serve (/v1/models, routing of unknown names).
+    discovery = ModelDiscovery(
+        settings.model_discovery_interval,
+        ttl=settings.model_discovery_ttl,
+        timeout=settings.health_check_timeout,
+    )
+    discovery.start()
+    # Cheap background probe for /debug/loop and genai_event_loop_lag_seconds.
+    loop_monitor = get_loop_monitor()
+    loop_monitor.start()
     yield
+    await loop_monitor.stop()
+    await discovery.stop()
+    await watcher.stop()
+    await checker.stop()
     await ollama_handler.shutdown()
+    await client_pool.shutdown()
 
 app = FastAPI(title="GenAI Router", lifespan=lifespan)
 
-# API key auth middleware (no-op when GENAI_API_KEYS empty)
-app.add_middleware(APIKeyAuthMiddleware)
+# Middleware are pure ASGI; the last one added runs first.  Cheap rejections
+# (auth, rate limit) sit outermost so rejected requests skip metrics and
+# logging work; they log and count their rejections themselves
+# (``log_rejection``, ``genai_rejected_requests_total``).
+if _PROM_AVAILABLE:
+    app.add_middleware(MetricsMiddleware)
 
 # Structured logging middleware
 app.add_middleware(RequestLoggingMiddleware)
@@ -54,10 +100,12 @@ app.add_middleware(RequestLoggingMiddleware)
 # Rate limit middleware
 app.add_middleware(RateLimitMiddleware)
 
-if _PROM_AVAILABLE:
-    app.add_middleware(MetricsMiddleware)
+# API key auth middleware (no-op when GENAI_API_KEYS empty)
+app.add_middleware(APIKeyAuthMiddleware)
 
 app.include_router(api_router, prefix="/v1")
+# Admin-only diagnostics (404 unless GENAI_ADMIN_API_KEYS is set)
+app.include_router(debug_router)
 
 # Expose Prometheus metrics
 if _PROM_AVAILABLE:
@@ -71,8 +119,9 @@ else:
 
 # Simple health probe
 @app.get("/healthz")
-async def healthz() -> dict[str, str]:  # noqa: D401
-    return {"status": "ok"}
+async def healthz() -> dict[str, Any]:  # noqa: D401
+    # Router liveness plus the circuit breaker state of every known replica.
+    return {"status": "ok", "backends": health.breaker_states()}
 
 # --------------------
 # OpenTelemetry setup
@@ -1,43 +1,49 @@
 from __future__ import annotations
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.datastructures import Headers
 from starlette.responses import JSONResponse
 from starlette.status import HTTP_401_UNAUTHORIZED
+from starlette.types import ASGIApp, Receive, Scope, Send
 
-from config.settings import get_settings
+from config.api_keys import get_key_registry, token_from_headers
+from middleware.logging_middleware import log_rejection
 
 
-class APIKeyAuthMiddleware(BaseHTTPMiddleware):
-    """Middleware that enforces simple bearer-token authentication.
+class APIKeyAuthMiddleware:
+    """Pure-ASGI middleware that enforces simple bearer-token authentication.
 
-    If *GENAI_API_KEYS* environment variable is **unset or empty**, the
-    middleware is a no-op (authentication disabled).
+    Keys are looked up in the key registry (``config.api_keys``); the
+    matching ``KeyIdentity`` is stored as ``request.state.identity`` for the
+    layers below.  If no (non-admin) keys are configured the middleware does
+    not reject anything, but still identifies requests that carry a key.
     """
 
-    async def dispatch(self, request: Request, call_next):  # type: ignore[override]
-        settings = get_settings()
-        allowed_keys = settings.allowed_api_keys
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-        if not allowed_keys:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        registry = get_key_registry()
+        if not len(registry):
             # Auth disabled, skip check.
-            return await call_next(request)
+            await self.app(scope, receive, send)
+            return
 
         # Extract key from `Authorization: Bearer <token>` or `X-API-Key` header.
-        auth_header = request.headers.get("authorization")
-        api_key_header = request.headers.get("x-api-key")
-
-        token: str | None = None
-        if auth_header and auth_header.lower().startswith("bearer "):
-            token = auth_header[7:].strip()
-        elif api_key_header:
-            token = api_key_header.strip()
-
-        if token is None or token not in allowed_keys:
-            return JSONResponse(
+        identity = registry.lookup(token_from_headers(Headers(scope=scope)))
+        if identity is not None:
+            scope.setdefault("state", {})["identity"] = identity
+        elif registry.auth_required:
+            request_id = log_rejection(scope, HTTP_401_UNAUTHORIZED, "unauthorized")
+            response = JSONResponse(
                 status_code=HTTP_401_UNAUTHORIZED,
                 content={"error": "Unauthorized"},
-                headers={"WWW-Authenticate": "Bearer"},
+                headers={"WWW-Authenticate": "Bearer", "X-Request-ID": request_id},
             )
+            await response(scope, receive, send)
+            return
 
-        return await call_next(request) 
\ No newline at end of file
+        await self.app(scope, receive, send)
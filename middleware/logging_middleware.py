@@ -1,50 +1,95 @@
 import time
 import uuid
 import logging
-from typing import Callable
 
-from fastapi import Request, Response
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.types import ASGIApp
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from dispatch import metrics
 
 # Configure root logger with simple JSON-like output
 logging.basicConfig(level=logging.INFO, format="%(message)s")
 logger = logging.getLogger("genai-router")
 
 
-class RequestLoggingMiddleware(BaseHTTPMiddleware):
-    """Attach a unique request ID and log structured details."""
+class RequestLoggingMiddleware:
+    """Attach a unique request ID and log structured details.
+
+    Implemented as pure ASGI middleware: the response is not wrapped, only the
+    ``http.response.start`` message is touched to read the status and add the
+    ``X-Request-ID`` header.  The logged duration covers the whole response,
+    including streamed bodies.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
-    def __init__(self, app: ASGIApp):
-        super().__init__(app)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next: Callable[[Request], Response]):
         request_id = str(uuid.uuid4())
-        start = time.time()
-        # Make request ID available down the stack
-        request.state.request_id = request_id
+        start = time.perf_counter()
+        # Make request ID available down the stack (``request.state.request_id``)
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        status = 500
+        error = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Propagate request ID to clients for debug purposes
+                MutableHeaders(scope=message)["X-Request-ID"] = request_id
+            await send(message)
 
         try:
-            response = await call_next(request)
-            status = response.status_code
-            error = None
+            await self.app(scope, receive, send_wrapper)
         except Exception as exc:
             status = 500
             error = str(exc)
             raise
         finally:
-            duration_ms = (time.time() - start) * 1000
-            logger.info(
-                {
-                    "request_id": request_id,
-                    "method": request.method,
-                    "path": request.url.path,
-                    "status": status,
-                    "duration_ms": round(duration_ms, 2),
-                    "error": error,
-                }
-            )
-
-        # Propagate request ID to clients for debug purposes
-        response.headers["X-Request-ID"] = request_id
-        return response 
\ No newline at end of file
+            duration_ms = (time.perf_counter() - start) * 1000
+            record = {
+                "request_id": request_id,
+                "method": scope["method"],
+                "path": scope["path"],
+                "status": status,
+                "duration_ms": round(duration_ms, 2),
+                "error": error,
+            }
+            # Set by the auth middleware (``config.api_keys``) for accounting.
+            identity = scope["state"].get("identity")
+            if identity is not None:
+                record["tenant"] = identity.tenant
+                record["key_id"] = identity.key_id
+            logger.info(record)
+
+
+def log_rejection(scope: Scope, status: int, reason: str) -> str:
+    """Count and log a request rejected before this middleware ran.
+
+    Auth and rate limiting sit outside the logging and metrics middleware,
+    so they report their rejections here; returns the request ID to send.
+    """
+
+    request_id = str(uuid.uuid4())
+    metrics.REJECTED_REQUESTS.labels(reason=reason).inc()
+    client = scope.get("client")
+    record = {
+        "request_id": request_id,
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "error": reason,
+        "client": client[0] if client else None,
+    }
+    identity = (scope.get("state") or {}).get("identity")
+    if identity is not None:
+        record["tenant"] = identity.tenant
+        record["key_id"] = identity.key_id
+    logger.info(record)
+    return request_id
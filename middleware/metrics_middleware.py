@@ -3,8 +3,7 @@ from __future__ import annotations
 import time
 
 from prometheus_client import Counter, Histogram
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 REQUEST_COUNT = Counter(
     "genai_requests_total",
@@ -18,19 +17,41 @@ REQUEST_LATENCY = Histogram(
 )
 
 
-class MetricsMiddleware(BaseHTTPMiddleware):
-    """Collect Prometheus metrics for each request."""
+UNMATCHED = "unmatched"
+_METHODS = frozenset({"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"})
+
+
+class MetricsMiddleware:
+    """Collect Prometheus metrics for each request (pure ASGI).
+
+    Latency covers the whole response, including streamed bodies.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-    async def dispatch(self, request: Request, call_next):  # type: ignore[override]
         start = time.perf_counter()
-        response = await call_next(request)
-        latency = time.perf_counter() - start
+        status = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
 
-        path = request.url.path
-        method = request.method
-        status = str(response.status_code)
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            latency = time.perf_counter() - start
 
-        REQUEST_COUNT.labels(method=method, path=path, status=status).inc()
-        REQUEST_LATENCY.labels(method=method, path=path).observe(latency)
+            # Label by route template so unknown paths cannot add series.
+            path = getattr(scope.get("route"), "path", UNMATCHED)
+            method = scope["method"] if scope["method"] in _METHODS else "OTHER"
 
-        return response 
\ No newline at end of file
+            REQUEST_COUNT.labels(method=method, path=path, status=str(status)).inc()
+            REQUEST_LATENCY.labels(method=method, path=path).observe(latency)
@@ -1,58 +1,95 @@
 from __future__ import annotations
 
-import time
-from collections import defaultdict, deque
-from typing import Deque, Dict
+import asyncio
+import math
+from typing import Any, Dict, Tuple
 
-from starlette.middleware.base import BaseHTTPMiddleware
-from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.status import HTTP_429_TOO_MANY_REQUESTS
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from config.settings import get_settings
+from middleware.logging_middleware import log_rejection
+from middleware.ratelimit_state import RateLimiter, make_rate_limiter
 
+__all__ = ["RateLimitMiddleware", "RateLimiter"]
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    """Simple in-memory sliding-window rate limiter per API key or IP."""
 
-    def __init__(self, app):  # type: ignore[no-untyped-def]
-        super().__init__(app)
+class RateLimitMiddleware:
+    """Rate limiter per API key or IP (pure ASGI).
+
+    Authenticated requests are counted per key (``request.state.identity``,
+    see ``config.api_keys``) against their key's rate-limit tier, or
+    *GENAI_RATE_LIMIT* when the key has none; other requests per client IP.
+
+    State is kept per process by default; see ``middleware.ratelimit_state``
+    for the shared-memory and Redis backends.
+    """
+
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
         settings = get_settings()
+        self._settings = settings
+        self._async = False
         parsed = settings.parsed_rate_limit
-        if parsed is None:
-            self.max_req = 0
-            self.window = 0
-        else:
-            self.max_req, self.window = parsed
+        self.limiter = self._make(tuple(parsed)) if parsed else None
+        # limits of a key's tier -> limiter (one per distinct tier)
+        self._tier_limiters: Dict[Tuple[Tuple[int, int], ...], Any] = {}
 
-        # key -> deque[timestamps]
-        self._buckets: Dict[str, Deque[float]] = defaultdict(deque)
+    def _make(self, limits: Tuple[Tuple[int, int], ...]) -> Any:
+        settings = self._settings
+        limiter = make_rate_limiter(
+            limits,
+            settings.rate_limit_store,
+            settings.rate_limit_max_clients,
+            settings.rate_limit_shm_path,
+        )
+        # Every limiter comes from the same store, so they agree on this.
+        self._async = asyncio.iscoroutinefunction(limiter.hit)
+        return limiter
 
-    async def dispatch(self, request: Request, call_next):  # type: ignore[override]
-        if self.max_req == 0:
-            # Disabled
-            return await call_next(request)
+    def _limiter_for(self, identity: Any) -> Any:
+        limits = getattr(identity, "rate_limit", None)
+        if limits is None:
+            return self.limiter
+        if not limits:
+            return None  # tier without limits
+        limiter = self._tier_limiters.get(limits)
+        if limiter is None:
+            limiter = self._tier_limiters[limits] = self._make(limits)
+        return limiter
 
-        now = time.time()
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
 
-        # Identify client: API key or IP.
-        token = request.headers.get("authorization") or request.headers.get("x-api-key")
-        if token and token.lower().startswith("bearer "):
-            token = token[7:].strip()
-        client_id = token or request.client.host or "anonymous"
+        # Identify client: API key (resolved by the auth middleware) or IP.
+        identity = (scope.get("state") or {}).get("identity")
+        limiter = self._limiter_for(identity)
+        if limiter is None:
+            # Disabled
+            await self.app(scope, receive, send)
+            return
 
-        bucket = self._buckets[client_id]
-        # Drop old timestamps
-        while bucket and bucket[0] <= now - self.window:
-            bucket.popleft()
+        if identity is not None:
+            client_id = identity.key_id
+        else:
+            client = scope.get("client")
+            client_id = (client[0] if client else None) or "anonymous"
 
-        if len(bucket) >= self.max_req:
-            retry_after = max(0, self.window - (now - bucket[0]))
-            return JSONResponse(
+        if self._async:
+            retry_after = await limiter.hit(client_id)
+        else:
+            retry_after = limiter.hit(client_id)
+        if retry_after:
+            request_id = log_rejection(scope, HTTP_429_TOO_MANY_REQUESTS, "rate_limited")
+            response = JSONResponse(
                 status_code=HTTP_429_TOO_MANY_REQUESTS,
                 content={"error": "rate limit exceeded"},
-                headers={"Retry-After": str(int(retry_after))},
+                headers={"Retry-After": str(math.ceil(retry_after)), "X-Request-ID": request_id},
             )
+            await response(scope, receive, send)
+            return
 
-        bucket.append(now)
-        return await call_next(request) 
\ No newline at end of file
+        await self.app(scope, receive, send)
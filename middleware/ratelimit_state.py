@@ -0,0 +1,406 @@
+"""Rate-limit state backends.
+
+``RateLimitMiddleware`` delegates the bookkeeping to one of these limiters,
+selected by *GENAI_RATE_LIMIT_STORE*:
+
+* ``memory`` (default) – :class:`RateLimiter`, per-process.  With several
+  uvicorn workers every process counts on its own, so the effective limit is
+  multiplied by the worker count.
+* ``shm`` – :class:`SharedMemoryRateLimiter`, a fixed-size table in an
+  mmap'd file (``/dev/shm`` when available) shared by all workers on a host.
+  Buckets of slots are protected by byte-range locks, so there is no global
+  lock and no network round trip.
+* ``redis://[:password@]host[:port][/db]`` – :class:`RedisRateLimiter`, a
+  sliding-window counter kept in any Redis-protocol server, for deployments
+  spanning several hosts.
+
+The in-memory and shared-memory limiters implement GCRA (a token bucket in
+virtual-scheduling form): per client and limit only the *theoretical arrival
+time* (TAT) of the next request is stored.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import fcntl
+import hashlib
+import logging
+import math
+import mmap
+import os
+import struct
+import tempfile
+import time
+from collections import OrderedDict, deque
+from typing import Any, Deque, List, Sequence, Tuple
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger("genai-router")
+
+Limits = Sequence[Tuple[int, int]]
+
+
+def gcra(limits: Sequence[Tuple[float, float]], tats: Sequence[float], now: float) -> Tuple[float, List[float]]:
+    """Apply one request to *tats*.
+
+    *limits* holds ``(emission_interval, burst_tolerance)`` pairs.  Returns the
+    seconds until the request would be allowed (``0.0`` if it is) and the new
+    TATs to store when it is allowed.
+    """
+
+    retry_after = 0.0
+    new_tats = []
+    for (interval, tolerance), tat in zip(limits, tats):
+        new_tat = max(tat, now) + interval
+        retry_after = max(retry_after, new_tat - now - tolerance)
+        new_tats.append(new_tat)
+    return retry_after, new_tats
+
+
+def _gcra_limits(limits: Limits) -> List[Tuple[float, float]]:
+    return [(window / max_req, float(window)) for max_req, window in limits]
+
+
+class RateLimiter:
+    """GCRA limiter with a bounded in-process client table.
+
+    Each limit ``(max_requests, window)`` allows bursts of ``max_requests`` and a
+    sustained rate of ``max_requests / window``.  Once a client's TATs lie in
+    the past it is indistinguishable from a new one, so idle entries are
+    dropped lazily; the table is additionally capped at ``max_clients``
+    entries, evicting the least recently seen client.
+    """
+
+    def __init__(self, limits: Limits, max_clients: int = 100_000) -> None:
+        self._limits = _gcra_limits(limits)
+        self.max_clients = max(1, int(max_clients))
+        self._clients: OrderedDict[str, List[float]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+    def hit(self, key: str, now: float | None = None) -> float:
+        """Count a request for *key*.
+
+        Returns ``0.0`` if it is allowed, otherwise the number of seconds until
+        it would be.  Rejected requests do not consume quota.
+        """
+
+        if now is None:
+            now = time.monotonic()
+
+        tats = self._clients.get(key)
+        if tats is None:
+            tats = [now] * len(self._limits)
+        else:
+            self._clients.move_to_end(key)
+
+        retry_after, new_tats = gcra(self._limits, tats, now)
+        if retry_after > 0:
+            return retry_after
+
+        self._clients[key] = new_tats
+        self._evict(now)
+        return 0.0
+
+    def _evict(self, now: float) -> None:
+        clients = self._clients
+        while len(clients) > self.max_clients:
+            clients.popitem(last=False)
+        # Drop least recently seen clients whose buckets have fully refilled.
+        while clients:
+            oldest = next(iter(clients.values()))
+            if max(oldest) > now:
+                break
+            clients.popitem(last=False)
+
+
+class SharedMemoryRateLimiter:
+    """GCRA limiter whose client table lives in a memory-mapped file.
+
+    The table is set-associative: a client's key hash selects a bucket of
+    ``ways`` slots, and only that bucket is locked (``fcntl.lockf`` byte-range
+    lock) while its slot is read and updated.  A slot holds the 64-bit key hash
+    followed by one TAT per limit; an all-zero file is an empty table, so
+    workers can open it concurrently without coordination.  When a bucket is
+    full the slot closest to being refilled is reused, which bounds the table
+    at ``max_clients`` entries.
+
+    TATs are wall-clock timestamps so that every process agrees on them.  The
+    file name includes a fingerprint of the configured limits; changing them
+    starts from a fresh table.
+    """
+
+    ways = 8
+
+    def __init__(self, limits: Limits, max_clients: int = 100_000, path: str | None = None) -> None:
+        self._limits = _gcra_limits(limits)
+        self._slot = struct.Struct(f"<Q{len(self._limits)}d")
+        self._bucket_size = self._slot.size * self.ways
+        self.buckets = max(1, math.ceil(max_clients / self.ways))
+
+        fingerprint = hashlib.blake2b(
+            repr((sorted(limits), self.buckets)).encode(), digest_size=4
+        ).hexdigest()
+        self.path = f"{path or _default_shm_path()}-{fingerprint}"
+
+        size = self.buckets * self._bucket_size
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)  # zero-filled: every slot empty
+        self._map = mmap.mmap(self._fd, size)
+
+    def hit(self, key: str, now: float | None = None) -> float:
+        """Count a request for *key*; see :meth:`RateLimiter.hit`."""
+
+        if now is None:
+            now = time.time()
+
+        key_hash = int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), "little") or 1
+        start = (key_hash % self.buckets) * self._bucket_size
+        slot_size = self._slot.size
+
+        fcntl.lockf(self._fd, fcntl.LOCK_EX, self._bucket_size, start, os.SEEK_SET)
+        try:
+            victim, victim_expiry = start, math.inf
+            tats: Sequence[float] | None = None
+            for offset in range(start, start + self._bucket_size, slot_size):
+                stored_hash, *stored_tats = self._slot.unpack_from(self._map, offset)
+                if stored_hash == key_hash:
+                    victim, tats = offset, stored_tats
+                    break
+                expiry = max(stored_tats) if stored_hash else -math.inf
+                if expiry < victim_expiry:
+                    victim, victim_expiry = offset, expiry
+
+            retry_after, new_tats = gcra(self._limits, tats or [now] * len(self._limits), now)
+            if retry_after <= 0:
+                self._slot.pack_into(self._map, victim, key_hash, *new_tats)
+                return 0.0
+            return retry_after
+        finally:
+            fcntl.lockf(self._fd, fcntl.LOCK_UN, self._bucket_size, start, os.SEEK_SET)
+
+    def close(self) -> None:
+        self._map.close()
+        os.close(self._fd)
+
+
+def _default_shm_path() -> str:
+    directory = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+    return os.path.join(directory, "genai-router-ratelimit")
+
+
+class RedisError(Exception):
+    """Error reply or protocol violation from the Redis server."""
+
+
+class _RedisConnection:
+    """Minimal RESP2 client: just enough for pipelined commands.
+
+    Concurrent callers share one connection without taking turns: each
+    writes its pipeline as soon as it has one and a reader task hands the
+    replies back in order (Redis answers a connection's commands in the
+    order they were sent).  A check therefore waits for its own round trip,
+    not for the ones queued before it.
+    """
+
+    def __init__(self, url: str, timeout: float = 1.0) -> None:
+        parsed = urlparse(url)
+        self.host = parsed.hostname or "localhost"
+        self.port = parsed.port or 6379
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self.timeout = timeout
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task[None] | None = None
+        # (future, number of replies, replies so far) per sent pipeline, in order
+        self._pending: Deque[Tuple[asyncio.Future[List[Any]], int, List[Any]]] = deque()
+        self._connect_lock = asyncio.Lock()
+
+    async def pipeline(self, *commands: Sequence[Any]) -> List[Any]:
+        """Send *commands* in one round trip and return their replies."""
+
+        try:
+            replies = await asyncio.wait_for(self._pipeline(commands), self.timeout)
+        except (OSError, asyncio.TimeoutError):
+            self.close()
+            raise
+        for reply in replies:
+            if isinstance(reply, RedisError):
+                raise reply
+        return replies
+
+    async def _pipeline(self, commands: Sequence[Sequence[Any]]) -> List[Any]:
+        if self._writer is None:
+            async with self._connect_lock:
+                if self._writer is None:
+                    await self._connect()
+        assert self._writer is not None
+        future: asyncio.Future[List[Any]] = asyncio.get_running_loop().create_future()
+        # Queue and write without yielding in between so replies stay in order.
+        self._pending.append((future, len(commands), []))
+        self._writer.write(b"".join(_encode(command) for command in commands))
+        await self._writer.drain()
+        return await future
+
+    async def _connect(self) -> None:
+        reader, writer = await asyncio.open_connection(self.host, self.port)
+        setup = []
+        if self.password:
+            setup.append(("AUTH", self.password))
+        if self.db:
+            setup.append(("SELECT", self.db))
+        try:
+            if setup:
+                writer.write(b"".join(_encode(command) for command in setup))
+                await writer.drain()
+                for _ in setup:
+                    reply = await _read_reply(reader)
+                    if isinstance(reply, RedisError):
+                        raise reply
+        except BaseException:
+            writer.close()
+            raise
+        self._writer = writer
+        self._reader_task = asyncio.ensure_future(self._read_replies(reader, writer))
+
+    async def _read_replies(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        try:
+            while True:
+                reply = await _read_reply(reader)
+                future, count, replies = self._pending[0]
+                replies.append(reply)
+                if len(replies) == count:
+                    self._pending.popleft()
+                    if not future.done():
+                        future.set_result(replies)
+        except (OSError, EOFError, RedisError, IndexError, ValueError) as exc:
+            # EOFError: asyncio.IncompleteReadError when the server hangs up.
+            logger.debug({"event": "rate_limit_store_closed", "error": str(exc)})
+        finally:
+            if self._writer is writer:
+                self.close()
+
+    def close(self) -> None:
+        writer, self._writer = self._writer, None
+        task, self._reader_task = self._reader_task, None
+        if writer is not None:
+            writer.close()
+        if task is not None and task is not asyncio.current_task():
+            task.cancel()
+        pending, self._pending = self._pending, deque()
+        for future, _, _ in pending:
+            if not future.done():
+                future.set_exception(ConnectionError("connection to the rate limit store closed"))
+
+
+def _encode(command: Sequence[Any]) -> bytes:
+    parts = [b"*%d\r\n" % len(command)]
+    for arg in command:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts.append(b"$%d\r\n%s\r\n" % (len(data), data))
+    return b"".join(parts)
+
+
+async def _read_reply(reader: asyncio.StreamReader) -> Any:
+    line = await reader.readline()
+    if not line.endswith(b"\r\n"):
+        raise RedisError("connection closed")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b"+":
+        return payload.decode()
+    if kind == b"-":
+        return RedisError(payload.decode())  # raised by the caller, the stream stays in sync
+    if kind == b":":
+        return int(payload)
+    if kind == b"$":
+        length = int(payload)
+        if length < 0:
+            return None
+        data = await reader.readexactly(length + 2)
+        return data[:-2]
+    if kind == b"*":
+        count = int(payload)
+        if count < 0:
+            return None
+        return [await _read_reply(reader) for _ in range(count)]
+    raise RedisError(f"unexpected reply {line!r}")
+
+
+class RedisRateLimiter:
+    """Sliding-window counter limiter backed by a Redis-protocol server.
+
+    Per client and limit two fixed-window counters are kept (current and
+    previous window); the estimate weights the previous count by the part of
+    it still inside the sliding window.  Only ``INCR``, ``DECR``, ``PEXPIRE``
+    and ``GET`` are used, so no server-side scripting is required and any
+    Redis-compatible server works.  A check costs one pipelined round trip
+    (two when the request is rejected and the increment is undone); checks
+    running concurrently share the connection without waiting for each
+    other.
+
+    The limiter fails open: if the server is unreachable the request is
+    allowed and a warning is logged.
+    """
+
+    def __init__(self, limits: Limits, url: str, prefix: str = "genai:rl:") -> None:
+        self.limits = [(int(max_req), int(window)) for max_req, window in limits]
+        self.prefix = prefix
+        self._conn = _RedisConnection(url)
+
+    async def hit(self, key: str, now: float | None = None) -> float:
+        if now is None:
+            now = time.time()
+
+        commands: List[Tuple[Any, ...]] = []
+        windows = []
+        for max_req, window in self.limits:
+            index = int(now // window)
+            current = f"{self.prefix}{key}:{window}:{index}"
+            previous = f"{self.prefix}{key}:{window}:{index - 1}"
+            commands += [("INCR", current), ("PEXPIRE", current, window * 2000), ("GET", previous)]
+            windows.append((max_req, window, index, current))
+
+        try:
+            replies = await self._conn.pipeline(*commands)
+        except (OSError, asyncio.TimeoutError, RedisError) as exc:
+            logger.warning({"event": "rate_limit_store_error", "error": str(exc)})
+            return 0.0
+
+        retry_after = 0.0
+        for i, (max_req, window, index, _) in enumerate(windows):
+            count, previous = replies[3 * i], int(replies[3 * i + 2] or 0)
+            elapsed = (now - index * window) / window
+            if previous * (1 - elapsed) + count <= max_req:
+                continue
+            if count <= max_req and previous:
+                # Wait until enough of the previous window has slid out.
+                wait = (1 - (max_req - count) / previous - elapsed) * window
+            else:
+                wait = (1 - elapsed) * window
+            retry_after = max(retry_after, wait, 1e-3)
+
+        if retry_after:
+            try:
+                await self._conn.pipeline(*(("DECR", current) for *_, current in windows))
+            except (OSError, asyncio.TimeoutError, RedisError):
+                pass
+        return retry_after
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+def make_rate_limiter(
+    limits: Limits, store: str = "memory", max_clients: int = 100_000, shm_path: str | None = None
+) -> Any:
+    """Build the limiter selected by *store* (see module docstring)."""
+
+    if store == "memory":
+        return RateLimiter(limits, max_clients)
+    if store == "shm":
+        return SharedMemoryRateLimiter(limits, max_clients, shm_path)
+    if store.startswith("redis://"):
+        return RedisRateLimiter(limits, store)
+    raise ValueError(f"Unknown rate limit store '{store}'")
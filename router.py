@@ -6,66 +6,455 @@ handler based on the YAML configuration loaded via
 ``config.backend_loader.resolve_backend``.
 """
 
-from fastapi import APIRouter
+import time
+from typing import Any, AsyncIterator
+
+import httpx
+from fastapi import APIRouter, Request, Response
+from fastapi.exceptions import RequestValidationError
+from pydantic import ValidationError
 from fastapi.responses import JSONResponse
 from starlette.responses import StreamingResponse
 from handlers.ollama_handler import handle_chat_completion as ollama_handle, OllamaBackendError
 from handlers.http_handler import handle_chat_completion as http_handle, HTTPBackendError
+from handlers.http_handler import forward_raw as http_forward_raw
 from config.backend_loader import resolve_backend
 from schemas.chat import ChatCompletionRequest, ChatCompletionResponse
-from schemas.models import ModelList, ModelInfo
+from schemas.models import ModelList
 from config import backend_loader
+from dispatch.balancer import Lease, get_pool
+from dispatch import backend_metrics, limits
+from dispatch.hedging import hedge_options, run_with_failover
+from config.settings import get_settings
+from dispatch.health import BackendUnavailableError, is_backend_failure
+from dispatch.cache import CACHE_HEADER, get_response_cache, is_cacheable, request_key
+from dispatch import fastjson
+from dispatch.passthrough import RawChatRequest, peek
+from dispatch.stream_coalesce import coalesce_stream, coalesce_window
+from dispatch.batch import BATCH_PRIORITY, BatchRunner
 
 router = APIRouter()
 
-@router.post("/chat/completions", response_model=ChatCompletionResponse)
-async def chat_completions(body: ChatCompletionRequest):
-    try:
-        backend = resolve_backend(body.model)
-        backend_type = backend.get("type")
 
-        if backend_type == "ollama":
-            result = await ollama_handle(body)
-        elif backend_type == "http":
-            result = await http_handle(body, base_url=backend["base_url"])
+class UnsupportedBackendError(Exception):
+    """Raised when a backend entry has an unknown ``type``."""
+
+
+def _handler_for(backend: dict):
+    backend_type = backend.get("type")
+    if backend_type == "ollama":
+        return ollama_handle
+    if backend_type == "http":
+        return http_handle
+    raise UnsupportedBackendError(f"Unsupported backend type: {backend_type}")
+
+
+class _PrimedStream:
+    """Stream whose first chunk was already received from upstream.
+
+    Concurrency slots handed to :meth:`hold` are released with the stream.
+    """
+
+    def __init__(self, first: Any, rest: AsyncIterator[Any]) -> None:
+        self._first = first
+        self._rest = rest
+        self._limiters: list = []
+
+    def hold(self, limiters: list) -> None:
+        self._limiters = limiters
+
+    async def __aiter__(self):
+        try:
+            if self._first is not _EMPTY:
+                yield self._first
+            async for chunk in self._rest:
+                yield chunk
+        finally:
+            self._release()
+
+    async def aclose(self) -> None:
+        try:
+            await self._rest.aclose()  # type: ignore[attr-defined]
+        finally:
+            self._release()
+
+    def _release(self) -> None:
+        limiters, self._limiters = self._limiters, []
+        limits.release_all(limiters)
+
+
+_EMPTY = object()
+
+
+async def _attempt(body: ChatCompletionRequest | RawChatRequest, backend: dict, lease: Lease):
+    """Run one upstream attempt on the leased replica.
+
+    The lease is held until the response (or the whole stream) is finished so
+    in-flight counts and latency EWMAs stay accurate.  Streams are primed with
+    their first chunk so that failover and hedging also cover time-to-first-byte.
+
+    Non-streaming responses are validated against ``ChatCompletionResponse``
+    unless the backend is marked ``trusted: true``, in which case its dict is
+    passed through unchanged.  Raw passthrough requests go to http backends
+    as bytes and come back as bytes.
+    """
+
+    handle = _handler_for(backend)
+    raw = isinstance(body, RawChatRequest) and backend.get("type") == "http"
+    if isinstance(body, RawChatRequest) and not raw:
+        try:
+            body = body.parsed()  # fallback backend that needs a parsed request
+        except BaseException:
+            lease.release(ok=None)  # the request is invalid, not the backend
+            raise
+    attempt = backend_metrics.Attempt(backend, body.model)
+    try:
+        if raw:
+            result = await http_forward_raw(body.body, base_url=lease.url, stream=body.stream)
         else:
-            return JSONResponse(status_code=400, content={"error": f"Unsupported backend type: {backend_type}"})
+            result = await handle(body, base_url=lease.url)
+    except BaseException as exc:
+        attempt.finish(bool(body.stream), exc)
+        lease.release(ok=False if is_backend_failure(exc) else None)
+        raise
+
+    if not hasattr(result, "__aiter__"):
+        lease.release()
+        attempt.record_usage(result)
+        if raw or backend.get("trusted"):
+            attempt.finish(False)
+            return result
+        # Validate once here; the router serializes the model straight to bytes.
+        try:
+            return ChatCompletionResponse.model_validate(result)
+        except ValueError as exc:
+            attempt.finish(False, exc)
+            raise
+        finally:
+            attempt.finish(False)
+
+    stream = attempt.track_stream(lease.track_stream(result))
+    try:
+        first = await stream.__anext__()
+    except StopAsyncIteration:
+        first = _EMPTY
+    return _PrimedStream(first, stream)
+
+
+async def _limited(attempt: Any, limiters: list):
+    """Run an attempt on a fallback backend holding that backend's slots.
+
+    The slots are released with the response, or with the stream.
+    """
+
+    started = time.perf_counter()
+    try:
+        result = await attempt
+    except BaseException as exc:
+        if isinstance(exc, Exception):
+            limits.record_all(limiters, time.perf_counter() - started, not is_backend_failure(exc))
+        limits.release_all(limiters)
+        raise
+    limits.record_all(limiters, time.perf_counter() - started, True)
+    if isinstance(result, _PrimedStream):
+        result.hold(limiters)
+    else:
+        limits.release_all(limiters)
+    return result
+
+
+async def _discard(result: Any) -> None:
+    if isinstance(result, _PrimedStream):
+        await result.aclose()
+
+
+def _hedge_delay(backend: dict, pool) -> float | None:
+    """Return the hedge delay for *backend*, or ``None`` when not hedged."""
+
+    options = hedge_options(backend)
+    if options is None or len(pool.recent) < options["min_samples"]:
+        return None
+    delay = pool.recent.percentile(options["percentile"])
+    return max(options["min_delay"], delay or 0.0)
+
+
+async def _dispatch(body: ChatCompletionRequest | RawChatRequest, backend: dict):
+    """Send *body* to *backend* with failover, retries and optional hedging.
+
+    Targets are the backend's healthy replicas (chosen by its balancing
+    policy) followed by the replicas of its ``fallbacks`` backends.  The
+    caller already holds *backend*'s concurrency slots; a fallback backend is
+    only tried when one of its own slots is free (it never queues).
+    """
+
+    targets = [backend] + backend_loader.fallback_backends(backend)
+    tried: set[str] = set()
+
+    def launch():
+        unavailable: BackendUnavailableError | None = None
+        for target in targets:
+            _handler_for(target)
+            limiters = [] if target is backend else limits.backend_limiters(target)
+            if limiters and not limits.try_admit(limiters):
+                continue
+            try:
+                lease = get_pool(target).acquire(exclude=tried)
+            except BackendUnavailableError as exc:
+                limits.release_all(limiters)
+                unavailable = exc
+                continue
+            tried.add(lease.url)
+            attempt = _attempt(body, target, lease)
+            return _limited(attempt, limiters) if limiters else attempt
+        if not tried and unavailable is not None:
+            raise unavailable
+        return None
+
+    pool = get_pool(backend)
+    max_attempts = int(backend.get("max_attempts", get_settings().retry_max_attempts))
+    return await run_with_failover(
+        launch,
+        max_attempts=max_attempts,
+        hedge_delay=_hedge_delay(backend, pool),
+        retryable=is_backend_failure,
+        discard=_discard,
+    )
+
+
+PRIORITY_HEADER = "x-genai-priority"
+
+
+def _priority(request: Request) -> int:
+    """Admission priority from the ``X-GenAI-Priority`` header (higher first).
+
+    An API key with a ``priority`` uses it by default and caps the header;
+    everyone else starts at 0 and may only lower their priority.
+    """
+
+    try:
+        requested = int(request.headers[PRIORITY_HEADER])
+    except (KeyError, ValueError):
+        requested = None
+    key_priority = getattr(getattr(request.state, "identity", None), "priority", None)
+    if key_priority is None:
+        key_priority = 0
+    return key_priority if requested is None else min(requested, key_priority)
+
 
-    except (OllamaBackendError, HTTPBackendError, ValueError) as e:
-        # Forward backend errors as 502 Bad Gateway to the client
-        return JSONResponse(status_code=502, content={"error": str(e)})
+class ModelNotAllowedError(Exception):
+    """Raised when the request's API key may not use the requested model."""
+
+
+def _check_model(request: Request, model: str) -> None:
+    identity = getattr(request.state, "identity", None)
+    if identity is not None and not identity.allows(model):
+        raise ModelNotAllowedError(f"Model '{model}' is not available for this API key")
+
+
+async def _release_after(stream: AsyncIterator[Any], limiters: list):
+    """Hold concurrency slots until the stream is finished or abandoned."""
+
+    try:
+        async for chunk in stream:
+            yield chunk
+    finally:
+        limits.release_all(limiters)
+
+
+async def _admit_and_dispatch(body: ChatCompletionRequest | RawChatRequest, backend: dict, priority: int):
+    """Wait for concurrency slots, then dispatch; return ``(result, held limiters)``.
+
+    The caller releases the limiters once the response (or stream) is done.
+    """
+
+    # Wait for a per-model / per-backend concurrency slot (bounded queue).
+    limiters = limits.limiters_for(backend, body.model)
+    await limits.admit(limiters, priority)
+    started = time.perf_counter()
+    try:
+        result = await _dispatch(body, backend)
+    except BaseException as exc:
+        if isinstance(exc, Exception):
+            limits.record_all(limiters, time.perf_counter() - started, not is_backend_failure(exc))
+        limits.release_all(limiters)
+        raise
+    # Latency to the full response, or to the first chunk for streams.
+    limits.record_all(limiters, time.perf_counter() - started, True)
+    return result, limiters
+
+
+# Errors turned into JSON error responses (see ``error_status``).
+ROUTING_ERRORS = (
+    ModelNotAllowedError,
+    limits.AdmissionRejected,
+    UnsupportedBackendError,
+    BackendUnavailableError,
+    OllamaBackendError,
+    HTTPBackendError,
+    httpx.HTTPError,
+    ValueError,
+)
+
+
+def error_status(exc: BaseException) -> int:
+    """HTTP status the router answers a routing error with."""
+
+    if isinstance(exc, ModelNotAllowedError):
+        return 403
+    if isinstance(exc, limits.AdmissionRejected):
+        return 503
+    if isinstance(exc, UnsupportedBackendError):
+        return 400
+    if isinstance(exc, BackendUnavailableError):
+        # Every replica's circuit breaker is open: fail fast.
+        return 503
+    # Forward backend errors as 502 Bad Gateway to the client
+    return 502
+
+
+async def complete(body: ChatCompletionRequest, priority: int = 0) -> Any:
+    """Run one non-streaming completion through routing, limits and failover.
+
+    Used by the batch runner (``dispatch.batch``); raises ``ROUTING_ERRORS``.
+    """
+
+    if body.stream:
+        body = body.model_copy(update={"stream": False})
+    backend = resolve_backend(body.model)
+    result, limiters = await _admit_and_dispatch(body, backend, priority)
+    limits.release_all(limiters)
+    return result
+
+
+def _json_response(result: Any) -> Response:
+    """Encode a non-streaming result once, straight to bytes."""
+
+    if isinstance(result, bytes):
+        content = result
+    elif isinstance(result, ChatCompletionResponse):
+        content = result.model_dump_json().encode("utf-8")
+    else:
+        content = fastjson.dumps(result)
+    return Response(content, media_type="application/json")
+
+
+def _parse_request(raw: bytes) -> ChatCompletionRequest:
+    try:
+        return ChatCompletionRequest.model_validate_json(raw)
+    except ValidationError as exc:
+        errors = [{**error, "loc": ("body", *error["loc"])} for error in exc.errors(include_url=False)]
+        raise RequestValidationError(errors, body=raw)
+
+
+def _read_request(raw: bytes) -> ChatCompletionRequest | RawChatRequest:
+    """Parse the request body, or only peek at it for passthrough backends."""
+
+    peeked = peek(raw)
+    if peeked is not None:
+        try:
+            backend = resolve_backend(peeked[0])
+        except ValueError:
+            backend = {}
+        if backend.get("passthrough") and backend.get("type") == "http":
+            return RawChatRequest(raw, *peeked)
+    return _parse_request(raw)
+
+
+# The body is read by hand (see ``_read_request``); document it explicitly.
+_REQUEST_SCHEMA = ChatCompletionRequest.model_json_schema(ref_template="#/components/schemas/{model}")
+_REQUEST_SCHEMA.pop("$defs", None)  # ``Message`` is registered via the response model
+
+
+@router.post(
+    "/chat/completions",
+    response_model=ChatCompletionResponse,
+    openapi_extra={
+        "requestBody": {"required": True, "content": {"application/json": {"schema": _REQUEST_SCHEMA}}}
+    },
+)
+async def chat_completions(request: Request):
+    body = _read_request(await request.body())
+    try:
+        _check_model(request, body.model)
+    except ModelNotAllowedError as e:
+        return JSONResponse(status_code=error_status(e), content={"error": str(e)})
+
+    # Serve deterministic, repeated prompts from the response cache.
+    cache = get_response_cache()
+    cache_key: str | None = None
+    if cache.enabled and isinstance(body, ChatCompletionRequest) and is_cacheable(body, request.headers):
+        cache_key = request_key(body)
+        cached = cache.get_raw(cache_key)
+        if cached is not None:
+            return Response(cached, media_type="application/json", headers={CACHE_HEADER: "hit"})
+
+    limiters: list = []
+    try:
+        backend = resolve_backend(body.model)
+        result, limiters = await _admit_and_dispatch(body, backend, _priority(request))
+    except ROUTING_ERRORS as e:
+        headers = None
+        if isinstance(e, limits.AdmissionRejected):
+            headers = {"Retry-After": limits.retry_after_header(e)}
+        return JSONResponse(status_code=error_status(e), content={"error": str(e)}, headers=headers)
 
     # If streaming, result is an async generator (see handler implementation)
     if hasattr(result, "__aiter__"):
-        return StreamingResponse(result, media_type="text/event-stream")
+        window = coalesce_window(body.model, request.headers)
+        if window > 0:
+            result = coalesce_stream(result, window, get_settings().stream_coalesce_max_bytes)
+        return StreamingResponse(_release_after(result, limiters), media_type="text/event-stream")
+    limits.release_all(limiters)
 
-    # Validate response with schema before sending back
-    validated = ChatCompletionResponse(**result)
-    return validated
+    # The result was validated by ``_attempt`` (or comes from a trusted
+    # backend); returning a Response skips FastAPI's second validation pass.
+    response = _json_response(result)
+    if cache_key is not None:
+        cache.put_raw(cache_key, body.model, response.body)
+        response.headers[CACHE_HEADER] = "miss"
+    return response
 
-@router.get("/models", response_model=ModelList)
-async def list_models() -> ModelList:  # noqa: D401
-    """Return all configured model names in OpenAI-compatible format.
 
-    The implementation derives the list from ``config/backends.yaml``.  When no
-    config file exists, the router is running in *single Ollama* mode, so we
-    expose the default ``llama3`` model.
+@router.post("/batch")
+async def batch_completions(request: Request):
+    """Run a JSONL body of chat completion requests (see ``dispatch.batch``).
+
+    Output lines are streamed back as NDJSON in completion order; match them
+    to the input by ``custom_id``.
     """
 
-    raw_cfg = backend_loader._load_raw_config()
+    # Read the whole body up front: once streaming starts the response owns
+    # ``receive`` (to watch for disconnects).
+    lines = (await request.body()).decode("utf-8").splitlines()
 
-    models: list[ModelInfo] = []
+    def backend_of(model: str) -> str:
+        return resolve_backend(model).get("name", "default")
 
-    if not raw_cfg:
-        # No config → single-model Ollama setup.
-        models.append(ModelInfo(id="llama3", owned_by="ollama"))
-    else:
-        routing: dict[str, str] = raw_cfg.get("routing", {})
-        backends: dict[str, dict] = raw_cfg.get("backends", {})
+    async def complete_allowed(body: ChatCompletionRequest) -> Any:
+        _check_model(request, body.model)
+        return await complete(body, priority=BATCH_PRIORITY)
+
+    runner = BatchRunner(
+        complete_allowed,
+        backend_of,
+        error_status,
+        get_settings().batch_concurrency,
+    )
+
+    async def output():
+        async for record in runner.run(lines):
+            yield fastjson.dumps(record) + b"\n"
 
-        for model_name, backend_key in routing.items():
-            backend = backends.get(backend_key, {})
-            owned_by = backend.get("type", "backend")
-            models.append(ModelInfo(id=model_name, owned_by=owned_by))
+    return StreamingResponse(output(), media_type="application/x-ndjson")
+
+
+@router.get("/models", response_model=ModelList)
+async def list_models() -> Response:  # noqa: D401
+    """Return all configured model names in OpenAI-compatible format.
+
+    The payload is rendered once per version of ``config/backends.yaml`` (see
+    ``RoutingTable``).  When no config file exists, the router is running in
+    *single Ollama* mode, so we expose the default ``llama3`` model.
+    """
 
-    return ModelList(data=models)
+    return Response(backend_loader.get_routing_table().models_payload, media_type="application/json")
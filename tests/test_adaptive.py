@@ -0,0 +1,51 @@
+import pytest
+
+from dispatch.adaptive import AIMDLimit, GradientLimit, make_algorithm
+from dispatch.limits import AdaptiveConcurrencyLimiter
+
+
+def test_aimd_grows_when_saturated_and_backs_off_on_errors():
+    aimd = AIMDLimit(initial_limit=10, max_limit=12)
+    assert aimd.update(0.1, True, in_flight=2) == 10  # not saturated, no growth
+    assert aimd.update(0.1, True, in_flight=10) == 11
+    assert aimd.update(0.1, True, in_flight=11) == 12
+    assert aimd.update(0.1, True, in_flight=12) == 12  # capped
+    assert aimd.update(0.1, False, in_flight=12) == pytest.approx(10.8)
+
+
+def test_aimd_latency_threshold_counts_as_overload():
+    aimd = AIMDLimit(initial_limit=10, latency_threshold=1.0)
+    assert aimd.update(2.0, True, in_flight=10) == pytest.approx(9.0)
+
+
+def test_gradient_grows_at_stable_latency_and_shrinks_under_queueing():
+    gradient = GradientLimit(initial_limit=10, max_limit=100)
+    for _ in range(50):
+        limit = gradient.update(0.1, True, in_flight=int(gradient.limit))
+    assert limit > 10
+
+    grown = gradient.limit
+    for _ in range(50):
+        limit = gradient.update(1.0, True, in_flight=int(gradient.limit))
+    assert limit < grown
+
+
+def test_make_algorithm_validates_name():
+    assert isinstance(make_algorithm({"algorithm": "aimd", "initial_limit": 3}), AIMDLimit)
+    with pytest.raises(ValueError):
+        make_algorithm({"algorithm": "vegas-ish"})
+
+
+@pytest.mark.asyncio
+async def test_adaptive_limiter_applies_new_limit():
+    limiter = AdaptiveConcurrencyLimiter(
+        "adaptive:test", AIMDLimit(initial_limit=4, min_limit=1), max_queue=10, queue_timeout=1
+    )
+    assert limiter.limit == 4
+    for _ in range(4):
+        await limiter.acquire()
+
+    limiter.record(0.1, True)
+    assert limiter.limit == 5
+    limiter.record(0.1, False)
+    assert limiter.limit == 4
@@ -0,0 +1,176 @@
+import hashlib
+import importlib
+import sys
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+from starlette.requests import Request
+
+from config import api_keys
+from config.api_keys import KeyConfigError, KeyRegistry
+from config.settings import Settings, get_settings
+from dispatch.config_reload import ConfigWatcher
+
+KEYS_FILE = """
+rate_limit_tiers:
+  tiny: "1/min"
+  unlimited: ""
+keys:
+  - key_sha256: {acme_digest}
+    tenant: acme
+    models: ["llama3*", company-gpt]
+    rate_limit: tiny
+    priority: 3
+  - key: ops-key
+    tenant: ops
+    rate_limit: unlimited
+    admin: true
+"""
+
+
+def _sha(key):
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+@pytest.fixture
+def keys_file(tmp_path):
+    path = tmp_path / "keys.yaml"
+    path.write_text(KEYS_FILE.format(acme_digest=_sha("acme-key")))
+    return path
+
+
+def test_registry_from_env_and_file(keys_file):
+    registry = KeyRegistry.load(Settings(api_keys="a, b ,", admin_api_keys="b", api_keys_file=str(keys_file)))
+
+    assert len(registry) == 4
+    assert registry.auth_required and registry.has_admin
+    assert registry.lookup("nope") is None and registry.lookup(None) is None
+
+    plain = registry.lookup("a")
+    assert plain.key_id == _sha("a")[:12] and plain.tenant == plain.key_id
+    assert plain.rate_limit is None and plain.priority is None and not plain.admin
+    assert plain.allows("anything")
+    assert registry.lookup("b").admin
+
+    acme = registry.lookup("acme-key")
+    assert (acme.tenant, acme.priority, acme.rate_limit_tier, acme.rate_limit) == ("acme", 3, "tiny", ((1, 60),))
+    assert acme.allows("llama3:70b") and acme.allows("company-gpt") and not acme.allows("mixtral")
+    assert registry.lookup("ops-key").rate_limit == ()
+
+    admin_only = KeyRegistry.load(Settings(admin_api_keys="root"))
+    assert not admin_only.auth_required and admin_only.has_admin
+
+
+@pytest.mark.parametrize(
+    "content",
+    [
+        "keys: {a: b}\n",
+        "keys:\n  - tenant: no-key\n",
+        "keys:\n  - key_sha256: abc\n",
+        "keys:\n  - key: k\n    rate_limit: gold\n",
+        "keys:\n  - key: k\n    priority: high\n",
+        "keys:\n  - key: k\n    models: llama3\n",
+        "keys:\n  - key: k\n  - key: k\n",
+        "rate_limit_tiers: {gold: lots}\n",
+        "keys: [\n",
+    ],
+)
+def test_invalid_keys_file(tmp_path, content):
+    path = tmp_path / "keys.yaml"
+    path.write_text(content)
+    with pytest.raises(KeyConfigError):
+        KeyRegistry.load(Settings(api_keys_file=str(path)))
+
+
+def test_reload_keeps_registry_on_invalid_file(monkeypatch, keys_file):
+    monkeypatch.setenv("GENAI_API_KEYS_FILE", str(keys_file))
+    monkeypatch.delenv("GENAI_API_KEYS", raising=False)
+    get_settings.cache_clear()
+    monkeypatch.setattr(api_keys, "_registry", None)
+    watcher = ConfigWatcher(interval=0)
+
+    registry = api_keys.get_key_registry()
+    assert api_keys.get_key_registry() is registry
+    keys_file.write_text("keys:\n  - key: new-key\n")
+    assert watcher.reload_keys()
+    assert api_keys.get_key_registry().lookup("new-key") is not None
+    assert api_keys.get_key_registry().lookup("acme-key") is None
+
+    keys_file.write_text("keys: nope\n")
+    assert not watcher.reload_keys()
+    assert api_keys.get_key_registry().lookup("new-key") is not None
+    get_settings.cache_clear()
+
+
+def test_priority_from_identity():
+    import router as router_module
+
+    def request(priority_header=None, identity=None):
+        headers = [(b"x-genai-priority", priority_header.encode())] if priority_header else []
+        state = {"identity": identity} if identity else {}
+        return Request({"type": "http", "headers": headers, "state": state})
+
+    capped = api_keys.KeyIdentity(key_id="k", tenant="t", priority=3)
+    plain = api_keys.KeyIdentity(key_id="p", tenant="t")
+    assert router_module._priority(request()) == 0
+    # Without a key priority the header can only lower the priority.
+    assert router_module._priority(request("1000000")) == 0
+    assert router_module._priority(request("1000000", plain)) == 0
+    assert router_module._priority(request("-2", plain)) == -2
+    assert router_module._priority(request(identity=capped)) == 3
+    assert router_module._priority(request("7", capped)) == 3
+    assert router_module._priority(request("-5", capped)) == -5
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch, keys_file):
+    monkeypatch.setenv("GENAI_API_KEYS_FILE", str(keys_file))
+    monkeypatch.delenv("GENAI_API_KEYS", raising=False)
+    monkeypatch.delenv("GENAI_ADMIN_API_KEYS", raising=False)
+    monkeypatch.setenv("GENAI_RATE_LIMIT", "100/min")
+    get_settings.cache_clear()
+    app_mod = importlib.reload(sys.modules["main"]) if "main" in sys.modules else importlib.import_module("main")
+    async with AsyncClient(transport=ASGITransport(app=app_mod.app), base_url="http://test") as ac:
+        yield ac
+    get_settings.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_identity_drives_auth_models_and_rate_limits(monkeypatch, client):
+    import router as router_module
+
+    async def handle(body, base_url=None):
+        return {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "model": body.model,
+            "choices": [{"index": 0, "message": {"role": "assistant", "content": "hi"}, "finish_reason": "stop"}],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    backend = {"name": "remote", "type": "http", "base_url": "http://remote"}
+    monkeypatch.setattr(router_module, "resolve_backend", lambda model: backend)
+    monkeypatch.setattr(router_module, "http_handle", handle)
+    acme = {"Authorization": "Bearer acme-key"}
+    ops = {"X-API-Key": "ops-key"}
+
+    assert (await client.get("/healthz")).status_code == 401
+    assert (await client.get("/healthz", headers={"X-API-Key": "acme"})).status_code == 401
+
+    messages = [{"role": "user", "content": "hello"}]
+    resp = await client.post("/v1/chat/completions", json={"model": "mixtral", "messages": messages}, headers=ops)
+    assert resp.status_code == 200  # ops may use every model
+
+    resp = await client.post("/v1/chat/completions", json={"model": "mixtral", "messages": messages}, headers=acme)
+    assert resp.status_code == 403
+    assert "not available" in resp.json()["error"]
+
+    # acme's tier allows one request per minute; the 403 above used it.
+    resp = await client.post("/v1/chat/completions", json={"model": "llama3:8b", "messages": messages}, headers=acme)
+    assert resp.status_code == 429
+    assert resp.headers["x-request-id"]
+    # ops is in an unlimited tier.
+    assert all([(await client.get("/healthz", headers=ops)).status_code == 200 for _ in range(3)])
+    # Admin keys from the file unlock /debug.
+    assert (await client.get("/debug/loop", headers=ops)).status_code == 200
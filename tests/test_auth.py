@@ -34,4 +34,25 @@ async def test_auth_valid_key(monkeypatch, client):
 
     headers = {"Authorization": "Bearer secret123"}
     resp = await client.get("/v1/models", headers=headers)
-    assert resp.status_code == 200 
\ No newline at end of file
+    assert resp.status_code == 200 
+
+@pytest.mark.asyncio
+async def test_rejections_are_logged_and_counted(monkeypatch, client, caplog):
+    from dispatch import metrics
+
+    monkeypatch.setenv("GENAI_API_KEYS", "secret123")
+    get_settings.cache_clear()
+    import importlib, sys
+    importlib.reload(sys.modules["main"])
+    counter = metrics.REJECTED_REQUESTS.labels(reason="unauthorized")
+    before = counter._value.get() if metrics.PROM_AVAILABLE else 0
+
+    with caplog.at_level("INFO", logger="genai-router"):
+        resp = await client.get("/v1/models", headers={"X-API-Key": "wrong"})
+
+    assert resp.status_code == 401
+    request_id = resp.headers["x-request-id"]
+    records = [r.msg for r in caplog.records if isinstance(r.msg, dict) and r.msg.get("request_id") == request_id]
+    assert records and records[0]["status"] == 401 and records[0]["path"] == "/v1/models"
+    if metrics.PROM_AVAILABLE:
+        assert counter._value.get() == before + 1
@@ -1,11 +1,14 @@
 import importlib
+import json
+
+import pytest
 
 from config import backend_loader
 
 
 def test_default_backend(monkeypatch):
-    # Clear cache before monkeypatching
-    backend_loader._load_raw_config.cache_clear()
+    # Drop the compiled table so the patched config is used
+    monkeypatch.setattr(backend_loader, "_table", None)
 
     monkeypatch.setattr(backend_loader, "_load_raw_config", lambda: {})
     backend = backend_loader.resolve_backend("any-model")
@@ -22,9 +25,149 @@ def test_routing(monkeypatch):
         "routing": {"company-gpt": "http-mcp"},
     }
 
-    backend_loader._load_raw_config.cache_clear()
+    monkeypatch.setattr(backend_loader, "_table", None)
     monkeypatch.setattr(backend_loader, "_load_raw_config", lambda: sample_cfg)
 
     backend = backend_loader.resolve_backend("company-gpt")
     assert backend["type"] == "http"
-    assert backend["base_url"] == "http://y" 
\ No newline at end of file
+    assert backend["base_url"] == "http://y" 
+
+def _write(path, text):
+    path.write_text(text)
+    return path
+
+
+def test_reload_swaps_table_and_keeps_old_entries(monkeypatch, tmp_path):
+    cfg = _write(
+        tmp_path / "backends.yaml",
+        "backends:\n  a: {type: http, base_url: 'http://a', fallbacks: [b]}\n"
+        "  b: {type: http, base_url: 'http://b'}\nrouting:\n  m: a\n",
+    )
+    monkeypatch.setattr(backend_loader, "config_path", lambda: cfg)
+    monkeypatch.setattr(backend_loader, "_table", None)
+
+    old = backend_loader.resolve_backend("m")
+    assert old["name"] == "a"
+    assert [b["base_url"] for b in backend_loader.fallback_backends(old)] == ["http://b"]
+
+    _write(cfg, "backends:\n  c: {type: http, base_url: 'http://c'}\nrouting:\n  m: c\n  n: c\n")
+    table = backend_loader.reload_config()
+
+    assert backend_loader.get_routing_table() is table
+    assert backend_loader.resolve_backend("m")["base_url"] == "http://c"
+    assert backend_loader.list_models() == ["m", "n"]
+    # A request that resolved before the reload keeps its fallbacks.
+    assert [b["base_url"] for b in backend_loader.fallback_backends(old)] == ["http://b"]
+
+
+def test_invalid_reload_keeps_current_table(monkeypatch, tmp_path):
+    cfg = _write(tmp_path / "backends.yaml", "backends:\n  a: {type: ollama}\nrouting:\n  m: a\n")
+    monkeypatch.setattr(backend_loader, "config_path", lambda: cfg)
+    monkeypatch.setattr(backend_loader, "_table", None)
+    table = backend_loader.get_routing_table()
+
+    for broken in (
+        "routing:\n  m: missing\n",
+        "backends:\n  a: {type: grpc}\n",
+        "backends:\n  a: {type: http}\n",
+        "backends:\n  a: {type: ollama, fallbacks: [nope]}\n",
+        "backends: [a, b]\n",
+        "routing: {m: [\n",
+        "backends:\n  a: {type: ollama, balancer: bogus}\n",
+        "backends:\n  a: {type: http, base_url: 'http://a', pool: {max_connections: lots}}\n",
+        "backends:\n  a: {type: ollama, hedge: {percentile: high}}\n",
+        "backends:\n  a: {type: ollama, adaptive_concurrency: {algorithm: magic}}\n",
+        "backends:\n  a: {type: ollama, max_concurrency: many}\n",
+        "backends:\n  a: {type: ollama, circuit_breaker: {recovery_time: soon}}\n",
+        "model_limits:\n  m: {max_concurrency: 1, queue_timeout: never}\n",
+    ):
+        _write(cfg, broken)
+        with pytest.raises(backend_loader.ConfigError):
+            backend_loader.reload_config()
+        assert backend_loader.get_routing_table() is table
+
+
+def test_models_payload_and_read_only_entries(monkeypatch):
+    monkeypatch.setattr(backend_loader, "_table", None)
+    monkeypatch.setattr(backend_loader, "_load_raw_config", lambda: {})
+    table = backend_loader.get_routing_table()
+
+    assert json.loads(table.models_payload) == {
+        "object": "list",
+        "data": [{"id": "llama3", "object": "model", "created": 0, "owned_by": "ollama"}],
+    }
+    with pytest.raises(TypeError):
+        table.resolve("llama3")["base_url"] = "http://elsewhere"
+
+
+def _rules_table(rules, routing=None):
+    names = ("default", "a", "b", "c")
+    return backend_loader.RoutingTable(
+        {
+            "default_backend": "default",
+            "backends": {name: {"type": "ollama"} for name in names},
+            "routing": routing or {},
+            "routing_rules": rules,
+        }
+    )
+
+
+def test_routing_rule_precedence():
+    table = _rules_table(
+        [
+            {"regex": "(?i)LLAMA3:.*-instruct", "backend": "c"},  # no literal prefix
+            {"prefix": "llama3:", "backend": "a"},
+            {"glob": "llama3:70b*", "backend": "b"},  # trailing * only → prefix
+            {"glob": "mistral-*-v[0-9]", "backend": "b"},
+            {"regex": "gpt-4(o|-turbo)?", "backend": "c"},
+            {"regex": "gpt-.*", "backend": "a"},
+            {"regex": ".*-chat", "backend": "b"},
+        ],
+        routing={"llama3:70b-special": "c"},
+    )
+
+    expected = {
+        "llama3:70b-special": "c",  # exact name
+        "llama3:70b-q4": "b",  # longest prefix
+        "llama3:8b": "a",
+        "mistral-7b-v2": "b",
+        "mistral-7b-v10": "default",
+        "gpt-4o": "c",  # first matching regex in list order
+        "gpt-4o-mini": "a",
+        "gpt-3-chat": "a",  # earlier indexed rule beats later unindexed one
+        "phi-chat": "b",
+        "gpt-4": "c",
+        "other": "default",
+    }
+    assert {name: table.resolve(name)["name"] for name in expected} == expected
+    # Prefix rules come before globs and regexes.
+    assert table.resolve("llama3:8b-instruct")["name"] == "a"
+    assert _rules_table([{"regex": ".*", "backend": "c"}, {"regex": "x.*", "backend": "a"}]).resolve("xy")["name"] == "c"
+
+
+def test_resolved_names_are_memoized(monkeypatch):
+    calls = []
+    match = backend_loader._RuleMatcher.match
+    monkeypatch.setattr(backend_loader._RuleMatcher, "match", lambda self, name: calls.append(name) or match(self, name))
+    table = _rules_table([{"glob": "*-q4", "backend": "a"}])
+
+    assert [table.resolve("llama3-q4")["name"] for _ in range(3)] == ["a"] * 3
+    assert table.resolve("other")["name"] == "default"
+    assert calls == ["llama3-q4", "other"]
+
+    monkeypatch.setattr(backend_loader, "RESOLVE_MEMO_SIZE", 2)
+    table.resolve("third")
+    table.resolve("llama3-q4")
+    assert calls[2:] == ["third", "llama3-q4"]  # memo was full and got reset
+
+
+def test_invalid_routing_rules():
+    for rules in (
+        {"prefix": "x", "backend": "a"},
+        [{"prefix": "x", "glob": "y*", "backend": "a"}],
+        [{"regex": "(", "backend": "a"}],
+        [{"regex": "(a)\\1", "backend": "a"}],
+        [{"glob": "x*", "backend": "missing"}],
+    ):
+        with pytest.raises(backend_loader.ConfigError):
+            _rules_table(rules)
@@ -0,0 +1,61 @@
+import pytest
+
+from config import backend_loader
+from dispatch import balancer
+from dispatch.balancer import ReplicaPool
+
+
+def test_backend_urls_prefers_replicas():
+    backend = {"type": "ollama", "replicas": ["http://a", "http://b"], "base_url": "http://x"}
+    assert backend_loader.backend_urls(backend) == ["http://a", "http://b"]
+    assert backend_loader.backend_urls({"type": "http", "base_url": "http://y"}) == ["http://y"]
+
+
+def test_round_robin_cycles():
+    pool = ReplicaPool(["http://a", "http://b", "http://c"], "round_robin")
+    picked = [pool.choose().url for _ in range(6)]
+    assert picked == ["http://a", "http://b", "http://c"] * 2
+
+
+def test_least_outstanding_avoids_busy_replica():
+    pool = ReplicaPool(["http://a", "http://b"], "least_outstanding")
+    busy = pool.acquire()
+    other = pool.acquire()
+    assert busy.url != other.url
+
+    other.release()
+    assert pool.acquire().url == other.url
+
+
+def test_p2c_prefers_faster_replica():
+    pool = ReplicaPool(["http://fast", "http://slow"], "p2c_ewma")
+    fast, slow = pool.replicas
+    fast.observe(0.1)
+    slow.observe(2.0)
+    assert {pool.choose().url for _ in range(20)} == {"http://fast"}
+
+
+def test_unknown_policy_rejected():
+    with pytest.raises(ValueError):
+        ReplicaPool(["http://a"], "nope")
+
+
+@pytest.mark.asyncio
+async def test_stream_lease_released_when_stream_ends():
+    pool = ReplicaPool(["http://a"])
+
+    async def stream():
+        yield "data: 1\n\n"
+
+    lease = pool.acquire()
+    assert pool.replicas[0].in_flight == 1
+    chunks = [c async for c in lease.track_stream(stream())]
+
+    assert chunks == ["data: 1\n\n"]
+    assert pool.replicas[0].in_flight == 0
+    assert pool.replicas[0].ewma_latency > 0
+
+
+def test_get_pool_is_cached_per_backend():
+    backend = {"type": "http", "replicas": ["http://a", "http://b"], "balancer": "least_outstanding"}
+    assert balancer.get_pool(backend) is balancer.get_pool(dict(backend))
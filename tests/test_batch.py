@@ -0,0 +1,222 @@
+import asyncio
+import importlib
+import json
+import sys
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from config import backend_loader
+from config.settings import get_settings
+from dispatch.batch import BatchRunner, completed_ids, parse_line, read_lines
+
+
+def _line(custom_id, model="llama3", content="hi"):
+    return json.dumps(
+        {
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": "/v1/chat/completions",
+            "body": {"model": model, "messages": [{"role": "user", "content": content}]},
+        }
+    )
+
+
+def _completion(body):
+    return {
+        "id": "chatcmpl-test",
+        "object": "chat.completion",
+        "model": body.model,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": body.messages[0].content},
+                "finish_reason": "stop",
+            }
+        ],
+        "usage": {"prompt_tokens": 1, "completion_tokens": 2, "total_tokens": 3},
+    }
+
+
+def _runner(complete, concurrency=4):
+    return BatchRunner(complete, lambda model: model, lambda exc: 502, concurrency)
+
+
+async def _collect(runner, lines, skip=frozenset()):
+    return [record async for record in runner.run(lines, skip)]
+
+
+def test_parse_line_accepts_batch_and_bare_lines():
+    custom_id, body = parse_line(_line("q-1"), 1)
+    assert custom_id == "q-1" and body.model == "llama3"
+
+    bare = json.dumps({"model": "llama3", "messages": [{"role": "user", "content": "x"}]})
+    assert parse_line(bare, 7)[0] == "line-7"
+
+    with pytest.raises(ValueError):
+        parse_line(json.dumps({"custom_id": "x", "url": "/v1/embeddings", "body": {}}), 1)
+
+
+@pytest.mark.asyncio
+async def test_runner_records_results_errors_and_stats():
+    async def complete(body):
+        if body.messages[0].content == "boom":
+            raise ValueError("backend exploded")
+        return _completion(body)
+
+    runner = _runner(complete)
+    lines = [_line("ok-1"), _line("bad", content="boom"), "{not json", "", _line("ok-2")]
+    records = {r["custom_id"]: r for r in await _collect(runner, lines)}
+
+    assert records["ok-1"]["response"]["status_code"] == 200
+    assert records["ok-1"]["response"]["body"]["choices"][0]["message"]["content"] == "hi"
+    assert records["ok-1"]["error"] is None
+    assert records["bad"]["response"]["status_code"] == 502
+    assert records["bad"]["error"] == {"code": "ValueError", "message": "backend exploded"}
+    assert records["line-3"]["response"]["status_code"] == 400
+
+    stats = runner.stats
+    assert (stats.total, stats.succeeded, stats.failed, stats.tokens) == (4, 2, 2, 6)
+    assert stats.summary()["total_tokens"] == 6
+
+
+@pytest.mark.asyncio
+async def test_runner_bounds_concurrency_per_backend():
+    in_flight = {"a": 0, "b": 0}
+    peak = {"a": 0, "b": 0}
+
+    async def complete(body):
+        in_flight[body.model] += 1
+        peak[body.model] = max(peak[body.model], in_flight[body.model])
+        await asyncio.sleep(0.01)
+        in_flight[body.model] -= 1
+        return _completion(body)
+
+    lines = [_line(f"{m}-{i}", model=m) for i in range(10) for m in ("a", "b")]
+    records = await _collect(_runner(complete, concurrency=3), lines)
+
+    assert len(records) == 20
+    assert peak == {"a": 3, "b": 3}
+
+
+@pytest.mark.asyncio
+async def test_busy_backend_does_not_block_other_backends():
+    release_slow = asyncio.Event()
+    done = []
+
+    async def complete(body):
+        if body.model == "slow":
+            await release_slow.wait()
+        done.append(body.messages[0].content)
+        return _completion(body)
+
+    lines = [_line(f"slow-{i}", model="slow", content=f"slow-{i}") for i in range(3)]
+    lines += [_line(f"fast-{i}", model="fast", content=f"fast-{i}") for i in range(3)]
+    runner = BatchRunner(complete, lambda model: model, lambda exc: 502, concurrency=1, max_pending=4)
+    records = runner.run(lines)
+
+    first = [(await records.__anext__())["custom_id"] for _ in range(3)]
+    assert first == ["fast-0", "fast-1", "fast-2"]
+    assert done == ["fast-0", "fast-1", "fast-2"]
+
+    release_slow.set()
+    rest = [record["custom_id"] async for record in records]
+    assert sorted(rest) == ["slow-0", "slow-1", "slow-2"]
+
+
+@pytest.mark.asyncio
+async def test_runner_skips_completed_ids():
+    seen = []
+
+    async def complete(body):
+        seen.append(body.messages[0].content)
+        return _completion(body)
+
+    runner = _runner(complete)
+    lines = [_line("q-1", content="one"), _line("q-2", content="two")]
+    records = await _collect(runner, lines, skip={"q-1"})
+
+    assert [r["custom_id"] for r in records] == ["q-2"]
+    assert seen == ["two"]
+    assert runner.stats.skipped == 1
+
+
+def test_completed_ids_truncates_partial_line(tmp_path):
+    out = tmp_path / "out.jsonl"
+    out.write_text(
+        json.dumps({"custom_id": "q-1"}) + "\n" + json.dumps({"custom_id": "q-2"}) + "\n" + '{"custom_id": "q-'
+    )
+
+    assert completed_ids(out) == {"q-1", "q-2"}
+    assert out.read_text().endswith("}\n")
+    assert completed_ids(tmp_path / "missing.jsonl") == set()
+
+
+def test_completed_ids_drops_retryable_failures(tmp_path):
+    def failed(custom_id, status):
+        response = {"status_code": status, "body": None} if status else None
+        return {"custom_id": custom_id, "response": response, "error": {"code": "E", "message": "x"}}
+
+    records = [
+        {"custom_id": "ok", "response": {"status_code": 200, "body": {}}, "error": None},
+        failed("busy", 503),
+        failed("limited", 429),
+        failed("gone", None),
+        failed("bad-request", 400),
+        failed("forbidden", 403),
+    ]
+    out = tmp_path / "out.jsonl"
+    out.write_text("".join(json.dumps(record) + "\n" for record in records))
+
+    assert completed_ids(out) == {"ok", "bad-request", "forbidden"}
+    assert [json.loads(line)["custom_id"] for line in out.read_text().splitlines()] == [
+        "ok",
+        "bad-request",
+        "forbidden",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_runner_reads_input_off_the_loop(tmp_path):
+    src = tmp_path / "in.jsonl"
+    src.write_text("\n".join(_line(f"q-{i}") for i in range(50)) + "\n")
+
+    async def complete(body):
+        return _completion(body)
+
+    with src.open("r", encoding="utf-8") as fh:
+        records = await _collect(_runner(complete), read_lines(fh, block=256))
+    assert sorted(r["custom_id"] for r in records) == sorted(f"q-{i}" for i in range(50))
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    monkeypatch.delenv("GENAI_API_KEYS", raising=False)
+    monkeypatch.delenv("GENAI_RATE_LIMIT", raising=False)
+    get_settings.cache_clear()
+    monkeypatch.setattr(backend_loader, "_table", None)
+    app_mod = importlib.reload(sys.modules["main"]) if "main" in sys.modules else importlib.import_module("main")
+    transport = ASGITransport(app=app_mod.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+
+
+@pytest.mark.asyncio
+async def test_batch_endpoint_streams_ndjson(monkeypatch, client):
+    import router as router_module
+
+    async def fake_handle(body, base_url=None):
+        return _completion(body)
+
+    monkeypatch.setattr(router_module, "resolve_backend", lambda model: {"name": "local", "type": "ollama"})
+    monkeypatch.setattr(router_module, "ollama_handle", fake_handle)
+
+    payload = "\n".join([_line("q-1"), _line("q-2", content="there")]) + "\n"
+    resp = await client.post("/v1/batch", content=payload)
+
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("application/x-ndjson")
+    records = [json.loads(line) for line in resp.text.splitlines()]
+    assert sorted(r["custom_id"] for r in records) == ["q-1", "q-2"]
+    assert all(r["response"]["status_code"] == 200 for r in records)
@@ -0,0 +1,56 @@
+import pytest
+
+from handlers import client_pool
+
+
+@pytest.fixture(autouse=True)
+def reset_pool():
+    client_pool._clients.clear()
+    client_pool._stream_timeouts.clear()
+    yield
+    client_pool._clients.clear()
+    client_pool._stream_timeouts.clear()
+
+
+def test_get_client_reuses_instance():
+    first = client_pool.get_client("http://backend:8000/")
+    second = client_pool.get_client("http://backend:8000")
+    assert first is second
+
+
+def test_pool_options_override_defaults():
+    options = client_pool.pool_options({"pool": {"max_connections": 7, "http2": True}})
+    assert options["max_connections"] == 7
+    assert options["http2"] is True
+    assert options["read_timeout"] == client_pool.DEFAULT_POOL_OPTIONS["read_timeout"]
+
+
+@pytest.mark.asyncio
+async def test_startup_registers_http_backends_and_shutdown_closes():
+    backends = {
+        "ollama": {"type": "ollama", "base_url": "http://ollama:11434"},
+        "mcp": {
+            "type": "http",
+            "base_url": "http://mcp:8000",
+            "pool": {"warm_connections": 0, "read_timeout": 5, "connect_timeout": 1},
+        },
+    }
+    await client_pool.startup(backends)
+
+    client = client_pool.get_client("http://mcp:8000")
+    assert client.timeout.read == 5
+    assert client.timeout.connect == 1
+    assert list(client_pool._clients) == ["http://mcp:8000"]
+    # Streams are not cut off by the read timeout between chunks.
+    stream = client_pool.stream_timeout("http://mcp:8000/")
+    assert (stream.read, stream.connect) == (None, 1)
+
+    await client_pool.shutdown()
+    assert client.is_closed
+    assert client_pool._clients == {}
+
+
+def test_stream_read_timeout_is_configurable():
+    backend = {"pool": {"read_timeout": 5, "stream_read_timeout": 600}}
+    assert client_pool._stream_timeout(client_pool.pool_options(backend)).read == 600
+    assert client_pool.stream_timeout("http://unknown:1").read is None
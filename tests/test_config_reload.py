@@ -0,0 +1,117 @@
+import asyncio
+import os
+import signal
+
+import pytest
+
+from config import backend_loader
+from dispatch.config_reload import ConfigWatcher, _file_state
+from handlers import client_pool
+
+
+@pytest.fixture
+def config_file(monkeypatch, tmp_path):
+    path = tmp_path / "backends.yaml"
+    path.write_text("backends:\n  a: {type: ollama, base_url: 'http://a'}\nrouting:\n  m: a\n")
+    monkeypatch.setattr(backend_loader, "config_path", lambda: path)
+    monkeypatch.setattr(backend_loader, "_table", None)
+    return path
+
+
+class _Checker:
+    def __init__(self):
+        self.backends = None
+
+    def set_backends(self, backends):
+        self.backends = backends
+
+
+@pytest.mark.asyncio
+async def test_watcher_reloads_changed_file(config_file):
+    checker = _Checker()
+    watcher = ConfigWatcher(interval=0.01, health_checker=checker)
+    watcher.start()
+    try:
+        assert backend_loader.resolve_backend("m")["base_url"] == "http://a"
+        config_file.write_text("backends:\n  b: {type: ollama, base_url: 'http://b'}\nrouting:\n  m: b\n")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if backend_loader.resolve_backend("m")["name"] == "b":
+                break
+    finally:
+        await watcher.stop()
+
+    assert backend_loader.resolve_backend("m")["base_url"] == "http://b"
+    assert list(checker.backends) == ["b"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_file_is_rejected(config_file):
+    table = backend_loader.get_routing_table()
+    config_file.write_text("routing:\n  m: missing\n")
+
+    assert await ConfigWatcher(interval=0).reload() is False
+    assert backend_loader.get_routing_table() is table
+
+
+@pytest.mark.asyncio
+async def test_unknown_balancer_is_rejected(config_file):
+    table = backend_loader.get_routing_table()
+    config_file.write_text("backends:\n  a: {type: ollama, balancer: bogus}\nrouting:\n  m: a\n")
+
+    assert await ConfigWatcher(interval=0).reload() is False
+    assert backend_loader.get_routing_table() is table
+
+
+@pytest.mark.asyncio
+async def test_failed_client_startup_keeps_table_and_watcher(config_file, monkeypatch):
+    startup = client_pool.startup
+    broken = True
+
+    async def flaky_startup(backends):
+        if broken:
+            raise TypeError("no clients today")
+        await startup(backends)
+
+    monkeypatch.setattr(client_pool, "startup", flaky_startup)
+    table = backend_loader.get_routing_table()
+    watcher = ConfigWatcher(interval=0.01)
+    watcher.start()
+    try:
+        config_file.write_text("backends:\n  b: {type: ollama, base_url: 'http://b'}\nrouting:\n  m: b\n")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if watcher._state == _file_state(config_file):
+                break
+        assert backend_loader.get_routing_table() is table
+
+        # The watcher survived the failure and applies the next change.
+        broken = False
+        config_file.write_text("backends:\n  c: {type: ollama, base_url: 'http://c'}\nrouting:\n  m: c\n")
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if backend_loader.resolve_backend("m")["name"] == "c":
+                break
+    finally:
+        await watcher.stop()
+
+    assert backend_loader.resolve_backend("m")["name"] == "c"
+
+
+@pytest.mark.asyncio
+@pytest.mark.skipif(not hasattr(signal, "SIGHUP"), reason="no SIGHUP on this platform")
+async def test_sighup_triggers_reload(config_file):
+    watcher = ConfigWatcher(interval=0)
+    watcher.start()
+    try:
+        backend_loader.get_routing_table()
+        config_file.write_text("backends:\n  c: {type: ollama}\nrouting:\n  m: c\n")
+        os.kill(os.getpid(), signal.SIGHUP)
+        for _ in range(100):
+            await asyncio.sleep(0.01)
+            if backend_loader.resolve_backend("m")["name"] == "c":
+                break
+    finally:
+        await watcher.stop()
+
+    assert backend_loader.resolve_backend("m")["name"] == "c"
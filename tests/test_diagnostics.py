@@ -0,0 +1,114 @@
+import asyncio
+import importlib
+import marshal
+import sys
+import time
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from config.settings import get_settings
+from diagnostics import memory, profiler
+from diagnostics.loop_monitor import LoopLagMonitor, task_counts
+
+ADMIN = {"Authorization": "Bearer admin-key"}
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    monkeypatch.delenv("GENAI_API_KEYS", raising=False)
+    monkeypatch.delenv("GENAI_RATE_LIMIT", raising=False)
+    monkeypatch.setenv("GENAI_ADMIN_API_KEYS", "admin-key")
+    get_settings.cache_clear()
+    app_mod = importlib.reload(sys.modules["main"]) if "main" in sys.modules else importlib.import_module("main")
+    async with AsyncClient(transport=ASGITransport(app=app_mod.app), base_url="http://test") as ac:
+        yield ac
+    get_settings.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_debug_endpoints_require_admin_key(client, monkeypatch):
+    assert (await client.get("/debug/loop")).status_code == 403
+    assert (await client.get("/debug/loop", headers={"X-API-Key": "nope"})).status_code == 403
+    assert (await client.get("/debug/loop", headers=ADMIN)).status_code == 200
+
+    monkeypatch.delenv("GENAI_ADMIN_API_KEYS")
+    get_settings.cache_clear()
+    assert (await client.get("/debug/loop", headers=ADMIN)).status_code == 404
+
+
+@pytest.mark.asyncio
+async def test_admin_key_passes_api_key_auth(client, monkeypatch):
+    monkeypatch.setenv("GENAI_API_KEYS", "user-key")
+    get_settings.cache_clear()
+    assert (await client.get("/debug/loop", headers=ADMIN)).status_code == 200
+    assert (await client.get("/debug/loop", headers={"X-API-Key": "user-key"})).status_code == 403
+
+
+@pytest.mark.asyncio
+async def test_sampling_profile_returns_collapsed_stacks(client):
+    async def busy():
+        await asyncio.sleep(0.02)
+        end = time.perf_counter() + 0.15
+        while time.perf_counter() < end:  # holds the loop without yielding
+            sum(range(1000))
+
+    worker = asyncio.ensure_future(busy())
+    resp = await client.get("/debug/profile", params={"seconds": 0.25, "interval_ms": 2}, headers=ADMIN)
+    await worker
+
+    assert resp.status_code == 200
+    lines = resp.text.splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("busy (" in line for line in lines)
+
+
+@pytest.mark.asyncio
+async def test_cprofile_formats_and_busy(client):
+    resp = await client.get("/debug/profile", params={"seconds": 0.05, "format": "pstats"}, headers=ADMIN)
+    assert resp.status_code == 200
+    assert isinstance(marshal.loads(resp.content), dict)
+
+    resp = await client.get("/debug/profile", params={"seconds": 0.05, "format": "text"}, headers=ADMIN)
+    assert "function calls" in resp.text
+
+    running = asyncio.ensure_future(profiler.sample(0.2))
+    await asyncio.sleep(0.01)
+    resp = await client.get("/debug/profile", params={"seconds": 0.05}, headers=ADMIN)
+    await running
+    assert resp.status_code == 409
+
+
+@pytest.mark.asyncio
+async def test_loop_lag_monitor_sees_blocking_call():
+    monitor = LoopLagMonitor(interval=0.01)
+    monitor.start()
+    await asyncio.sleep(0.03)
+    end = time.perf_counter() + 0.1
+    while time.perf_counter() < end:  # CPU-bound work holding the loop
+        sum(range(1000))
+    await asyncio.sleep(0.03)
+    await monitor.stop()
+
+    summary = monitor.summary()
+    assert summary["samples"] >= 2
+    assert summary["max_ms"] >= 80
+    assert not summary["running"]
+    assert any("test_loop_lag_monitor_sees_blocking_call" in name for name in task_counts())
+
+
+@pytest.mark.asyncio
+async def test_memory_diff_reports_growth():
+    hoard = []
+
+    async def allocate():
+        await asyncio.sleep(0.02)
+        hoard.extend(bytearray(1024) for _ in range(200))
+
+    task = asyncio.ensure_future(allocate())
+    result = await memory.allocation_diff(0.1, limit=5)
+    await task
+
+    assert result["size_diff_total"] >= 200 * 1024
+    assert any("test_diagnostics.py" in frame for stat in result["top"] for frame in stat["location"])
@@ -0,0 +1,111 @@
+import json
+
+import httpx
+import pytest
+
+from config import backend_loader
+from dispatch import discovery
+from dispatch.discovery import ModelDiscovery, parse_models
+
+CONFIG = {
+    "default_backend": "remote",
+    "backends": {
+        "local": {"type": "ollama", "base_url": "http://local"},
+        "remote": {"type": "http", "replicas": ["http://r1", "http://r2"]},
+    },
+    "routing": {"company-gpt": "remote"},
+    "routing_rules": [{"prefix": "gpt-", "backend": "remote"}],
+}
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    served = {
+        "http://local/api/tags": {
+            "models": [{"name": "llama3:latest"}, {"name": "phi3:mini"}, {"name": "gpt-oss:20b"}],
+        },
+        "http://r1/v1/models": {"object": "list", "data": [{"id": "company-gpt"}, {"id": "mixtral"}]},
+        "http://r2/v1/models": {"object": "list", "data": [{"id": "phi3:mini"}, {"id": "qwen2"}]},
+    }
+
+    def handler(request):
+        body = served.get(str(request.url))
+        return httpx.Response(200, json=body) if body is not None else httpx.Response(503)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(discovery.client_pool, "get_client", lambda url: client)
+    monkeypatch.setattr(backend_loader, "_load_raw_config", lambda: CONFIG)
+    monkeypatch.setattr(backend_loader, "_table", None)
+    monkeypatch.setattr(backend_loader, "_discovered", {})
+    return served
+
+
+def test_parse_models():
+    assert parse_models("ollama", {"models": [{"name": "llama3:latest"}, {"model": "phi3:mini"}, "junk"]}) == [
+        "llama3:latest",
+        "phi3:mini",
+        "llama3",
+    ]
+    assert parse_models("http", {"data": [{"id": "a"}, {"id": ""}, {}]}) == ["a"]
+    assert parse_models("http", ["not", "a", "dict"]) == []
+
+
+@pytest.mark.asyncio
+async def test_discovered_models_are_listed_and_routed(upstream):
+    found = await ModelDiscovery(interval=30, ttl=120, timeout=1).refresh()
+
+    assert found == {
+        "local": ["llama3:latest", "phi3:mini", "gpt-oss:20b", "llama3"],
+        "remote": ["company-gpt", "mixtral", "phi3:mini", "qwen2"],
+    }
+    table = backend_loader.get_routing_table()
+    listed = [model["id"] for model in json.loads(table.models_payload)["data"]]
+    assert listed[0] == "company-gpt" and sorted(listed[1:]) == sorted(
+        ["llama3:latest", "phi3:mini", "gpt-oss:20b", "llama3", "mixtral", "qwen2"]
+    )
+
+    resolve = backend_loader.resolve_backend
+    assert resolve("llama3")["name"] == "local"
+    assert resolve("phi3:mini")["name"] == "local"  # first backend in the config wins
+    assert resolve("qwen2")["name"] == "remote"
+    assert resolve("gpt-oss:20b")["name"] == "remote"  # configured rule beats discovery
+    assert resolve("unknown")["name"] == "remote"  # default_backend
+
+
+@pytest.mark.asyncio
+async def test_unreachable_backend_expires_after_ttl(upstream, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(discovery.time, "monotonic", lambda: now[0])
+    finder = ModelDiscovery(interval=10, ttl=60, timeout=1)
+    await finder.refresh()
+
+    del upstream["http://local/api/tags"]
+    now[0] += 30
+    await finder.refresh()
+    assert backend_loader.resolve_backend("llama3")["name"] == "local"
+
+    now[0] += 60
+    found = await finder.refresh()
+    assert "local" not in found
+    assert backend_loader.resolve_backend("llama3")["name"] == "remote"
+    assert "llama3" not in backend_loader.list_models()
+
+
+@pytest.mark.asyncio
+async def test_discovered_models_survive_reload(upstream):
+    await ModelDiscovery(interval=30, ttl=120, timeout=1).refresh()
+    backend_loader.reload_config()
+
+    assert backend_loader.resolve_backend("mixtral")["name"] == "remote"
+    assert "qwen2" in backend_loader.list_models()
+
+
+@pytest.mark.asyncio
+async def test_placeholder_model_replaced_without_config(upstream, monkeypatch):
+    monkeypatch.setattr(backend_loader, "_load_raw_config", lambda: {})
+    monkeypatch.setattr(backend_loader, "_table", None)
+    monkeypatch.setattr(discovery, "backend_urls", lambda backend: ["http://local"])
+    assert backend_loader.list_models() == ["llama3"]
+
+    await ModelDiscovery(interval=30, ttl=120, timeout=1).refresh()
+    assert backend_loader.list_models() == ["llama3:latest", "phi3:mini", "gpt-oss:20b", "llama3"]
@@ -0,0 +1,124 @@
+import httpx
+import pytest
+
+from dispatch import health
+from dispatch.balancer import ReplicaPool
+from dispatch.health import BackendUnavailableError, CircuitBreaker, HealthChecker
+
+
+@pytest.fixture(autouse=True)
+def reset_breakers():
+    health._breakers.clear()
+    yield
+    health._breakers.clear()
+
+
+def test_breaker_opens_after_threshold_and_recovers(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(health.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("http://a", failure_threshold=2, recovery_time=10)
+
+    breaker.record_failure()
+    assert breaker.state == health.CLOSED
+    breaker.record_failure()
+    assert breaker.state == health.OPEN
+    assert not breaker.allow()
+
+    now[0] += 11
+    assert breaker.allow()  # first trial call in half-open
+    assert breaker.state == health.HALF_OPEN
+    assert not breaker.allow()  # only one trial at a time
+
+    breaker.record_success()
+    assert breaker.state == health.CLOSED
+
+
+def test_half_open_failure_reopens(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(health.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("http://a", failure_threshold=1, recovery_time=5)
+    breaker.record_failure()
+    now[0] += 6
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == health.OPEN
+
+
+def test_half_open_trial_without_verdict_frees_slot(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(health.time, "monotonic", lambda: now[0])
+    pool = ReplicaPool(["http://a"], "round_robin", {"failure_threshold": 1, "recovery_time": 5})
+    breaker = pool.replicas[0].breaker
+    breaker.record_failure()
+    now[0] += 6
+
+    lease = pool.acquire()
+    assert breaker.state == health.HALF_OPEN and not breaker.available
+    lease.release(ok=None)  # cancelled hedge / client gone / 4xx
+    assert breaker.available
+
+    pool.acquire().release()
+    assert breaker.state == health.CLOSED
+
+
+def test_stale_half_open_trial_expires(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(health.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker("http://a", failure_threshold=1, recovery_time=5)
+    breaker.record_failure()
+    now[0] += 6
+    assert breaker.allow()  # trial whose lease is never released
+
+    now[0] += 1
+    breaker.probe_succeeded()
+    assert not breaker.available
+    now[0] += 5
+    breaker.probe_succeeded()
+    assert breaker.state == health.HALF_OPEN and breaker.available
+    assert breaker.allow()
+
+
+def test_pool_skips_open_replicas():
+    pool = ReplicaPool(["http://dead", "http://alive"], "round_robin")
+    pool.replicas[0].breaker.trip()
+    assert {pool.acquire().url for _ in range(4)} == {"http://alive"}
+
+    pool.replicas[1].breaker.trip()
+    with pytest.raises(BackendUnavailableError):
+        pool.acquire()
+
+
+def test_is_backend_failure_classification():
+    class Upstream(Exception):
+        def __init__(self, status_code):
+            self.status_code = status_code
+
+    assert health.is_backend_failure(httpx.ConnectError("down"))
+    assert health.is_backend_failure(Upstream(503))
+    assert not health.is_backend_failure(Upstream(404))
+
+
+@pytest.mark.asyncio
+async def test_health_checker_trips_failing_replica(monkeypatch):
+    def handler(request):
+        if request.url.host == "down":
+            raise httpx.ConnectError("refused", request=request)
+        assert request.url.path == "/api/tags"
+        return httpx.Response(200, json={"models": []})
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(health.client_pool, "get_client", lambda url: client)
+
+    checker = HealthChecker(
+        {"ollama": {"type": "ollama", "replicas": ["http://up:11434", "http://down:11434"]}},
+        interval=1,
+        timeout=1,
+    )
+    health.get_breaker("http://down:11434", {"failure_threshold": 2})
+    await checker.check_once()
+    # A single failed probe (e.g. a slow model load) does not open the breaker.
+    assert health.breaker_states() == {"http://down:11434": "closed", "http://up:11434": "closed"}
+
+    await checker.check_once()
+    assert health.breaker_states() == {"http://up:11434": "closed", "http://down:11434": "open"}
+    await client.aclose()
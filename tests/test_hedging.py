@@ -0,0 +1,120 @@
+import asyncio
+
+import pytest
+
+from dispatch.hedging import RetryBudget, run_with_failover
+
+
+class Upstream5xx(Exception):
+    status_code = 503
+
+
+def _launcher(behaviours):
+    """Return a launch() that starts the next behaviour coroutine, if any."""
+
+    started = []
+
+    def launch():
+        if len(started) == len(behaviours):
+            return None
+        behaviour = behaviours[len(started)]
+        started.append(behaviour)
+        return behaviour()
+
+    return launch, started
+
+
+def _retryable(exc):
+    return isinstance(exc, Upstream5xx)
+
+
+@pytest.mark.asyncio
+async def test_retry_falls_through_to_next_target():
+    async def failing():
+        raise Upstream5xx()
+
+    async def healthy():
+        return "ok"
+
+    launch, started = _launcher([failing, healthy])
+    result = await run_with_failover(
+        launch, max_attempts=3, hedge_delay=None, retryable=_retryable, budget=RetryBudget()
+    )
+    assert result == "ok"
+    assert len(started) == 2
+
+
+@pytest.mark.asyncio
+async def test_non_retryable_error_is_raised_immediately():
+    async def bad_request():
+        raise ValueError("400")
+
+    async def healthy():
+        return "ok"
+
+    launch, started = _launcher([bad_request, healthy])
+    with pytest.raises(ValueError):
+        await run_with_failover(launch, max_attempts=3, hedge_delay=None, retryable=_retryable, budget=RetryBudget())
+    assert len(started) == 1
+
+
+@pytest.mark.asyncio
+async def test_empty_budget_prevents_retries():
+    async def failing():
+        raise Upstream5xx()
+
+    budget = RetryBudget(ratio=0.0, min_per_sec=0.0, max_tokens=0.0)
+    launch, started = _launcher([failing, failing])
+    with pytest.raises(Upstream5xx):
+        await run_with_failover(launch, max_attempts=3, hedge_delay=None, retryable=_retryable, budget=budget)
+    assert len(started) == 1
+
+
+@pytest.mark.asyncio
+async def test_hedge_wins_and_slow_attempt_is_cancelled():
+    cancelled = asyncio.Event()
+
+    async def slow():
+        try:
+            await asyncio.sleep(5)
+            return "slow"
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+
+    async def fast():
+        return "fast"
+
+    launch, started = _launcher([slow, fast])
+    result = await run_with_failover(
+        launch, max_attempts=2, hedge_delay=0.01, retryable=_retryable, budget=RetryBudget()
+    )
+    assert result == "fast"
+    assert len(started) == 2
+    assert cancelled.is_set()
+
+
+@pytest.mark.asyncio
+async def test_loser_that_completes_anyway_is_discarded():
+    discarded = []
+
+    async def stubborn():
+        # Finishes with a result even though it gets cancelled (e.g. a stream
+        # that already produced its first chunk).
+        try:
+            await asyncio.sleep(5)
+        except asyncio.CancelledError:
+            return "late"
+
+    async def fast():
+        return "fast"
+
+    async def discard(result):
+        discarded.append(result)
+
+    launch, _ = _launcher([stubborn, fast])
+    result = await run_with_failover(
+        launch, max_attempts=2, hedge_delay=0.01, retryable=_retryable, discard=discard, budget=RetryBudget()
+    )
+    assert result == "fast"
+    assert discarded == ["late"]
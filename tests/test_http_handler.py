@@ -9,8 +9,9 @@ from handlers import http_handler
 
 
 class DummyStreamContext:
-    def __init__(self, lines):
+    def __init__(self, lines, sep=b"\n\n"):
         self._lines = lines
+        self._sep = sep
         self.status_code = 200
         self.headers = {}
 
@@ -20,9 +21,9 @@ class DummyStreamContext:
     async def __aexit__(self, exc_type, exc, tb):
         return False
 
-    async def aiter_lines(self):
+    async def aiter_bytes(self):
         for ln in self._lines:
-            yield ln
+            yield ln.encode() + self._sep
 
 
 @pytest.mark.asyncio
@@ -58,13 +59,19 @@ async def test_http_handler_non_stream(monkeypatch):
 
 
 @pytest.mark.asyncio
-async def test_http_handler_stream(monkeypatch):
-    """handle_chat_completion should return async generator when stream flag true."""
+@pytest.mark.parametrize("sep", [b"\n\n", b"\n"])
+async def test_http_handler_stream(monkeypatch, sep):
+    """handle_chat_completion should return async generator when stream flag true.
 
-    lines = ["data: {\"delta\":\"h\"}", "data: {\"delta\":\"i\"}"]
+    Upstreams that end ``data:`` lines with a single newline are relayed
+    event by event too.
+    """
 
-    def fake_stream(self, method, url, json):  # noqa: D401  pylint: disable=unused-argument
-        return DummyStreamContext(lines)
+    lines = ["data: {\"delta\":\"h\"}", "data: {\"delta\":\"i\"}", "data: [DONE]"]
+
+    def fake_stream(self, method, url, json, timeout):  # noqa: D401  pylint: disable=unused-argument
+        assert timeout.read is None  # no read timeout between stream chunks
+        return DummyStreamContext(lines, sep)
 
     monkeypatch.setattr(httpx.AsyncClient, "stream", fake_stream, raising=True)
 
@@ -80,5 +87,5 @@ async def test_http_handler_stream(monkeypatch):
     assert hasattr(gen, "__aiter__")
     collected = []
     async for chunk in gen:  # type: ignore[attr-defined]
-        collected.append(chunk.strip())
-    assert collected == [ln + "\n\n".strip() for ln in lines] 
\ No newline at end of file
+        collected.extend(event for event in chunk.decode().split("\n\n") if event)
+    assert collected == lines 
\ No newline at end of file
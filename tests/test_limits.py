@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from dispatch import limits
+from dispatch.limits import AdmissionRejected, ConcurrencyLimiter
+
+
+@pytest.mark.asyncio
+async def test_waiters_are_served_in_priority_then_fifo_order():
+    limiter = ConcurrencyLimiter("test", limit=1, max_queue=10, queue_timeout=1)
+    await limiter.acquire()
+    order = []
+
+    async def worker(name, priority):
+        await limiter.acquire(priority)
+        order.append(name)
+        limiter.release()
+
+    tasks = [
+        asyncio.ensure_future(worker("low-1", 0)),
+        asyncio.ensure_future(worker("low-2", 0)),
+        asyncio.ensure_future(worker("high", 5)),
+    ]
+    await asyncio.sleep(0)
+    assert limiter.queued == 3
+
+    limiter.release()
+    await asyncio.gather(*tasks)
+    assert order == ["high", "low-1", "low-2"]
+    assert limiter.in_use == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_rejects_immediately():
+    limiter = ConcurrencyLimiter("test", limit=1, max_queue=0, queue_timeout=1)
+    await limiter.acquire()
+    with pytest.raises(AdmissionRejected) as excinfo:
+        await limiter.acquire()
+    assert excinfo.value.reason == "queue_full"
+
+
+@pytest.mark.asyncio
+async def test_queue_timeout_rejects_and_frees_queue():
+    limiter = ConcurrencyLimiter("test", limit=1, max_queue=5, queue_timeout=0.01)
+    await limiter.acquire()
+    with pytest.raises(AdmissionRejected) as excinfo:
+        await limiter.acquire()
+    assert excinfo.value.reason == "queue_timeout"
+    assert limits.retry_after_header(excinfo.value) == "1"
+    assert limiter.queued == 0
+
+    limiter.release()
+    await limiter.acquire()  # slot is usable again
+    assert limiter.in_use == 1
+
+
+@pytest.mark.asyncio
+async def test_admit_releases_held_slots_on_rejection():
+    model = ConcurrencyLimiter("model", limit=1, max_queue=0, queue_timeout=1)
+    backend = ConcurrencyLimiter("backend", limit=1, max_queue=0, queue_timeout=1)
+    await backend.acquire()
+
+    with pytest.raises(AdmissionRejected):
+        await limits.admit([model, backend])
+    assert model.in_use == 0
+
+
+def test_limiters_for_uses_backend_and_model_config(monkeypatch):
+    limits._limiters.clear()
+    monkeypatch.setattr(limits, "get_model_limits", lambda: {"big": {"max_concurrency": 1}})
+    backend = {"name": "ollama", "type": "ollama", "max_concurrency": 4, "max_queue": 2}
+
+    names = [l.name for l in limits.limiters_for(backend, "big")]
+    assert names == ["model:big", "backend:ollama"]
+    assert limits.limiters_for(backend, "small")[0].limit == 4
+    assert limits.limiters_for({"type": "ollama"}, "small") == []
+    limits._limiters.clear()
+
+
+@pytest.mark.asyncio
+async def test_failover_to_a_fallback_takes_its_slot_or_skips_it(monkeypatch):
+    import router as router_module
+    from config.backend_loader import RoutingTable
+    from handlers.http_handler import HTTPBackendError
+    from schemas.chat import ChatCompletionRequest
+
+    limits._limiters.clear()
+    table = RoutingTable(
+        {
+            "backends": {
+                "primary": {"type": "http", "base_url": "http://fallback-limit-primary", "fallbacks": ["local"]},
+                "local": {
+                    "type": "ollama",
+                    "base_url": "http://fallback-limit-local",
+                    "max_concurrency": 1,
+                    "max_queue": 5,
+                    "trusted": True,
+                },
+            }
+        }
+    )
+    seen = []
+
+    async def failing(body, base_url=None):
+        raise HTTPBackendError("boom", status_code=500)
+
+    async def local(body, base_url=None):
+        seen.append(limits._limiters["backend:local"].in_use)
+        return {"ok": True}
+
+    monkeypatch.setattr(router_module, "http_handle", failing)
+    monkeypatch.setattr(router_module, "ollama_handle", local)
+    body = ChatCompletionRequest(model="m", messages=[{"role": "user", "content": "hi"}])
+
+    assert await router_module._dispatch(body, table.backends["primary"]) == {"ok": True}
+    slot = limits._limiters["backend:local"]
+    assert seen == [1] and slot.in_use == 0
+
+    # A full fallback is skipped rather than overloaded (or queued for).
+    await slot.acquire()
+    with pytest.raises(HTTPBackendError):
+        await router_module._dispatch(body, table.backends["primary"])
+    assert seen == [1] and slot.in_use == 1 and slot.queued == 0
+    slot.release()
+    limits._limiters.clear()
+
+
+@pytest.mark.asyncio
+async def test_fallback_slot_is_held_until_the_stream_ends(monkeypatch):
+    import router as router_module
+    from config.backend_loader import RoutingTable
+    from handlers.http_handler import HTTPBackendError
+    from schemas.chat import ChatCompletionRequest
+
+    limits._limiters.clear()
+    table = RoutingTable(
+        {
+            "backends": {
+                "primary": {"type": "http", "base_url": "http://stream-limit-primary", "fallbacks": ["local"]},
+                "local": {"type": "ollama", "base_url": "http://stream-limit-local", "max_concurrency": 2},
+            }
+        }
+    )
+
+    async def failing(body, base_url=None):
+        raise HTTPBackendError("boom", status_code=503)
+
+    async def chunks():
+        yield "a"
+        yield "b"
+
+    async def local(body, base_url=None):
+        return chunks()
+
+    monkeypatch.setattr(router_module, "http_handle", failing)
+    monkeypatch.setattr(router_module, "ollama_handle", local)
+    body = ChatCompletionRequest(model="m", messages=[{"role": "user", "content": "hi"}], stream=True)
+
+    stream = await router_module._dispatch(body, table.backends["primary"])
+    slot = limits._limiters["backend:local"]
+    assert slot.in_use == 1
+    assert [chunk async for chunk in stream] == ["a", "b"]
+    assert slot.in_use == 0
+
+    stream = await router_module._dispatch(body, table.backends["primary"])
+    await stream.aclose()
+    assert slot.in_use == 0
+    limits._limiters.clear()
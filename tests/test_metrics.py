@@ -26,6 +26,7 @@ async def test_healthz(client, monkeypatch):
     resp = await client.get("/healthz")
     assert resp.status_code == 200
     assert resp.json()["status"] == "ok"
+    assert resp.headers["x-request-id"]
 
 
 @pytest.mark.skipif(not PROM_AVAILABLE, reason="prometheus_client not installed")
@@ -40,4 +41,68 @@ async def test_metrics(client, monkeypatch):
     await client.get("/healthz")
     resp = await client.get("/metrics")
     assert resp.status_code == 200
-    assert "genai_requests_total" in resp.text 
\ No newline at end of file
+    assert "genai_requests_total" in resp.text 
+
+
+@pytest.mark.skipif(not PROM_AVAILABLE, reason="prometheus_client not installed")
+@pytest.mark.asyncio
+async def test_unknown_paths_share_one_label(client, monkeypatch):
+    monkeypatch.delenv("GENAI_API_KEYS", raising=False)
+    monkeypatch.delenv("GENAI_RATE_LIMIT", raising=False)
+    get_settings.cache_clear()
+    for i in range(3):
+        await client.get(f"/no-such-path-{i}")
+    text = (await client.get("/metrics")).text
+    assert "no-such-path" not in text
+    assert 'path="unmatched"' in text
+    assert 'path="/healthz"' in text or 'path="/metrics"' in text
+
+
+@pytest.mark.skipif(not PROM_AVAILABLE, reason="prometheus_client not installed")
+@pytest.mark.asyncio
+async def test_backend_stream_metrics(monkeypatch):
+    from prometheus_client import REGISTRY
+
+    from dispatch import backend_metrics
+
+    async def upstream():
+        yield b'data: {"choices":[{"delta":{"content":"a"}}]}\n\n'
+        yield b'data: {"choices":[],"usage":{"prompt_tokens":3,"completion_tokens":5,"total_tokens":8}}\n\n'
+
+    labels = {"backend": "metrics-test", "model": "m-stream"}
+    attempt = backend_metrics.Attempt({"name": "metrics-test"}, "m-stream")
+    assert REGISTRY.get_sample_value("genai_backend_in_flight", labels) == 1
+    chunks = [chunk async for chunk in attempt.track_stream(upstream())]
+
+    assert len(chunks) == 2
+    assert REGISTRY.get_sample_value("genai_backend_in_flight", labels) == 0
+    assert REGISTRY.get_sample_value("genai_backend_time_to_first_token_seconds_count", labels) == 1
+    assert REGISTRY.get_sample_value("genai_backend_inter_token_seconds_count", labels) == 1
+    assert REGISTRY.get_sample_value("genai_backend_tokens_total", {**labels, "type": "completion"}) == 5
+    assert REGISTRY.get_sample_value(
+        "genai_backend_request_duration_seconds_count", {**labels, "stream": "true"}
+    ) == 1
+
+
+@pytest.mark.skipif(not PROM_AVAILABLE, reason="prometheus_client not installed")
+def test_backend_error_classes_and_model_cap(monkeypatch):
+    import httpx
+    from prometheus_client import REGISTRY
+
+    from dispatch import backend_metrics
+    from handlers.http_handler import HTTPBackendError
+
+    attempt = backend_metrics.Attempt({"name": "metrics-test"}, "m-error")
+    attempt.finish(False, HTTPBackendError("boom", 503))
+    attempt.finish(False, HTTPBackendError("again", 503))  # idempotent
+    labels = {"backend": "metrics-test", "model": "m-error", "error": "http_5xx"}
+    assert REGISTRY.get_sample_value("genai_backend_errors_total", labels) == 1
+    assert backend_metrics.error_class(httpx.ReadTimeout("slow")) == "timeout"
+
+    monkeypatch.setenv("GENAI_METRICS_MAX_MODELS", "0")
+    get_settings.cache_clear()
+    try:
+        assert backend_metrics.model_label("never-seen-model") == "other"
+        assert backend_metrics.model_label("m-error") == "m-error"  # already seen
+    finally:
+        get_settings.cache_clear()
@@ -0,0 +1,34 @@
+import asyncio
+import inspect
+import os
+
+import pytest
+
+from benchmarks import micro
+
+
+@pytest.mark.parametrize("name", sorted(micro.BENCHMARKS))
+def test_benchmark_runs(name):
+    # Keeps the harness in step with the hot-path functions it calls.
+    fn = micro.BENCHMARKS[name].setup()
+    with micro._env(GENAI_API_KEYS="bench-key", GENAI_RATE_LIMIT="100000000/sec"):
+        result = fn()
+        if inspect.isawaitable(result):
+            asyncio.run(result)
+
+
+def test_compare_uses_reference_normalised_times():
+    baseline = {"benchmarks": {"resolve_backend": 50.0}, "relative": {"resolve_backend": 0.5}}
+    # Twice as slow on a machine that is twice as slow: no change.
+    same = micro.compare({"benchmarks": {"resolve_backend": 100.0}, "relative": {"resolve_backend": 0.5}}, baseline)
+    assert same[0]["change"] == 0.0 and not same[0]["regressed"]
+
+    slower = micro.compare({"benchmarks": {"resolve_backend": 80.0}, "relative": {"resolve_backend": 0.8}}, baseline)
+    assert slower[0]["change"] == pytest.approx(0.6)
+    assert slower[0]["regressed"]
+
+
+@pytest.mark.skipif(not os.getenv("GENAI_MICROBENCH"), reason="set GENAI_MICROBENCH=1 to run timing checks")
+def test_no_regressions_against_baseline():
+    regressed = micro.check()
+    assert not regressed, regressed
@@ -0,0 +1,43 @@
+import json
+
+import pytest
+
+from handlers.ollama_handler import _ChunkTranscoder, _ollama_chunk_to_openai
+
+
+def _full(line: bytes) -> bytes:
+    chunk = _ollama_chunk_to_openai(json.loads(line))
+    return b"data: " + json.dumps(chunk, separators=(",", ":")).encode() + b"\n\n"
+
+
+def _token_line(content: str, model: str = "llama3") -> bytes:
+    # Same layout Ollama (Go encoding/json) produces: compact, UTF-8, <>& escaped.
+    encoded = json.dumps(content, ensure_ascii=False).replace("<", "\\u003c")
+    return (
+        '{"model":"%s","created_at":"2024-05-01T10:00:00.123Z",'
+        '"message":{"role":"assistant","content":%s},"done":false}' % (model, encoded)
+    ).encode()
+
+
+@pytest.mark.parametrize("content", ["Hello", " world", 'say "hi"\n', "<b>", "héllo ✓ 🚀", "tab\tend", ""])
+def test_fast_path_matches_full_path(content):
+    line = _token_line(content)
+    assert _ChunkTranscoder().encode(line) == _full(line)
+
+
+def test_model_change_rebuilds_envelope():
+    transcoder = _ChunkTranscoder()
+    transcoder.encode(_token_line("a", "llama3"))
+    line = _token_line("b", "mistral")
+    assert transcoder.encode(line) == _full(line)
+
+
+def test_unusual_chunks_use_full_path():
+    done = (
+        b'{"model":"llama3","created_at":"2024-05-01T10:00:01Z","message":{"role":"assistant","content":""},'
+        b'"done_reason":"stop","done":true,"total_duration":1,"eval_count":3}'
+    )
+    transcoder = _ChunkTranscoder()
+    assert transcoder.encode(done) == _full(done)
+    assert json.loads(transcoder.encode(done)[6:])["choices"][0]["finish_reason"] == "stop"
+    assert transcoder.encode(b"not json") == b"data: not json\n\n"
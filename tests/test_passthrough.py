@@ -0,0 +1,124 @@
+import importlib
+import json
+import sys
+
+import httpx
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from config.settings import get_settings
+from dispatch.passthrough import RawChatRequest, peek
+from handlers import client_pool
+
+
+def test_peek_reads_top_level_fields_only():
+    body = json.dumps(
+        {
+            "messages": [{"role": "user", "content": 'say "model": "evil", "stream": true'}],
+            "model": 'gpt-"4"',
+            "stream": False,
+        }
+    ).encode()
+    assert peek(body) == ('gpt-"4"', False)
+    assert peek(b'{"model":"m","stream":true,"messages":[]}') == ("m", True)
+    assert peek(b'{"messages":[]}') is None
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        b'{"model":"allowed","messages":[],"model":"forbidden"}',
+        b'{"model":"m","stream":false,"messages":[],"stream":true}',
+        b'{"model":"allowed","mod\\u0065l":"forbidden"}',
+        b'{"model":"m","str\\u0065am":true}',
+        b'{"model":1,"metadata":{"model":"m"}}',
+    ],
+)
+def test_peek_leaves_ambiguous_bodies_to_the_parser(body):
+    # JSON parsers (pydantic, the backend) take the last duplicate key.
+    assert peek(body) is None
+
+
+def test_duplicate_model_is_routed_and_checked_as_parsed(monkeypatch):
+    import router as router_module
+
+    backend = {"name": "proxy", "type": "http", "base_url": "http://proxy", "passthrough": True}
+    monkeypatch.setattr(router_module, "resolve_backend", lambda model: backend)
+    body = router_module._read_request(b'{"model":"allowed","messages":[],"model":"forbidden"}')
+    assert not isinstance(body, RawChatRequest)
+    assert body.model == "forbidden"
+
+
+def test_raw_request_parses_lazily_for_fallbacks():
+    raw = RawChatRequest(b'{"model":"m","messages":[{"role":"user","content":"hi"}]}', "m", False)
+    assert raw.parsed().messages[0].content == "hi"
+    assert raw.parsed() is raw.parsed()
+
+
+@pytest.mark.asyncio
+async def test_invalid_body_on_parsing_fallback_releases_the_lease():
+    import router as router_module
+    from dispatch.balancer import get_pool
+
+    fallback = {"name": "local", "type": "ollama", "base_url": "http://invalid-body-fallback"}
+    pool = get_pool(fallback)
+    raw = RawChatRequest(b'{"model":"m","messages":"not a list"}', "m", False)
+
+    for _ in range(3):
+        with pytest.raises(ValueError):
+            await router_module._attempt(raw, fallback, pool.acquire())
+    assert pool.replicas[0].in_flight == 0
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    import router as router_module
+
+    backend = {"name": "proxy", "type": "http", "base_url": "http://proxy", "passthrough": True}
+    monkeypatch.setattr(router_module, "resolve_backend", lambda model: backend)
+    monkeypatch.delenv("GENAI_API_KEYS", raising=False)
+    monkeypatch.delenv("GENAI_RATE_LIMIT", raising=False)
+    get_settings.cache_clear()
+    app_mod = importlib.reload(sys.modules["main"]) if "main" in sys.modules else importlib.import_module("main")
+    async with AsyncClient(transport=ASGITransport(app=app_mod.app), base_url="http://test") as ac:
+        yield ac
+
+
+def _upstream(monkeypatch, seen, response):
+    def handler(request: httpx.Request) -> httpx.Response:
+        seen.append(request.content)
+        return response
+
+    upstream = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(client_pool, "get_client", lambda base_url: upstream)
+
+
+@pytest.mark.asyncio
+async def test_passthrough_forwards_and_relays_bytes_unchanged(monkeypatch, client):
+    # Unusual spacing and an extra field must survive untouched.
+    request_body = b'{ "model" : "proxy-model", "messages": [{"role":"user","content":"hi"}], "seed": 7 }'
+    upstream_body = b'{"id":"x","object":"chat.completion","extra":{"kept":true}}'
+    seen = []
+    _upstream(monkeypatch, seen, httpx.Response(200, content=upstream_body))
+
+    resp = await client.post(
+        "/v1/chat/completions", content=request_body, headers={"content-type": "application/json"}
+    )
+    assert resp.status_code == 200
+    assert seen == [request_body]
+    assert resp.content == upstream_body
+
+
+@pytest.mark.asyncio
+async def test_passthrough_relays_sse_stream(monkeypatch, client):
+    sse = b'data: {"choices":[{"delta":{"content":"a"}}]}\n\ndata: [DONE]\n\n'
+    seen = []
+    _upstream(monkeypatch, seen, httpx.Response(200, content=sse, headers={"content-type": "text/event-stream"}))
+
+    request_body = b'{"model":"proxy-model","stream":true,"messages":[]}'
+    resp = await client.post("/v1/chat/completions", content=request_body)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    assert resp.content == sse
+    assert seen == [request_body]
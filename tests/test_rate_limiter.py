@@ -0,0 +1,40 @@
+import pytest
+
+from config.settings import Settings
+from middleware.ratelimit_middleware import RateLimiter
+
+
+def test_parsed_rate_limit_supports_multiple_limits():
+    assert Settings(rate_limit="60/min").parsed_rate_limit == [(60, 60)]
+    assert Settings(rate_limit="10/sec, 1000/hour").parsed_rate_limit == [(10, 1), (1000, 3600)]
+    assert Settings(rate_limit="2/5,bogus").parsed_rate_limit == [(2, 5)]
+    assert Settings(rate_limit="").parsed_rate_limit is None
+
+
+def test_burst_then_steady_refill():
+    limiter = RateLimiter([(2, 10)])
+    assert limiter.hit("a", now=0.0) == 0
+    assert limiter.hit("a", now=0.0) == 0
+    assert limiter.hit("a", now=0.0) == pytest.approx(5.0)
+    assert limiter.hit("b", now=0.0) == 0  # per-client buckets
+    assert limiter.hit("a", now=5.0) == 0  # one token back after 5s
+
+
+def test_all_limits_must_pass():
+    limiter = RateLimiter([(3, 1), (4, 100)])
+    for i in range(3):
+        assert limiter.hit("a", now=float(i)) == 0
+    assert limiter.hit("a", now=3.0) == 0
+    # Per-second limit is fine, the long window is exhausted.
+    assert limiter.hit("a", now=4.0) == pytest.approx(21.0)
+
+
+def test_client_table_is_bounded():
+    limiter = RateLimiter([(1, 60)], max_clients=3)
+    for i in range(10):
+        limiter.hit(f"client-{i}", now=0.0)
+    assert len(limiter) == 3
+
+    # Idle clients whose bucket has refilled are dropped.
+    limiter.hit("late", now=120.0)
+    assert len(limiter) == 1
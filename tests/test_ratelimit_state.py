@@ -0,0 +1,180 @@
+import asyncio
+import multiprocessing
+
+import pytest
+
+from middleware.ratelimit_state import (
+    RateLimiter,
+    RedisRateLimiter,
+    _RedisConnection,
+    SharedMemoryRateLimiter,
+    make_rate_limiter,
+)
+
+
+def _hammer(path, hits, results):
+    limiter = SharedMemoryRateLimiter([(100, 3600)], max_clients=64, path=path)
+    results.put(sum(1 for _ in range(hits) if limiter.hit("shared-key") == 0))
+    limiter.close()
+
+
+def test_shared_memory_limit_is_enforced_across_processes(tmp_path):
+    ctx = multiprocessing.get_context("fork")
+    results = ctx.Queue()
+    workers = [ctx.Process(target=_hammer, args=(str(tmp_path / "rl"), 60, results)) for _ in range(4)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join(10)
+
+    assert sum(results.get(timeout=1) for _ in workers) == 100
+
+
+def test_shared_memory_table_is_shared_and_bounded(tmp_path):
+    first = SharedMemoryRateLimiter([(2, 10)], max_clients=8, path=str(tmp_path / "rl"))
+    second = SharedMemoryRateLimiter([(2, 10)], max_clients=8, path=str(tmp_path / "rl"))
+    assert first.path == second.path
+
+    assert first.hit("a", now=100.0) == 0
+    assert second.hit("a", now=100.0) == 0
+    assert first.hit("a", now=100.0) == pytest.approx(5.0)
+
+    # One bucket of eight slots: new clients recycle the stalest slot.
+    for i in range(20):
+        assert second.hit(f"client-{i}", now=100.0) == 0
+    first.close()
+    second.close()
+
+
+class _StandInRedis:
+    """Tiny Redis-protocol server implementing the commands the limiter uses."""
+
+    def __init__(self, hold=0):
+        self.data = {}
+        self.commands = []
+        # Answer nothing until this many commands arrived (then answer all).
+        self.hold = hold
+
+    async def handle(self, reader, writer):
+        held = []
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            args = []
+            for _ in range(int(line[1:])):
+                length = int((await reader.readline())[1:])
+                args.append((await reader.readexactly(length + 2))[:-2].decode())
+            self.commands.append(args[0])
+            held.append(self.reply(args))
+            if len(self.commands) >= self.hold:
+                writer.write(b"".join(held))
+                held.clear()
+                await writer.drain()
+        writer.close()
+
+    def reply(self, args):
+        command, key = args[0].upper(), args[1] if len(args) > 1 else None
+        if command in ("INCR", "DECR"):
+            self.data[key] = int(self.data.get(key, 0)) + (1 if command == "INCR" else -1)
+            return b":%d\r\n" % self.data[key]
+        if command == "PEXPIRE":
+            return b":1\r\n"
+        if command == "GET":
+            if key not in self.data:
+                return b"$-1\r\n"
+            value = str(self.data[key]).encode()
+            return b"$%d\r\n%s\r\n" % (len(value), value)
+        if command in ("SELECT", "AUTH"):
+            return b"+OK\r\n"
+        return b"-ERR unknown command\r\n"
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_shares_counts_between_instances():
+    server = _StandInRedis()
+    srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+    url = f"redis://127.0.0.1:{port}/2"
+
+    first = make_rate_limiter([(3, 60)], url)
+    second = RedisRateLimiter([(3, 60)], url)
+    now = 600.0  # start of a window, previous window empty
+    assert await first.hit("k", now) == 0
+    assert await second.hit("k", now) == 0
+    assert await first.hit("k", now) == 0
+    assert await second.hit("k", now) == pytest.approx(60.0)
+    assert server.commands[0] == "SELECT"
+    assert server.data["genai:rl:k:60:10"] == 3  # rejected hit was undone
+
+    # Half-way through the next window half of the previous count remains.
+    assert await first.hit("k", now + 90) == 0
+    assert await first.hit("k", now + 90) == pytest.approx(10.0)
+
+    first.close()
+    second.close()
+    srv.close()
+    await srv.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_checks_do_not_wait_for_each_other():
+    # The server only answers once all ten checks sent their commands, which
+    # a connection serving one check at a time would never get to.
+    server = _StandInRedis(hold=30)
+    srv = await asyncio.start_server(server.handle, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+    limiter = RedisRateLimiter([(3, 60)], f"redis://127.0.0.1:{port}")
+
+    results = await asyncio.gather(*(limiter.hit("k", 600.0) for _ in range(10)))
+    assert sorted(results)[:3] == [0, 0, 0]
+    assert all(retry > 0 for retry in sorted(results)[3:])
+    assert server.data["genai:rl:k:60:10"] == 3
+
+    limiter.close()
+    srv.close()
+    await srv.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_redis_hang_up_ends_the_reader_quietly(monkeypatch):
+    async def hang_up_mid_reply(reader, writer):
+        await reader.readline()
+        writer.write(b"$5\r\nab")  # the connection drops inside a bulk reply
+        await writer.drain()
+        writer.close()
+
+    errors = []
+    read_replies = _RedisConnection._read_replies
+
+    async def watched(self, reader, writer):
+        try:
+            await read_replies(self, reader, writer)
+        except BaseException as exc:
+            errors.append(exc)
+            raise
+
+    monkeypatch.setattr(_RedisConnection, "_read_replies", watched)
+    srv = await asyncio.start_server(hang_up_mid_reply, "127.0.0.1", 0)
+    port = srv.sockets[0].getsockname()[1]
+    limiter = RedisRateLimiter([(1, 60)], f"redis://127.0.0.1:{port}")
+
+    assert await limiter.hit("k") == 0  # fails open
+    await asyncio.sleep(0.01)
+    assert errors == []
+
+    limiter.close()
+    srv.close()
+    await srv.wait_closed()
+
+
+@pytest.mark.asyncio
+async def test_redis_limiter_fails_open_when_unreachable():
+    limiter = RedisRateLimiter([(1, 60)], "redis://127.0.0.1:1")
+    assert await limiter.hit("k") == 0
+
+
+def test_make_rate_limiter_rejects_unknown_store():
+    assert isinstance(make_rate_limiter([(1, 1)]), RateLimiter)
+    with pytest.raises(ValueError):
+        make_rate_limiter([(1, 1)], "memcached://x")
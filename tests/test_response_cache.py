@@ -0,0 +1,105 @@
+import importlib
+import sys
+
+import pytest
+import pytest_asyncio
+from httpx import ASGITransport, AsyncClient
+
+from config.settings import get_settings
+from dispatch import cache as cache_module
+from dispatch.cache import ResponseCache, is_cacheable, request_key
+from schemas.chat import ChatCompletionRequest
+
+
+def _body(**overrides):
+    data = {"model": "llama3", "messages": [{"role": "user", "content": "hi"}], "temperature": 0}
+    data.update(overrides)
+    return ChatCompletionRequest.model_validate(data)
+
+
+def test_request_key_ignores_stream_flag():
+    assert request_key(_body(stream=True)) == request_key(_body(stream=False))
+    assert request_key(_body()) != request_key(_body(temperature=0.5))
+
+
+def test_is_cacheable_rules():
+    assert is_cacheable(_body(), {})
+    assert not is_cacheable(_body(temperature=0.7), {})
+    assert is_cacheable(_body(temperature=0.7), {"x-genai-cache": "force"})
+    assert not is_cacheable(_body(), {"x-genai-cache": "bypass"})
+    assert not is_cacheable(_body(), {"cache-control": "no-cache"})
+    assert not is_cacheable(_body(stream=True), {})
+
+
+def test_lru_eviction_under_byte_budget():
+    response = {"content": "x" * 40}
+    entry_size = len('{"content":"' + "x" * 40 + '"}')
+    cache = ResponseCache(max_bytes=entry_size * 2, default_ttl=60)
+
+    cache.put("a", "m", response)
+    cache.put("b", "m", response)
+    assert cache.get("a") == response  # "a" becomes most recently used
+    cache.put("c", "m", response)
+
+    assert cache.get("b") is None
+    assert cache.get("a") == response
+    assert cache.get("c") == response
+    assert cache.size_bytes <= cache.max_bytes
+
+
+def test_per_model_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = ResponseCache(max_bytes=1024, default_ttl=60, model_ttls={"short": 1})
+
+    cache.put("k1", "short", {"v": 1})
+    cache.put("k2", "long", {"v": 2})
+    now[0] += 2
+
+    assert cache.get("k1") is None
+    assert cache.get("k2") == {"v": 2}
+
+
+@pytest_asyncio.fixture
+async def client(monkeypatch):
+    monkeypatch.delenv("GENAI_API_KEYS", raising=False)
+    monkeypatch.delenv("GENAI_RATE_LIMIT", raising=False)
+    get_settings.cache_clear()
+    cache_module.get_response_cache.cache_clear()
+    app_mod = importlib.reload(sys.modules["main"]) if "main" in sys.modules else importlib.import_module("main")
+    transport = ASGITransport(app=app_mod.app)
+    async with AsyncClient(transport=transport, base_url="http://test") as ac:
+        yield ac
+    cache_module.get_response_cache.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_router_serves_repeated_prompt_from_cache(monkeypatch, client):
+    import router as router_module
+
+    calls = []
+
+    async def fake_http(body, base_url):
+        calls.append(body)
+        return {
+            "id": "chatcmpl-test",
+            "object": "chat.completion",
+            "model": body.model,
+            "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": "ok"}, "finish_reason": "stop"}
+            ],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    monkeypatch.setattr(router_module, "http_handle", fake_http)
+
+    payload = {"model": "company-gpt", "temperature": 0, "messages": [{"role": "user", "content": "classify"}]}
+    first = await client.post("/v1/chat/completions", json=payload)
+    second = await client.post("/v1/chat/completions", json=payload)
+    bypass = await client.post("/v1/chat/completions", json=payload, headers={"X-GenAI-Cache": "bypass"})
+
+    assert first.headers["x-genai-cache"] == "miss"
+    assert second.headers["x-genai-cache"] == "hit"
+    assert second.json() == first.json()
+    assert "x-genai-cache" not in bypass.headers
+    assert len(calls) == 2
@@ -19,11 +19,9 @@ async def client():
 
 
 @pytest.fixture(autouse=True)
-def clear_cache():
-    # Ensure backend loader cache cleared before each test
-    backend_loader._load_raw_config.cache_clear()
-    yield
-    backend_loader._load_raw_config.cache_clear()
+def clear_cache(monkeypatch):
+    # Ensure each test compiles the routing table from backends.yaml
+    monkeypatch.setattr(backend_loader, "_table", None)
 
 
 async def _dummy_response(request_body):
@@ -46,7 +44,8 @@ async def _dummy_response(request_body):
 async def test_chat_completion_ollama(monkeypatch, client):
     # Mock resolution to ollama backend
     monkeypatch.setattr(backend_loader, "resolve_backend", lambda model: {"type": "ollama"})
-    monkeypatch.setattr(ollama_handler, "handle_chat_completion", _dummy_response)
+    import router as router_module
+    monkeypatch.setattr(router_module, "ollama_handle", lambda body, base_url=None: _dummy_response(body))
     monkeypatch.delenv("GENAI_API_KEYS", raising=False)
     monkeypatch.delenv("GENAI_RATE_LIMIT", raising=False)
     get_settings.cache_clear()
@@ -73,4 +72,36 @@ async def test_chat_completion_http(monkeypatch, client):
     resp = await client.post("/v1/chat/completions", json=payload)
     assert resp.status_code == 200
     data = resp.json()
-    assert data["model"] == "company-gpt" 
\ No newline at end of file
+    assert data["model"] == "company-gpt" 
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("trusted", [False, True])
+async def test_non_stream_response_is_validated_unless_trusted(monkeypatch, client, trusted):
+    import router as router_module
+
+    backend = {"name": "remote", "type": "http", "base_url": "http://remote", "trusted": trusted}
+    monkeypatch.setattr(router_module, "resolve_backend", lambda model: backend)
+
+    async def handle(body, base_url):
+        response = await _dummy_response(body)
+        response["system_fingerprint"] = "fp_123"
+        response["choices"][0]["message"]["content"] = "héllo ✓"
+        return response
+
+    monkeypatch.setattr(router_module, "http_handle", handle)
+    monkeypatch.delenv("GENAI_API_KEYS", raising=False)
+    monkeypatch.delenv("GENAI_RATE_LIMIT", raising=False)
+    get_settings.cache_clear()
+    importlib.reload(sys.modules["main"])
+
+    payload = {"model": "company-gpt", "messages": [{"role": "user", "content": "hello"}]}
+    resp = await client.post("/v1/chat/completions", json=payload)
+    assert resp.status_code == 200
+    assert resp.headers["content-type"] == "application/json"
+    assert ("system_fingerprint" in resp.json()) is trusted
+    if not trusted:
+        # Same compact encoding FastAPI's response_model serialization produced.
+        expected = router_module.ChatCompletionResponse.model_validate(resp.json())
+        assert resp.content == json.dumps(
+            expected.model_dump(), ensure_ascii=False, separators=(",", ":")
+        ).encode()
@@ -0,0 +1,131 @@
+import asyncio
+
+import pytest
+
+from dispatch.singleflight import SingleFlight, coalesce_key
+from schemas.chat import ChatCompletionRequest
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight()
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"answer": 42}
+
+    results = await asyncio.gather(*(flight.do("k", upstream) for _ in range(5)))
+
+    assert calls == 1
+    assert all(r == {"answer": 42} for r in results)
+    assert flight.in_flight() == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_waiter():
+    flight = SingleFlight()
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        *(flight.do("k", upstream) for _ in range(3)), return_exceptions=True
+    )
+    assert all(isinstance(r, RuntimeError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_stream_fan_out_replays_chunks_for_late_joiners():
+    flight = SingleFlight()
+    started = 0
+    release = asyncio.Event()
+
+    async def upstream():
+        nonlocal started
+        started += 1
+        yield "data: 1\n\n"
+        yield "data: 2\n\n"
+        await release.wait()
+        yield "data: [DONE]\n\n"
+
+    first = flight.stream("k", upstream)
+    early = [await first.__anext__(), await first.__anext__()]
+
+    # Joins after two chunks were already emitted.
+    late = flight.stream("k", upstream)
+    late_task = asyncio.ensure_future(_collect(late))
+    await asyncio.sleep(0)
+    release.set()
+
+    rest = await _collect(first)
+    assert early + rest == ["data: 1\n\n", "data: 2\n\n", "data: [DONE]\n\n"]
+    assert await late_task == early + rest
+    assert started == 1
+
+
+@pytest.mark.asyncio
+async def test_upstream_cancelled_when_last_subscriber_leaves():
+    flight = SingleFlight()
+    closed = asyncio.Event()
+
+    async def upstream():
+        try:
+            yield "data: 1\n\n"
+            await asyncio.sleep(10)
+            yield "data: 2\n\n"
+        finally:
+            closed.set()
+
+    stream = flight.stream("k", upstream)
+    assert await stream.__anext__() == "data: 1\n\n"
+    await stream.aclose()
+
+    await asyncio.wait_for(closed.wait(), timeout=1)
+    await asyncio.sleep(0)
+    assert flight.in_flight() == 0
+
+
+def test_only_deterministic_requests_are_coalesced():
+    messages = [{"role": "user", "content": "hi"}]
+    greedy = ChatCompletionRequest(model="m", messages=messages, temperature=0)
+    sampled = ChatCompletionRequest(model="m", messages=messages)
+
+    assert coalesce_key(greedy, "http://a") == coalesce_key(greedy.model_copy(), "http://a")
+    assert coalesce_key(sampled, "http://a") is None
+
+
+@pytest.mark.asyncio
+async def test_stream_buffer_is_bounded():
+    flight = SingleFlight(max_chunks=3)
+    started = 0
+    pulled = 0
+
+    async def upstream():
+        nonlocal started, pulled
+        started += 1
+        for i in range(10):
+            pulled += 1
+            yield i
+
+    slow = flight.stream("k", upstream)
+    assert await slow.__anext__() == 0
+    await asyncio.sleep(0.01)
+    # Upstream waits for the slow subscriber instead of buffering everything.
+    assert pulled == 4
+    broadcast = flight._streams["k"]
+    assert len(broadcast.chunks) <= 3
+
+    # Too far in to replay: a late joiner gets its own upstream call.
+    late = await _collect(flight.stream("k", upstream))
+    assert late == list(range(10)) and started == 2
+
+    assert [0] + await _collect(slow) == list(range(10))
+    assert len(broadcast.chunks) <= 1
+
+
+async def _collect(stream):
+    return [chunk async for chunk in stream]
@@ -0,0 +1,55 @@
+from handlers.sse import SSERelay
+
+
+def _relay(chunks):
+    relay = SSERelay()
+    out = [relay.feed(chunk) for chunk in chunks]
+    out.append(relay.flush())
+    return [part for part in out if part]
+
+
+def test_whole_events_pass_through_unchanged():
+    chunk = b'data: {"a":1}\n\n: keep-alive\n\nevent: done\nid: 7\ndata: [DONE]\n\n'
+    relay = SSERelay()
+    assert relay.feed(chunk) is chunk
+    assert relay.flush() == b""
+
+
+def test_events_split_across_reads_are_reassembled():
+    stream = b'data: {"a":1}\n\ndata: line one\ndata: line two\n\ndata: [DONE]\n\n'
+    for size in (1, 3, 7, 16):
+        chunks = [stream[i : i + size] for i in range(0, len(stream), size)]
+        parts = _relay(chunks)
+        assert b"".join(parts) == stream
+        assert all(part.endswith(b"\n\n") for part in parts)
+
+
+def test_crlf_is_normalised_even_when_split():
+    assert b"".join(_relay([b"data: x\r", b"\n\r\n", b"data: [DONE]\r\n\r\n"])) == (
+        b"data: x\n\ndata: [DONE]\n\n"
+    )
+
+
+def test_bare_json_lines_are_wrapped_as_events():
+    assert _relay([b'{"a":1}\n{"a"', b":2}\n", b"[DONE]"]) == [
+        b'data: {"a":1}\n\n',
+        b'data: {"a":2}\n\n',
+        b"data: [DONE]\n\n",
+    ]
+
+
+def test_single_newline_data_lines_are_relayed_as_events():
+    relay = SSERelay()
+    assert relay.feed(b'data: {"a":1}\n') == b""
+    assert relay.feed(b'data: {"a":2}\n') == b'data: {"a":1}\n\ndata: {"a":2}\n\n'
+    assert relay.feed(b"data: [DONE]\n") == b"data: [DONE]\n\n"
+    assert relay.flush() == b""
+
+
+def test_multi_line_events_are_not_split():
+    stream = b"data: line one\ndata: line two\n\ndata: {\ndata: }\n\n"
+    assert b"".join(_relay([stream[:20], stream[20:]])) == stream
+
+
+def test_unterminated_last_event_is_flushed():
+    assert _relay([b"data: tail"]) == [b"data: tail\n\n"]
@@ -0,0 +1,83 @@
+import asyncio
+
+import pytest
+
+from config.settings import get_settings
+from dispatch.stream_coalesce import coalesce_stream, coalesce_window
+
+
+def _event(token):
+    return f'data: {{"choices":[{{"delta":{{"content":"{token}"}},"finish_reason":null}}]}}\n\n'
+
+
+FINAL = 'data: {"choices":[{"delta":{},"finish_reason":"stop"}]}\n\n'
+
+
+async def _produce(chunks, delay=0.0):
+    for chunk in chunks:
+        if delay:
+            await asyncio.sleep(delay)
+        yield chunk
+
+
+async def _collect(stream):
+    return [frame async for frame in stream]
+
+
+@pytest.mark.asyncio
+async def test_fast_tokens_are_merged_and_finish_flushes():
+    chunks = [_event(i) for i in range(10)] + [FINAL, "data: [DONE]\n\n"]
+    frames = await _collect(coalesce_stream(_produce(chunks), window=1.0, max_bytes=1 << 20))
+
+    assert b"".join(frames) == "".join(chunks).encode()
+    assert frames[0] == chunks[0].encode()  # first token is not delayed
+    assert frames[1].endswith(FINAL.encode())  # flushed on finish_reason
+    assert frames[2] == b"data: [DONE]\n\n"
+
+
+@pytest.mark.asyncio
+async def test_byte_threshold_caps_frame_size():
+    chunks = [_event("x") for _ in range(20)]
+    size = len(chunks[0])
+    frames = await _collect(coalesce_stream(_produce(chunks), window=1.0, max_bytes=size * 3))
+    assert b"".join(frames) == "".join(chunks).encode()
+    assert all(len(frame) <= size * 3 for frame in frames)
+    assert len(frames) == 1 + 19 // 3 + 1
+
+
+@pytest.mark.asyncio
+async def test_slow_tokens_are_not_held_back():
+    chunks = [_event(i) for i in range(4)]
+    frames = await _collect(coalesce_stream(_produce(chunks, delay=0.03), window=0.005, max_bytes=1 << 20))
+    assert frames == [chunk.encode() for chunk in chunks]
+
+
+@pytest.mark.asyncio
+async def test_closing_early_closes_upstream():
+    closed = asyncio.Event()
+
+    async def upstream():
+        try:
+            yield _event(0)
+            await asyncio.sleep(10)
+            yield _event(1)
+        finally:
+            closed.set()
+
+    stream = coalesce_stream(upstream(), window=0.01, max_bytes=1 << 20)
+    assert await stream.__anext__() == _event(0).encode()
+    await stream.aclose()
+    assert closed.is_set()
+
+
+def test_window_from_header_model_and_default(monkeypatch):
+    monkeypatch.setenv("GENAI_STREAM_COALESCE_MS", "5")
+    monkeypatch.setenv("GENAI_STREAM_COALESCE_MODELS", "llama3=20")
+    get_settings.cache_clear()
+    try:
+        assert coalesce_window("llama3", {}) == pytest.approx(0.02)
+        assert coalesce_window("other", {}) == pytest.approx(0.005)
+        assert coalesce_window("llama3", {"x-genai-coalesce": "50"}) == pytest.approx(0.05)
+        assert coalesce_window("llama3", {"x-genai-coalesce": "off"}) == 0
+    finally:
+        get_settings.cache_clear()